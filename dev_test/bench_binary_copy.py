@@ -0,0 +1,104 @@
+"""throughput and peak memory of csv vs binary COPY encoding of a dataframe
+
+usage:
+    python dev_test/bench_binary_copy.py             # encoding only
+    python dev_test/bench_binary_copy.py --postgres  # also COPY into a temp table, using settings.toml
+"""
+import sys
+import time
+import pathlib
+import tracemalloc
+from io import StringIO
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))
+from yclib.datastore import BinaryCopyStream
+
+ROWS = 1_000_000
+COLUMN_TYPES = {
+    "employee_id": "bigint",
+    "hours": "double precision",
+    "amount": "double precision",
+    "pay_date": "timestamp",
+    "is_casual": "boolean",
+    "pay_code": "text",
+    "description": "text",
+}
+
+
+def synthetic_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "employee_id": rng.integers(100000, 999999, rows),
+            "hours": rng.random(rows) * 12,
+            "amount": rng.random(rows) * 5000,
+            "pay_date": pd.Timestamp("2015-07-01")
+            + pd.to_timedelta(rng.integers(0, 3000, rows), "D"),
+            "is_casual": rng.random(rows) > 0.7,
+            "pay_code": pd.Series(rng.integers(0, 400, rows)).map("PC{:03d}".format),
+            "description": pd.Series(rng.integers(0, 50, rows)).map(
+                "ordinary hours worked, cost centre {}".format
+            ),
+        }
+    )
+    df.loc[df.sample(frac=0.05, random_state=0).index, "hours"] = np.nan
+    return df
+
+
+def encode_csv(df: pd.DataFrame) -> int:
+    buffer = StringIO()
+    df.to_csv(buffer, index=False)
+    return len(buffer.getvalue())
+
+
+def encode_binary(df: pd.DataFrame) -> int:
+    stream = BinaryCopyStream(df, COLUMN_TYPES)
+    size = 0
+    # copy_expert reads 8KB at a time
+    while block := stream.read(8192):
+        size += len(block)
+    return size
+
+
+def measure(name: str, func, df: pd.DataFrame):
+    start = time.perf_counter()
+    size = func(df)
+    elapsed = time.perf_counter() - start
+    # tracemalloc slows allocation heavy code down, so memory is measured in a second run
+    tracemalloc.start()
+    func(df)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{name:<10} {df.shape[0] / elapsed:>12,.0f} rows/s {size / 1024**2:>8.1f}MB encoded "
+        f"{peak / 1024**2:>8.1f}MB peak"
+    )
+
+
+def copy_to_postgres(df: pd.DataFrame):
+    sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / "pipeline"))
+    from _settings import POSTGRES_CREDENTIAL
+    from yclib.datastore import Postgres
+
+    postgres = Postgres(POSTGRES_CREDENTIAL)
+    with postgres.connect():
+        for copy_format in ["csv", "binary"]:
+            postgres.execute('DROP TABLE IF EXISTS "public"."bench_binary_copy"')
+            postgres.create_table("public", "bench_binary_copy", COLUMN_TYPES)
+            start = time.perf_counter()
+            postgres.dataframe_insert_to_table(
+                "public", "bench_binary_copy", df, copy_format, COLUMN_TYPES
+            )
+            elapsed = time.perf_counter() - start
+            print(f"COPY {copy_format:<6} {df.shape[0] / elapsed:>12,.0f} rows/s")
+        postgres.execute('DROP TABLE IF EXISTS "public"."bench_binary_copy"')
+
+
+if __name__ == "__main__":
+    df = synthetic_frame(ROWS)
+    measure("csv", encode_csv, df)
+    measure("binary", encode_binary, df)
+    if "--postgres" in sys.argv[1:]:
+        copy_to_postgres(df)
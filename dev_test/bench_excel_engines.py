@@ -0,0 +1,71 @@
+"""rows/s per excel reader engine on our file shapes
+
+usage:
+    python dev_test/bench_excel_engines.py                      # synthetic workbooks
+    python dev_test/bench_excel_engines.py file1.xlsx file2.xlsb  # real files
+"""
+import sys
+import time
+import tempfile
+import pathlib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))
+from yclib.core import EXCEL_ENGINES, ExcelFileHandler
+
+SHAPES = {
+    # PIT payslip extract: narrow, mostly numeric and dates
+    "narrow_numeric": (100_000, 20),
+    # position/classification master: wide, text heavy
+    "wide_text": (20_000, 120),
+}
+
+
+def synthetic_workbook(folder: pathlib.Path, name: str, rows: int, cols: int):
+    rng = np.random.default_rng(0)
+
+    def _column(i):
+        if name == "narrow_numeric" and i % 3 == 0:
+            return rng.integers(0, 1_000_000, rows)
+        if name == "narrow_numeric" and i % 3 == 1:
+            return pd.Timestamp("2015-07-01") + pd.to_timedelta(
+                rng.integers(0, 3000, rows), "D"
+            )
+        return pd.Series(rng.integers(0, 5000, rows)).map("text value {}".format)
+
+    df = pd.DataFrame({f"col_{i}": _column(i) for i in range(cols)})
+    path = folder / f"{name}.xlsx"
+    df.to_excel(path, index=False)
+    return path
+
+
+def bench(path: pathlib.Path, chunksize: int = 50_000):
+    for engine in ["pandas"] + list(EXCEL_ENGINES):
+        if engine != "pandas" and not EXCEL_ENGINES[engine].supports(path, {}):
+            continue
+        try:
+            start = time.perf_counter()
+            rows = sum(
+                df.shape[0]
+                for _, df in ExcelFileHandler.read_file_in_chunks(
+                    path, {}, chunksize, engine
+                )
+            )
+            elapsed = time.perf_counter() - start
+        except ImportError as e:
+            print(f"{path.name:<30} {engine:<10} not installed ({e.name})")
+            continue
+        print(
+            f"{path.name:<30} {engine:<10} {rows:>10} rows {elapsed:>8.2f}s {rows / elapsed:>12,.0f} rows/s"
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:]:
+        for arg in sys.argv[1:]:
+            bench(pathlib.Path(arg))
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            for name, (rows, cols) in SHAPES.items():
+                bench(synthetic_workbook(pathlib.Path(folder), name, rows, cols))
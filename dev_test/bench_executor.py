@@ -0,0 +1,88 @@
+"""run time and copied bytes of a yaml function chain run by TransformExecutor, against
+calling the functions one by one as create_raw_dataset did
+
+usage:
+    python dev_test/bench_executor.py                # 1M and 10M rows
+    python dev_test/bench_executor.py 1000000        # given sizes only
+"""
+import sys
+import time
+import pathlib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))
+from yclib.transform import general_functions, profiling, TransformExecutor
+
+SIZES = [1_000_000, 10_000_000]
+FUNCTIONS = {
+    "flatten_effective_date": {
+        "key_col": "employee",
+        "flat_col": "classification",
+        "effective_date": "effective",
+        "agg_settings": {
+            "employee": "last",
+            "classification": "last",
+            "effective": "min",
+            "hours": "sum",
+            "rate": "last",
+        },
+    },
+    "rename_columns": {"name_map": {"employee": "EmployeeCode", "rate": "Rate"}},
+    "change_data_type": {"dtype_map": {"Rate": "float32", "hours": "float32"}},
+    "create_columns_with_default_value": {
+        "column_name": ["Company", "Award"],
+        "default_value": "N/A",
+    },
+}
+
+
+def synthetic_rows(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "employee": rng.integers(0, max(rows // 40, 1), rows),
+            "effective": pd.Timestamp("2010-01-01")
+            + pd.to_timedelta(rng.integers(0, 5000, rows), "D"),
+            "classification": pd.Series(rng.integers(0, 12, rows)).map(
+                "LEVEL {}".format
+            ),
+            "hours": rng.random(rows) * 38,
+            "rate": rng.random(rows) * 60,
+        }
+    )
+
+
+def one_by_one(df: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """every function on the result of the previous one, with the copied bytes of each"""
+    copied = 0
+    for name, kwargs in FUNCTIONS.items():
+        buffers = profiling.frame_buffers(df)
+        result = getattr(general_functions, name)(df, **kwargs)["result"]
+        result = df if result is None else result
+        copied += profiling.bytes_copied_since(buffers, result)
+        df = result
+    return df, copied
+
+
+def measure(rows: int):
+    df = synthetic_rows(rows)
+    start = time.perf_counter()
+    expected, copied = one_by_one(df.copy())
+    elapsed = time.perf_counter() - start
+    print(f"{'one by one':<12} {rows:>12,} rows {elapsed:>8.2f}s {copied:>14,} bytes copied")
+    executor = TransformExecutor(FUNCTIONS)
+    start = time.perf_counter()
+    result = executor.run(df, owned=True)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'executor':<12} {rows:>12,} rows {elapsed:>8.2f}s "
+        f"{executor.report['bytes_copied']:>14,} bytes copied {executor.report}"
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:] if arg.isdigit()] or SIZES
+    for rows in sizes:
+        measure(rows)
@@ -0,0 +1,78 @@
+"""run time and peak memory of interval_join against a merge on the key and a filter, matching
+timesheet days to position periods
+
+usage:
+    python dev_test/bench_interval_join.py                  # 100k, 1M and 10M days
+    python dev_test/bench_interval_join.py 1000000          # given sizes only
+    python dev_test/bench_interval_join.py 100000 --merge   # also time merge + filter
+"""
+import sys
+import time
+import pathlib
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))
+from yclib.transform import interval_join
+
+SIZES = [100_000, 1_000_000, 10_000_000]
+
+
+def synthetic_tables(days: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """~200 timesheet days per employee and 10 position periods of ~6 months each, the
+    current one open ended"""
+    rng = np.random.default_rng(0)
+    employees = max(days // 200, 1)
+    positions = pd.DataFrame({"EmployeeCode": np.repeat(np.arange(employees), 10)})
+    offset = np.tile(np.arange(10) * 180, employees)
+    positions["StartDate"] = pd.Timestamp("2015-01-01") + pd.to_timedelta(offset, "D")
+    positions["EndDate"] = positions["StartDate"] + pd.Timedelta(days=180)
+    positions.loc[offset == 9 * 180, "EndDate"] = pd.NaT
+    positions["Position"] = rng.integers(0, 300, len(positions))
+    timesheets = pd.DataFrame(
+        {
+            "EmployeeCode": rng.integers(0, employees, days),
+            "WorkDate": pd.Timestamp("2015-01-01")
+            + pd.to_timedelta(rng.integers(0, 2000, days), "D"),
+            "Hours": rng.random(days) * 12,
+        }
+    )
+    return timesheets, positions
+
+
+def merge_filter(timesheets: pd.DataFrame, positions: pd.DataFrame) -> pd.DataFrame:
+    df = timesheets.merge(positions, on="EmployeeCode")
+    end = df["EndDate"].fillna(pd.Timestamp.max)
+    return df[(df["StartDate"] <= df["WorkDate"]) & (df["WorkDate"] < end)]
+
+
+def join(timesheets: pd.DataFrame, positions: pd.DataFrame) -> pd.DataFrame:
+    return interval_join(
+        timesheets, positions, "EmployeeCode", "StartDate", "EndDate", "WorkDate"
+    )
+
+
+def measure(name: str, func, timesheets: pd.DataFrame, positions: pd.DataFrame):
+    start = time.perf_counter()
+    result = func(timesheets, positions)
+    elapsed = time.perf_counter() - start
+    # tracemalloc slows allocation heavy code down, so memory is measured in a second run
+    tracemalloc.start()
+    func(timesheets, positions)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{name:<14} {timesheets.shape[0]:>12,} days {elapsed:>8.2f}s "
+        f"{peak / 1024**2:>10.1f}MB peak {result.shape[0]:>12,} matches"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sizes = [int(arg) for arg in args if arg.isdigit()] or SIZES
+    for days in sizes:
+        timesheets, positions = synthetic_tables(days)
+        measure("interval_join", join, timesheets, positions)
+        if "--merge" in args:
+            measure("merge + filter", merge_filter, timesheets, positions)
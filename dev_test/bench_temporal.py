@@ -0,0 +1,160 @@
+"""run time of flatten_effective_date / group_multiple_date on synthetic employee histories,
+against the previous groupby.apply implementation
+
+usage:
+    python dev_test/bench_temporal.py                      # 1M, 10M and 50M rows
+    python dev_test/bench_temporal.py 1000000              # given sizes only
+    python dev_test/bench_temporal.py 1000000 --legacy     # also time the previous implementation
+
+the outputs of both implementations are compared on a 200k row history first.
+"""
+import sys
+import time
+import pathlib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))
+from yclib.transform import temporal
+
+SIZES = [1_000_000, 10_000_000, 50_000_000]
+AGG_SETTINGS = {"employee": "last", "classification": "last", "effective": "min"}
+
+
+def synthetic_history(rows: int, source: bool = False) -> pd.DataFrame:
+    """~40 records per employee, classification changing every few records, some missing,
+    rows shuffled as they come from several source files"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "employee": rng.integers(0, max(rows // 40, 1), rows),
+            "effective": pd.Timestamp("2010-01-01")
+            + pd.to_timedelta(rng.integers(0, 5000, rows), "D"),
+        }
+    ).sort_values(["employee", "effective"], ignore_index=True)
+    classification = pd.Series(rng.integers(0, 12, rows)).map("LEVEL {}".format)
+    # an employee keeps the previous record's classification most of the time
+    df["classification"] = classification.where(rng.random(rows) > 0.8).ffill()
+    df.loc[rng.random(rows) < 0.01, "classification"] = np.nan
+    df["period_end"] = df["effective"] + pd.to_timedelta(13, "D")
+    if source:
+        df["Source"] = "payroll.csv:data:row:" + pd.Series(np.arange(rows)).astype(str)
+    return df.iloc[rng.permutation(rows)].reset_index(drop=True)
+
+
+def legacy_flatten_effective_date(df, key_col, flat_col, effective_date, agg_settings):
+    df.sort_values([key_col, effective_date], ascending=[True, True], inplace=True)
+    df.loc[
+        ((df[key_col] != df[key_col].shift()) | (df[flat_col] != df[flat_col].shift())),
+        "rolling_index",
+    ] = 1
+    df["rolling_index"] = df["rolling_index"].fillna(0)
+    df["rolling_index"] = df["rolling_index"].cumsum()
+    df = df.groupby(["rolling_index"]).agg(agg_settings).reset_index(drop=True)
+
+    def _get_end_date(row):
+        row["EndDate"] = row[effective_date].shift(-1)
+        return row
+
+    df = df.groupby([key_col]).apply(_get_end_date)
+    df.rename(columns={effective_date: "StartDate"}, inplace=True)
+    return df
+
+
+def legacy_group_multiple_date(
+    df, key_col, group_col, period_start, period_end, agg_settings
+):
+    df.sort_values([key_col, period_start], ascending=[True, True], inplace=True)
+    df.loc[
+        (
+            (df[key_col] != df[key_col].shift())
+            | (df[group_col] != df[group_col].shift())
+        ),
+        "rolling_index",
+    ] = 1
+    df["rolling_index"] = df["rolling_index"].fillna(0)
+    df["rolling_index"] = df["rolling_index"].cumsum()
+    agg_settings[period_start] = "min"
+    agg_settings[period_end] = "max"
+    return df.groupby(["rolling_index"]).agg(agg_settings).reset_index(drop=True)
+
+
+def flatten(df, implementation):
+    return implementation(
+        df, "employee", "classification", "effective", dict(AGG_SETTINGS)
+    )
+
+
+def group(df, implementation):
+    return implementation(
+        df, "employee", "classification", "effective", "period_end", dict(AGG_SETTINGS)
+    )
+
+
+def check(rows: int = 200_000):
+    """both implementations give the same records, and the new one leaves its input alone"""
+    df = synthetic_history(rows, source=True)
+    agg = {**AGG_SETTINGS, "period_end": "first", "Source": "unique"}
+    before = df.copy()
+    new = temporal.flatten_effective_date(
+        df, "employee", "classification", "effective", agg
+    )
+    pd.testing.assert_frame_equal(df, before)
+    old = legacy_flatten_effective_date(
+        df.copy(), "employee", "classification", "effective", dict(agg)
+    )
+    # groupby.apply of pandas>=2 moves the key column to the index
+    if "employee" not in old.columns:
+        old = old.reset_index(level=0)
+    old = old.reset_index(drop=True)[new.columns]
+    for frame in (new, old):
+        frame["Source"] = frame["Source"].map(list)
+    pd.testing.assert_frame_equal(new, old, check_dtype=False)
+
+    new = temporal.group_multiple_date(
+        df, "employee", "classification", "effective", "period_end", agg
+    )
+    pd.testing.assert_frame_equal(df, before)
+    old = legacy_group_multiple_date(
+        df.copy(),
+        "employee",
+        "classification",
+        "effective",
+        "period_end",
+        dict(agg),
+    )
+    for frame in (new, old):
+        frame["Source"] = frame["Source"].map(list)
+    pd.testing.assert_frame_equal(new, old, check_dtype=False)
+    print(f"outputs match on {rows:,} rows")
+
+
+def measure(name: str, func, df: pd.DataFrame):
+    start = time.perf_counter()
+    result = func(df)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<28} {df.shape[0]:>12,} rows {elapsed:>8.2f}s "
+        f"{df.shape[0] / elapsed:>14,.0f} rows/s {result.shape[0]:>12,} runs"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sizes = [int(arg) for arg in args if arg.isdigit()] or SIZES
+    check()
+    for rows in sizes:
+        df = synthetic_history(rows)
+        implementations = [
+            ("flatten_effective_date", flatten, temporal.flatten_effective_date),
+            ("group_multiple_date", group, temporal.group_multiple_date),
+        ]
+        if "--legacy" in args:
+            implementations += [
+                ("legacy flatten_effective_date", flatten, legacy_flatten_effective_date),
+                ("legacy group_multiple_date", group, legacy_group_multiple_date),
+            ]
+        for name, run, implementation in implementations:
+            # the legacy implementations sort their input in place
+            measure(name, lambda d: run(d.copy(), implementation), df)
+        del df
@@ -31,6 +31,13 @@ except FileNotFoundError:
         [pipeline]
         PIPELINE_NAME= {{project name}} <- optional default: new_project
         CONCURRENCY_LIMIT= {{number of cpu will be used in multiprocessing}} <- optional default: maximum cpu
+        MEMORY_BUDGET_RATIO= {{share of free memory used by files read concurrently}} <- optional default: 0.8
+        DECRYPT_CACHE_FOLDER= {{folder for decrypted copies of protected workbooks}} <- optional default: /dev/shm/yclib_decrypted or temp folder
+        DECRYPT_CACHE_SIZE= {{bytes of decrypted workbooks kept between runs}} <- optional default: 2GB
+        JOURNAL_FOLDER= {{folder journaling workflow records until they are written to postgres}} <- optional default: pipeline/journal
+        POOL_SIZE= {{postgres connections kept open per process and database}} <- optional default: 4, 0 disables pooling
+        TRANSFORM_PROFILE= {{profile transform functions: true, or a JSONL file the records are also written to}} <- optional default: false, or environment variable YCLIB_PROFILE
+        TRANSFORM_PROFILE_MEMORY= {{also trace peak memory of transform functions, which slows them down}} <- optional default: false, or environment variable YCLIB_PROFILE_MEMORY
 
 
         [postgres]
@@ -107,6 +114,43 @@ except KeyError:
     AVAILABLE_MEMORY = 400000000
     print(f"cannot get free AVAILABLE_MEMORY. AVAILABLE_MEMORY is set to default 4GB")
 
+# share of AVAILABLE_MEMORY that files read concurrently may use
+if keys_exists(_settings, ["pipeline", "MEMORY_BUDGET_RATIO"]):
+    MEMORY_BUDGET_RATIO = _settings["pipeline"]["MEMORY_BUDGET_RATIO"]
+else:
+    MEMORY_BUDGET_RATIO = 0.8
+
+# decrypt-once cache of password protected workbooks
+if keys_exists(_settings, ["pipeline", "DECRYPT_CACHE_FOLDER"]):
+    DECRYPT_CACHE_FOLDER = _settings["pipeline"]["DECRYPT_CACHE_FOLDER"]
+else:
+    DECRYPT_CACHE_FOLDER = None
+if keys_exists(_settings, ["pipeline", "DECRYPT_CACHE_SIZE"]):
+    DECRYPT_CACHE_SIZE = _settings["pipeline"]["DECRYPT_CACHE_SIZE"]
+else:
+    DECRYPT_CACHE_SIZE = 2 * 1024**3
+
+# local journal of buffered workflow records (lineage, memory profile)
+if keys_exists(_settings, ["pipeline", "JOURNAL_FOLDER"]):
+    JOURNAL_FOLDER = Path(_settings["pipeline"]["JOURNAL_FOLDER"])
+else:
+    JOURNAL_FOLDER = Path(__file__).parent / "journal"
+
+# connections kept open per process and database, reused across tasks. 0 disables pooling
+if keys_exists(_settings, ["pipeline", "POOL_SIZE"]):
+    POOL_SIZE = _settings["pipeline"]["POOL_SIZE"]
+else:
+    POOL_SIZE = 4
+
+# profile of transform functions written to workflow.transform_profile, see yclib.transform.profiling
+if keys_exists(_settings, ["pipeline", "TRANSFORM_PROFILE"]):
+    TRANSFORM_PROFILE = _settings["pipeline"]["TRANSFORM_PROFILE"]
+else:
+    TRANSFORM_PROFILE = False
+if keys_exists(_settings, ["pipeline", "TRANSFORM_PROFILE_MEMORY"]):
+    TRANSFORM_PROFILE_MEMORY = _settings["pipeline"]["TRANSFORM_PROFILE_MEMORY"]
+else:
+    TRANSFORM_PROFILE_MEMORY = False
 
 # CONCURRENCY_LIMIT
 if keys_exists(_settings, ["pipeline", "CONCURRENCY_LIMIT"]):
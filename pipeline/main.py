@@ -1,8 +1,9 @@
-from subflows import ingest_source_data
+from subflows import ingest_source_data, create_raw_datasets
 from prefect import flow, task, get_run_logger
 from prefect.task_runners import SequentialTaskRunner
 from datetime import timedelta
 from _settings import PROJECT_NAME, INGEST_SOURCE_DATA
+import _settings
 
 
 @flow(
@@ -33,6 +34,9 @@ def main_flow():
         """
     )
     ingest_source_data(ingest_config=INGEST_SOURCE_DATA)
+    # optional stage, run when settings.toml->mainflow->RAW_DATASETS is set
+    if hasattr(_settings, "RAW_DATASETS"):
+        create_raw_datasets(raw_config=_settings.RAW_DATASETS)
 
     logger.info(
         f"""
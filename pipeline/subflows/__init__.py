@@ -1 +1,2 @@
 from .ingest_source_data import ingest_source_data
+from .create_raw_dataset import create_raw_datasets
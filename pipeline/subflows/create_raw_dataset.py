@@ -1,19 +1,46 @@
 from yclib.datastore import Postgres
-from pathlib import Path
-from yclib.core import (
-    ExcelFileHandler,
+from yclib.core import DatasetClassifier
+from _settings import (
     PROJECT_NAME,
-    AVAILABLE_MEMORY,
-    CONCURRENCY_LIMIT,
     POSTGRES_CREDENTIAL,
+    TRANSFORM_PROFILE,
+    TRANSFORM_PROFILE_MEMORY,
 )
-from prefect import flow, task, get_run_logger, unmapped
-from prefect.tasks import task_input_hash
+from prefect import flow, task, get_run_logger
 from prefect.task_runners import SequentialTaskRunner
-import re
 import pandas as pd
-from collections import ChainMap
-from yclib.transform import general_functions
+import tasklib
+from yclib.transform import (
+    ProjectionCompiler,
+    SQLCompileError,
+    TransformExecutor,
+    compile_functions,
+    profiling,
+)
+from psycopg2 import sql
+
+
+def dataset_batches(dataset_config: dict) -> dict[str, dict]:
+    """batches of a dataset in yaml->create_raw_datasets->datasets->[dataset]: entries with a
+    'table' list and/or a 'file_filter' to match tables of the source schema"""
+    return {
+        batch: batch_config
+        for batch, batch_config in dataset_config.items()
+        if isinstance(batch_config, dict)
+        and ("table" in batch_config or "file_filter" in batch_config)
+    }
+
+
+def _postgres_type(column: pd.Series) -> str:
+    """postgres type of a column transformed in pandas: as compiled by
+    ProjectionCompiler.change_data_type, numeric for Decimal values (numeric read back from
+    postgres) and text for dtypes without postgres type"""
+    if column.dtype == object and pd.api.types.infer_dtype(column) == "decimal":
+        return "numeric"
+    try:
+        return ProjectionCompiler.postgres_type(column.dtype)
+    except SQLCompileError:
+        return "text"
 
 @task(
     name="set-raw-dataset-database",
@@ -35,7 +62,7 @@ def set_raw_datasets_database(db_creds: dict[str, str or int], schema: str):
         logger.info(pgs.create_schema(schema))
         logger.info(
             pgs.create_table(
-                schema="workflow_info",
+                schema="workflow",
                 table="create_raw_datasets_reading_config",
                 column_with_dtype={
                     "dataset": "text",
@@ -45,18 +72,28 @@ def set_raw_datasets_database(db_creds: dict[str, str or int], schema: str):
                 },
             )
         )
+        logger.info(
+            pgs.create_table(
+                schema="workflow",
+                table="transform_profile",
+                column_with_dtype={
+                    **profiling.PROFILE_COLUMNS,
+                    "recorded_at": "timestamp default now()",
+                },
+            )
+        )
 
 
 @task(
-    name="",
+    name="get-dataset-tables",
     tags=["pre-setup"],
 )
 def get_dataset_tables(
     db_creds: dict[str, str or int], source_schema: str, config: dict
 ) -> dict:
-    """according to the settings in yaml->create_raw_datasets->datasets
-        a dictionary with the following structure will be returned:
-        dataset -> file_group -> [table names under the group]
+    """according to the settings in yaml->create_raw_datasets->datasets, set
+    dataset -> batch -> tables to the source tables of every batch: the tables listed in
+    'table' that exist in the source schema, or else the tables matching 'file_filter'
 
     Parameters
     ----------
@@ -70,8 +107,7 @@ def get_dataset_tables(
     Returns
     -------
     dict
-        a dictionary in the following structure representing each datasets and groups in each dataset
-        dataset -> file_group -> [table names under the group]
+        config with dataset -> batch -> tables set
     """
     pgs = Postgres(db_creds)
     with pgs.connect():
@@ -80,42 +116,217 @@ def get_dataset_tables(
             f"""SELECT "table_name" FROM information_schema.tables where "table_schema"='{source_schema}'"""
         )
         tables = tables["table_name"].tolist()
-        for dataset in config:
-            for batch, set in config[dataset].items():
-                config[dataset][batch]["tables"] = ExcelFileHandler.filelist_filter(
-                    tables,
-                    filename_include=set["filename_include"],
-                    filename_exclude=set["filename_exclude"],
-                )
-        logger.info(f"raw dataset settting reference: {str(config)}")
+    filtered = {}
+    for dataset in config:
+        for batch, batch_config in dataset_batches(config[dataset]).items():
+            if batch_config.get("table"):
+                batch_config["tables"] = [
+                    t for t in batch_config["table"] if t in tables
+                ]
+                missing = set(batch_config["table"]) - set(batch_config["tables"])
+                if missing:
+                    logger.warning(
+                        f"{dataset}.{batch}: table(s) not found in {source_schema}: {sorted(missing)}"
+                    )
+            elif batch_config.get("file_filter"):
+                filtered[(dataset, batch)] = {
+                    "filename_include": batch_config["file_filter"].get(
+                        "filename_include"
+                    ),
+                    "filename_exclude": batch_config["file_filter"].get(
+                        "filename_exclude"
+                    ),
+                    "filepath_exclude": [],
+                }
+            else:
+                batch_config["tables"] = []
+    if filtered:
+        classifier = DatasetClassifier(filtered)
+        for (dataset, batch), matched in classifier.classify(tables).items():
+            config[dataset][batch]["tables"] = matched
+    logger.info(f"raw dataset settting reference: {str(config)}")
     return config
 
 
 @task(
-    name="create-raw-datasets",
-    tags=["pre-setup"],
+    name="create-raw-dataset-{dataset}",
+    tags=["pushdown"],
 )
 def create_raw_dataset(
-    db_creds: dict[str, str or int], source_schema: str, dataset_config: dict
-):
+    db_creds: dict[str, str or int],
+    source_schema: str,
+    raw_schema: str,
+    dataset: str,
+    dataset_config: dict,
+) -> int:
+    """create table [raw_schema].[dataset] from the tables of its batches.
+
+    The union of the tables of a batch and its leading functions with a SQL equivalent
+    (renames, casts, default columns, see yclib.transform.compile_functions) are materialized
+    inside postgres with CREATE TABLE ... AS / INSERT ... SELECT, so a batch whose functions
+    all compile never leaves the database (see Postgres.query_to_table). Otherwise the result
+    of the SQL part is read into pandas (as a COPY, see Postgres.query_to_dataframe), run
+    through the remaining functions of yclib.transform.general_functions in yaml order by a
+    yclib.transform.TransformExecutor, which fuses adjacent column functions, and copied back. Columns are aligned by name across tables and batches.
+
+    Parameters
+    ----------
+    db_creds : dict[str, str or int]
+        postgres connect credentials
+    source_schema : str
+        schema of the source tables
+    raw_schema : str
+        yaml->create_raw_datasets->schema
+    dataset : str
+        dataset name, also the name of the raw table
+    dataset_config : dict
+        yaml->create_raw_datasets->datasets->[dataset], with tables set by get_dataset_tables
+
+    Returns
+    -------
+    int
+        rows in the raw table
+    """
+    logger = get_run_logger()
     pgs = Postgres(db_creds)
+    counter = 0
     with pgs.connect():
-        logger = get_run_logger()
-        for batch in dataset_config:
-            query = "Union all".join(
-                [
-                    '(select * from "{schema}"."{table}")'.format(
-                        schema=source_schema, table=table
+        pgs.drop_table(raw_schema, dataset)
+        for batch, batch_config in dataset_batches(dataset_config).items():
+            sources = [
+                (source_schema, table) for table in batch_config.get("tables", [])
+            ]
+            if not sources:
+                logger.info(f"{dataset}.{batch}: no source table, skipped")
+                continue
+            query, columns = pgs.union_select(sources)
+            # leading functions with a SQL equivalent run in the union query itself
+            compiler, functions = compile_functions(
+                batch_config.get("functions") or {}, list(columns)
+            )
+            if compiler is not None:
+                query = compiler.compile(query)
+                logger.info(f"{dataset}.{batch}: {compiler.compiled} compiled to SQL")
+            if not functions:
+                rows = pgs.query_to_table(raw_schema, dataset, query)
+                logger.info(
+                    f"{dataset}.{batch}: {rows} rows of {len(sources)} table(s) are added to {raw_schema}.{dataset} inside postgres"
+                )
+            else:
+                df = pgs.query_to_dataframe(query.as_string(pgs.connection), "copy")
+                executor = TransformExecutor(functions)
+                with profiling.in_step(f"{dataset}.{batch}"):
+                    # the frame read from postgres is owned, nothing else holds it
+                    df = executor.run(df, owned=True, log=logger.info)
+                logger.info(f"{dataset}.{batch}: {executor.report}")
+                if profiling.is_enabled():
+                    tasklib.workflow_record_writer("transform_profile").add(
+                        pgs, profiling.drain()
                     )
-                    for table in dataset_config[batch]["table"]
-                ]
+                df = df.rename(columns=str)
+                duplicated = df.columns[df.columns.duplicated()]
+                if len(duplicated):
+                    raise ValueError(
+                        f"{dataset}.{batch}: duplicate columns {sorted(set(duplicated))} after {list(functions)}, rename them apart"
+                    )
+                # typed as the compiled functions would type them, columns of other types
+                # across batches become text (see Postgres.align_table)
+                pgs.align_table(
+                    raw_schema,
+                    dataset,
+                    {col: _postgres_type(df[col]) for col in df.columns},
+                )
+                # COPY names its columns, the ones missing from df are left NULL
+                pgs.dataframe_insert_to_table(raw_schema, dataset, df)
+                rows = df.shape[0]
+                logger.info(
+                    f"{dataset}.{batch}: {rows} rows of {len(sources)} table(s) are added to {raw_schema}.{dataset} after {list(functions)}"
+                )
+            counter += rows
+            pgs.dataframe_insert_to_table(
+                "workflow",
+                "create_raw_datasets_reading_config",
+                pd.DataFrame(
+                    {
+                        "dataset": dataset,
+                        "batch": batch,
+                        "filename": [table for _, table in sources],
+                        "function_used": str(
+                            (compiler.compiled if compiler else []) + list(functions)
+                        ),
+                    }
+                ),
+            )
+    return counter
+
+
+@task(
+    name="write-transform-profile",
+    tags=["db-write"],
+)
+def write_transform_profile(db_creds: dict[str, str or int]) -> int:
+    """write the transform profile records of this run to workflow.transform_profile and log
+    the slowest steps
+
+    Parameters
+    ----------
+    db_creds : dict[str, str or int]
+        postgres connect credentials
+
+    Returns
+    -------
+    int
+        number of records written
+    """
+    logger = get_run_logger()
+    pgs = Postgres(db_creds)
+    with pgs.connect():
+        result = tasklib.flush_workflow_records(pgs, [("workflow", "transform_profile")])
+        slowest = pgs.query_to_dataframe(
+            sql.SQL(
+                """SELECT "step", "function", sum("wall_seconds") AS "wall_seconds", sum("bytes_copied") AS "bytes_copied"
+            FROM "workflow"."transform_profile" WHERE "run_id"={run_id}
+            GROUP BY "step", "function" ORDER BY 3 DESC LIMIT 10"""
+            )
+            .format(run_id=sql.Literal(profiling.profiler.run_id))
+            .as_string(pgs.connection)
+        )
+    logger.info(f"slowest transform steps of this run:\n{slowest.to_string(index=False)}")
+    return result["workflow.transform_profile"]
+
+
+@flow(
+    name="-".join([PROJECT_NAME, "Creating-Raw-Datasets"]),
+    task_runner=SequentialTaskRunner(),
+)
+def create_raw_datasets(raw_config: dict):
+    """raw dataset stage flow
+
+    Parameters
+    ----------
+    raw_config : dict
+        yaml settings for raw dataset stage (raw_database).
+        raw_config->source_schema: schema of the ingested tables, default source_files
+    """
+    logger = get_run_logger()
+    POSTGRES_CREDENTIAL["dbname"] = PROJECT_NAME
+    source_schema = raw_config.get("source_schema", "source_files")
+    raw_schema = raw_config.get("schema", "raw_datasets")
+    if TRANSFORM_PROFILE and not profiling.is_enabled():
+        profiling.enable(
+            None if TRANSFORM_PROFILE is True else TRANSFORM_PROFILE,
+            memory=TRANSFORM_PROFILE_MEMORY,
+        )
+    set_raw_datasets_database(POSTGRES_CREDENTIAL, raw_schema)
+    datasets = get_dataset_tables(
+        POSTGRES_CREDENTIAL, source_schema, raw_config["datasets"]
+    )
+    for dataset, dataset_config in datasets.items():
+        if dataset_batches(dataset_config):
+            create_raw_dataset(
+                POSTGRES_CREDENTIAL, source_schema, raw_schema, dataset, dataset_config
             )
-            df=pgs.query_to_dataframe(query)
-            if "functions" in dataset_config[batch] and dataset_config[batch]["functions"]:
-                for func in dataset_config[batch]["functions"]:
-                    df=df.getattr(functions, key)(
-                                    function_input,
-                                    func_config,
-                                    stage="TransformStageOne",
-                                    data_key=self.data_key,
-                                ))
+        else:
+            logger.info(f"{dataset}: no batch configured, skipped")
+    if profiling.is_enabled():
+        write_transform_profile(POSTGRES_CREDENTIAL)
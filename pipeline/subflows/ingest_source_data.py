@@ -1,18 +1,30 @@
-from this import d
-from yclib.datastore import Postgres
+from yclib.datastore import Postgres, pool_stats
 from pathlib import Path
-from yclib.core import ExcelFileHandler, FileFilter
+from yclib.core import (
+    DatasetClassifier,
+    DecryptedFileCache,
+    ExcelFileHandler,
+    FileFilter,
+    MemoryEstimator,
+    SourceManifest,
+)
 from _settings import (
     PROJECT_NAME,
     AVAILABLE_MEMORY,
+    MEMORY_BUDGET_RATIO,
     CONCURRENCY_LIMIT,
     POSTGRES_CREDENTIAL,
+    DECRYPT_CACHE_FOLDER,
+    DECRYPT_CACHE_SIZE,
+    JOURNAL_FOLDER,
+    POOL_SIZE,
 )
 from prefect import flow, task, get_run_logger, unmapped
-from prefect.tasks import task_input_hash
 from prefect.task_runners import SequentialTaskRunner
 import re
+import asyncio
 import pandas as pd
+from typing import Optional
 import tasklib
 
 
@@ -20,20 +32,34 @@ import tasklib
     name="get-source-file-paths",
     tags=["pre-setup"],
 )
-def get_files_path(path: Path) -> list[Path]:
+def get_files_path(
+    path: Path,
+    filepath_exclude: Optional[list[str]] = None,
+    cache_path: Optional[str] = None,
+) -> list[Path]:
     """get file path list per yaml -> source_files_path
 
     Parameters
     ----------
     path : Path
         a folder path which will be walked through
+    filepath_exclude : Optional[list[str]]
+        directories whose path contains any of these keywords are not walked through
+    cache_path : Optional[str]
+        yaml -> discovery_cache. json file caching directory listings between runs
 
     Returns
     -------
     list[Path]
         A list of pathlib.Path objects of all excel/csv/pickle files under argument:path
     """
-    filelist = FileFilter.get_filepath_list(path)
+    logger = get_run_logger()
+    filelist = FileFilter.get_filepath_list(
+        path,
+        filepath_exclude=filepath_exclude,
+        cache_path=cache_path,
+        log=logger.warning,
+    )
     if not filelist:
         raise ValueError(f'No file found under path "{path}"')
     else:
@@ -62,12 +88,30 @@ def get_file_reading_config(
         a dictionary with file path as keys and [read settings, dataset] as values
     """
     final_dict = dict()
+    logger = get_run_logger()
+
+    classifier = DatasetClassifier(
+        {
+            file_cat: read_config["file_filters"]
+            for file_cat, read_config in read_settings.items()
+            if not read_config["absolute_path_list"]
+        }
+    )
+    classified = classifier.classify(filepath_list)
+    for filepath, datasets in classifier.ambiguous.items():
+        logger.warning(
+            f"file {filepath.name} matches datasets {datasets}, it will be read in as {datasets[-1]}"
+        )
+    if classifier.unmatched:
+        logger.info(
+            f"{len(classifier.unmatched)} file(s) do not match any dataset: {[fp.name for fp in classifier.unmatched]}"
+        )
 
     for file_cat, read_config in read_settings.items():
         filtered_path_list = (
-            FileFilter.filelist_filter(filepath_list, **read_config["file_filters"])
+            classified[file_cat]
             if not read_config["absolute_path_list"]
-            else read_config["absolute_path_list"]
+            else FileFilter.absolute_filepath_list(read_config["absolute_path_list"])
         )
 
         if not filtered_path_list:
@@ -80,7 +124,6 @@ def get_file_reading_config(
         else:
             for filepath in filtered_path_list:
                 final_dict[filepath] = [read_config["read_file"], file_cat]
-                logger = get_run_logger()
                 logger.info(
                     "{dataset} | file {filepath} will be read in with pandas attributes: {args}".format(
                         dataset=file_cat,
@@ -91,17 +134,108 @@ def get_file_reading_config(
     return final_dict
 
 
+@task(name="filter-unchanged-files", tags=["pre-setup"])
+def filter_unchanged_files(
+    file_reading_config_dict: dict[Path, list],
+    db_creds: dict[str, str or int],
+) -> tuple[dict[Path, list], list[str], pd.DataFrame]:
+    """drop files already ingested with the same content according to workflow.source_file_manifest.
+    nothing is changed in the database, the tables to replace are dropped by task: drop_replaced_tables
+
+    Parameters
+    ----------
+    file_reading_config_dict : dict[Path, list]
+        file_reading_config_dict generated from task: get_file_reading_config.
+        path as keys and [read settings, dataset] as values
+    db_creds : dict[str, str or int]
+        postgres db connect credentials
+
+    Returns
+    -------
+    tuple[dict[Path, list], list[str], pd.DataFrame]
+        new or changed files only, values are extended to [read settings, dataset, content hash],
+        tables to drop before ingesting,
+        manifest records to add for unchanged files found at a new path
+    """
+    logger = get_run_logger()
+    postgres = Postgres(db_creds)
+    with postgres.connect():
+        manifest = SourceManifest(
+            postgres.query_to_dataframe(
+                'SELECT * FROM "workflow"."source_file_manifest"'
+            )
+        )
+    to_ingest, unchanged, replaced, relocated = manifest.plan(
+        list(file_reading_config_dict.keys())
+    )
+    logger.info(
+        f"{len(to_ingest)} new or changed file(s) will be ingested, {len(unchanged)} unchanged file(s) are skipped"
+    )
+    files = {
+        filepath: file_reading_config_dict[filepath] + [content_hash]
+        for filepath, content_hash in to_ingest.items()
+    }
+    return files, replaced, relocated
+
+
+@task(name="drop-replaced-tables", tags=["db-setup"])
+def drop_replaced_tables(
+    db_creds: dict[str, str or int],
+    schema: str,
+    replaced: list[str],
+    relocated: pd.DataFrame,
+):
+    """drop the tables replaced by new or changed files with their manifest and column type
+    records, and record unchanged files found at a new path
+
+    Parameters
+    ----------
+    db_creds : dict[str, str or int]
+        postgres db connect credentials
+    schema : str
+        yaml->ingest_source_data->schema
+    replaced : list[str]
+        tables to drop from task: filter_unchanged_files
+    relocated : pd.DataFrame
+        manifest records to add from task: filter_unchanged_files
+    """
+    logger = get_run_logger()
+    postgres = Postgres(db_creds)
+    with postgres.connect():
+        for table in replaced:
+            logger.info(postgres.drop_table(schema, table, cascade=True))
+        if replaced:
+            postgres.execute(
+                'DELETE FROM "workflow"."source_file_manifest" WHERE "table_name" = ANY(%s)',
+                (replaced,),
+            )
+            postgres.execute(
+                'DELETE FROM "metadata"."source_column_types" WHERE "schema" = %s AND "table_name" = ANY(%s)',
+                (schema, replaced),
+            )
+        if not relocated.empty:
+            postgres.dataframe_insert_to_table(
+                schema="workflow", table="source_file_manifest", df=relocated
+            )
+
+
 @task(name="concurrency-setup", tags=["pre-setup"])
 def concurrency_setup(
-    file_reading_config_dict: dict[Path, dict], check_mem: bool = False
+    file_reading_config_dict: dict[Path, list],
+    db_creds: dict[str, str or int],
+    check_mem: bool = False,
 ) -> list[dict]:
-    """cut a list of files to sublists by total memory size
+    """cut files into waves of at most CONCURRENCY_LIMIT files whose estimated in-memory footprint
+    fits in the memory budget (AVAILABLE_MEMORY * MEMORY_BUDGET_RATIO). Largest files are scheduled first.
+    Estimates are calibrated with estimated vs. actual memory recorded in workflow.ingest_memory_profile
 
     Parameters
     ----------
-    file_reading_config_dict : dict[Path, dict]
-        file_reading_config_dict generated from task: get_file_reading_config.
-        path as keys and pandas attributes dict as values
+    file_reading_config_dict : dict[Path, list]
+        file_reading_config_dict generated from task: filter_unchanged_files.
+        path as keys and [read settings, dataset, content hash] as values
+    db_creds : dict[str, str or int]
+        postgres db connect credentials
     check_mem: bool
         True if there is a need to check available memory
         False if not
@@ -109,38 +243,47 @@ def concurrency_setup(
     Returns
     -------
     list[dict]
-       a list of sub file_reading_config_dict cut by concurrency limit and available memory
+       a list of sub file_reading_config_dict cut by concurrency limit and available memory.
+       values are extended to [read settings, dataset, content hash, estimated memory], the
+       estimate without the correction of the history, as recorded against the actual memory
     """
-
-    def _check_memory_switch(check_dict, check_mem=False):
-        return (
-            (
-                True
-                if sum([fp.stat().st_size for fp in check_dict]) < AVAILABLE_MEMORY
-                else False
+    logger = get_run_logger()
+    postgres = Postgres(db_creds)
+    with postgres.connect():
+        history = (
+            postgres.query_to_dataframe(
+                'SELECT "suffix", "estimated_memory", "actual_memory" FROM "workflow"."ingest_memory_profile"'
             )
-            if check_mem
-            else True
+            if postgres.inspect_table_existance("workflow", "ingest_memory_profile")
+            else None
         )
-
-    list_of_dict = []
-    sub_dict = {}
-    for k, v in file_reading_config_dict.items():
-        if len(sub_dict) < CONCURRENCY_LIMIT and _check_memory_switch(
-            sub_dict, check_mem
-        ):
-            sub_dict[k] = v
-        else:
-            list_of_dict.append(sub_dict)
-            sub_dict = {k: v}
-    list_of_dict.append(sub_dict)
-    return list_of_dict
+    estimator = MemoryEstimator(history)
+    # recorded against the actual memory uncorrected, so the correction does not feed on itself
+    uncorrected = {
+        filepath: estimator.estimate(filepath, val[0], corrected=False)
+        for filepath, val in file_reading_config_dict.items()
+    }
+    estimates = {
+        filepath: estimator.correct(filepath, estimated)
+        for filepath, estimated in uncorrected.items()
+    }
+    budget = AVAILABLE_MEMORY * MEMORY_BUDGET_RATIO if check_mem else float("inf")
+    waves = MemoryEstimator.bin_pack(estimates, budget, CONCURRENCY_LIMIT)
+    for i, wave in enumerate(waves):
+        logger.info(
+            f"wave {i + 1}: {len(wave)} file(s), estimated memory {sum(estimates[fp] for fp in wave)} bytes"
+        )
+    return [
+        {
+            filepath: file_reading_config_dict[filepath] + [uncorrected[filepath]]
+            for filepath in wave
+        }
+        for wave in waves
+    ]
 
 
 @task(
     name="read-file-to-table",
-    cache_key_fn=task_input_hash,
-    # cache_expiration=timedelta(days=1),
     tags=["pandas"],
 )
 def read_file_to_table(
@@ -149,8 +292,12 @@ def read_file_to_table(
     reading_config: dict,
     db_creds: dict[str, str or int],
     schema: str,
+    content_hash: Optional[str] = None,
+    estimated_memory: Optional[int] = None,
+    decrypt_cache: Optional[DecryptedFileCache] = None,
 ):
-    """read file to pandas dataframe->create table->insert dataframe to table
+    """read file to pandas dataframe->create table->insert dataframe to table.
+    unchanged files are filtered out beforehand by task filter_unchanged_files
 
     Parameters
     ----------
@@ -158,50 +305,187 @@ def read_file_to_table(
         yaml->datasets->[dataset name]
     filepath : Path
         file path
-    read_settings : list
-        yaml->ingest_source_data->datasets->[dataset name]->[read_funcs, [dataset name]]
+    reading_config : dict
+        yaml->ingest_source_data->datasets->[dataset name]->read_file.
+        with read_file->chunksize set, the file is read and copied to postgres chunk by chunk.
+        memory is only bounded by chunksize for csv/txt files and for excel files read with a
+        streaming read_file->engine, other files are read whole and then cut into chunks.
+        csv/txt files are streamed to postgres without pandas unless read_file->raw_copy is false
+        or the pandas attributes need pandas (see CsvPassthrough.is_supported)
     db_creds : dict[str, str or int]
         postgres db connect credentials
     schema : str
         yaml->ingest_source_data->schema
+    content_hash : Optional[str]
+        file content hash, recorded in workflow.source_file_manifest
+    estimated_memory : Optional[int]
+        memory estimated by concurrency_setup, recorded with the actual memory used
+    decrypt_cache : Optional[DecryptedFileCache]
+        cache of decrypted password protected workbooks
 
     """
     logger = get_run_logger()
-    df_dict = ExcelFileHandler.read_file(
-        ExcelFileHandler.decrypted_file(filepath, reading_config["password"])
-        if reading_config["password"]
-        else filepath,
-        reading_config["pandas_attributes"],
-    )
+    postgres = Postgres(db_creds)
+    with postgres.connect():
+        tables, actual_memory = tasklib.load_file_to_table(
+            postgres,
+            dataset,
+            filepath,
+            reading_config,
+            schema,
+            logger,
+            content_hash,
+            decrypt_cache,
+        )
+        tasklib.record_manifest(postgres, filepath, dataset, content_hash, tables)
+        tasklib.record_memory_profile(
+            postgres, filepath, estimated_memory, actual_memory
+        )
+    return len(tables)
 
-    logger.info(
-        f"{Path(filepath).name} with {len(df_dict.keys())} dataframe(s) have been read into pandas.DataFrames"
+
+@task(
+    name="read-files-to-table-in-process-pool",
+    tags=["pandas"],
+)
+def read_files_to_table_in_process_pool(
+    file_groups: list[dict[Path, list]],
+    db_creds: dict[str, str or int],
+    schema: str,
+    decrypt_cache: Optional[DecryptedFileCache] = None,
+) -> int:
+    """read files to tables in a pool of CONCURRENCY_LIMIT worker processes,
+    each holding its own postgres connection
+
+    Parameters
+    ----------
+    file_groups : list[dict[Path, list]]
+        output of task concurrency_setup
+    db_creds : dict[str, str or int]
+        postgres db connect credentials
+    schema : str
+        yaml->ingest_source_data->schema
+    decrypt_cache : Optional[DecryptedFileCache]
+        cache of decrypted password protected workbooks, shared by the workers
+
+    Returns
+    -------
+    int
+        number of tables ingested
+    """
+    logger = get_run_logger()
+    counter = 0
+    failed = []
+    for filepath, tables, messages in tasklib.load_files_in_process_pool(
+        file_groups,
+        db_creds,
+        schema,
+        CONCURRENCY_LIMIT,
+        decrypt_cache,
+        JOURNAL_FOLDER,
+    ):
+        for level, message in messages:
+            getattr(logger, level)(message)
+        if tables is None:
+            failed.append(Path(filepath).name)
+        else:
+            counter = counter + len(tables)
+    if failed:
+        raise RuntimeError(f"{len(failed)} file(s) failed to be ingested: {failed}")
+    return counter
+
+
+@task(
+    name="read-files-to-table-async",
+    tags=["pandas"],
+)
+def read_files_to_table_async(
+    file_groups: list[dict[Path, list]],
+    db_creds: dict[str, str or int],
+    schema: str,
+    decrypt_cache: Optional[DecryptedFileCache] = None,
+) -> int:
+    """read files to tables on one event loop, CONCURRENCY_LIMIT files at a time, overlapping
+    parsing (in threads) with COPY (see tasklib.load_files_async)
+
+    Parameters
+    ----------
+    file_groups : list[dict[Path, list]]
+        output of task concurrency_setup
+    db_creds : dict[str, str or int]
+        postgres db connect credentials
+    schema : str
+        yaml->ingest_source_data->schema
+    decrypt_cache : Optional[DecryptedFileCache]
+        cache of decrypted password protected workbooks
+
+    Returns
+    -------
+    int
+        number of tables ingested
+    """
+    logger = get_run_logger()
+    counter = 0
+    failed = []
+    results = asyncio.run(
+        tasklib.load_files_async(
+            file_groups, db_creds, schema, CONCURRENCY_LIMIT, decrypt_cache
+        )
     )
+    file_configs = {
+        filepath: file_config
+        for file_group in file_groups
+        for filepath, file_config in file_group.items()
+    }
     postgres = Postgres(db_creds)
     with postgres.connect():
-        for key, val in df_dict.items():
-            table = re.sub(r"[^a-zA-Z0-9]+", "_", key)
-            postgres.create_table(
-                schema=schema,
-                table=table,
-                column_with_dtype={col: "text" for col in val.columns},
-            )
-            postgres.dataframe_insert_to_table(schema=schema, table=table, df=val)
-            logger.info(
-                f"{schema}.{table}: total {str(val.shape[0])} rows x {str(val.shape[1])} columns have been ingested"
-            )
-            postgres.dataframe_insert_to_table(
-                schema="workflow",
-                table="source_file_reading_config",
-                df=pd.DataFrame(
-                    {
-                        "dataset": [dataset],
-                        "filename": [Path(filepath).name],
-                        "pandas_attributes": [str(reading_config["pandas_attributes"])],
-                    }
-                ),
+        for filepath, tables, messages, actual_memory in results:
+            for level, message in messages:
+                getattr(logger, level)(message)
+            if tables is None:
+                failed.append(Path(filepath).name)
+                continue
+            _, dataset, content_hash, estimated_memory = file_configs[filepath]
+            tasklib.record_manifest(postgres, filepath, dataset, content_hash, tables)
+            tasklib.record_memory_profile(
+                postgres, filepath, estimated_memory, actual_memory
             )
-    return len(df_dict.keys())
+            counter = counter + len(tables)
+    if failed:
+        raise RuntimeError(f"{len(failed)} file(s) failed to be ingested: {failed}")
+    return counter
+
+
+@task(name="flush-workflow-records", tags=["db-setup"])
+def flush_workflow_records(db_creds: dict[str, str or int]) -> dict[str, int]:
+    """write buffered workflow records of this process, and records left in the journals of
+    worker processes or of a previous run that crashed, to postgres
+
+    Parameters
+    ----------
+    db_creds : dict[str, str or int]
+        postgres db connect credentials
+
+    Returns
+    -------
+    dict[str, int]
+        schema.table as keys and number of records written as values
+    """
+    logger = get_run_logger()
+    postgres = Postgres(db_creds)
+    with postgres.connect():
+        result = tasklib.flush_workflow_records(
+            postgres,
+            [
+                ("workflow", "source_file_reading_config"),
+                ("workflow", "ingest_memory_profile"),
+                ("metadata", "source_column_types"),
+            ],
+        )
+    for table, counter in result.items():
+        if counter:
+            logger.info(f"{counter} buffered record(s) are written to {table}")
+    return result
 
 
 @flow(
@@ -216,7 +500,10 @@ def ingest_source_data(ingest_config: dict):
     pool : SimpleConnectionPool
         connected postgres SimpleConnectionPool
     ingest_config : dict
-        yaml settings for ingest stage (ingest_source_data)
+        yaml settings for ingest stage (ingest_source_data).
+        ingest_config->execution: process reads files in a pool of CONCURRENCY_LIMIT processes,
+        async overlaps parsing and COPY of CONCURRENCY_LIMIT files on an event loop,
+        default sequential
     """
     logger = get_run_logger()
     logger.info(
@@ -228,6 +515,8 @@ def ingest_source_data(ingest_config: dict):
 ---------------------------------------------------------------------------------------------------------------------------------------------
         """
     )
+    # tasks of this flow borrow their connections instead of connecting per task
+    Postgres.configure_pool(POOL_SIZE)
     tasklib.create_databse(POSTGRES_CREDENTIAL, PROJECT_NAME)
     POSTGRES_CREDENTIAL["dbname"] = PROJECT_NAME
     tasklib.create_schema(
@@ -241,27 +530,128 @@ def ingest_source_data(ingest_config: dict):
         "source_file_reading_config",
         {"dataset": "text", "filename": "text", "pandas_attributes": "text"},
     )
-    filepath_list = get_files_path(ingest_config.get("source_files_path"))
+    tasklib.create_table(
+        POSTGRES_CREDENTIAL,
+        ingest_config.get("workflow_schema", "workflow"),
+        "source_file_manifest",
+        SourceManifest.table_structure,
+    )
+    tasklib.create_table(
+        POSTGRES_CREDENTIAL,
+        ingest_config.get("workflow_schema", "workflow"),
+        "ingest_memory_profile",
+        {
+            "filename": "text",
+            "suffix": "text",
+            "file_size": "bigint",
+            "estimated_memory": "bigint",
+            "actual_memory": "bigint",
+            "recorded_at": "timestamp default now()",
+        },
+    )
+    tasklib.create_table(
+        POSTGRES_CREDENTIAL,
+        ingest_config.get("workflow_schema", "workflow"),
+        "source_file_lineage",
+        tasklib.SourceLineage.table_structure,
+    )
+    # column types of typed source tables (read_file->typed), for later stages to skip casting
+    tasklib.create_schema(POSTGRES_CREDENTIAL, "metadata")
+    tasklib.create_table(
+        POSTGRES_CREDENTIAL,
+        "metadata",
+        "source_column_types",
+        {
+            "schema": "text",
+            "table_name": "text",
+            "column_name": "text",
+            "data_type": "text",
+            "downgraded": "boolean",
+            "recorded_at": "timestamp default now()",
+        },
+    )
+    tasklib.configure_workflow_records(JOURNAL_FOLDER)
+    flush_workflow_records(POSTGRES_CREDENTIAL)
+    # a directory can only be skipped during discovery if every dataset excludes it
+    discovered_datasets = [
+        read_config
+        for read_config in ingest_config["datasets"].values()
+        if not read_config["absolute_path_list"]
+    ]
+    filepath_exclude = (
+        set.intersection(
+            *[
+                {
+                    kw.lower()
+                    for kw in read_config["file_filters"].get(
+                        "filepath_exclude", ["archive", "delete"]
+                    )
+                    or []
+                }
+                for read_config in discovered_datasets
+            ]
+        )
+        if discovered_datasets
+        else set()
+    )
+    filepath_list = get_files_path(
+        ingest_config.get("source_files_path"),
+        sorted(filepath_exclude),
+        ingest_config.get("discovery_cache"),
+    )
     file_reading_config_dict = get_file_reading_config(
         filepath_list, ingest_config["datasets"]
     )
-    file_after_setup = concurrency_setup(file_reading_config_dict, check_mem=True)
+    file_to_ingest, replaced, relocated = filter_unchanged_files(
+        file_reading_config_dict, POSTGRES_CREDENTIAL
+    )
+    file_after_setup = concurrency_setup(
+        file_to_ingest, POSTGRES_CREDENTIAL, check_mem=True
+    )
+    drop_replaced_tables(
+        POSTGRES_CREDENTIAL,
+        ingest_config.get("schema", "source_files"),
+        replaced,
+        relocated,
+    )
+    decrypt_cache = DecryptedFileCache(DECRYPT_CACHE_FOLDER, DECRYPT_CACHE_SIZE)
 
-    counter = 0
-    for sub_dict in file_after_setup:
-        result = read_file_to_table.map(
-            [i[1] for i in sub_dict.values()],
-            list(sub_dict.keys()),
-            [i[0] for i in sub_dict.values()],
-            unmapped(POSTGRES_CREDENTIAL),
-            unmapped(ingest_config.get("schema", "source_files")),
+    if ingest_config.get("execution", "sequential") == "process":
+        counter = read_files_to_table_in_process_pool(
+            file_after_setup,
+            POSTGRES_CREDENTIAL,
+            ingest_config.get("schema", "source_files"),
+            decrypt_cache,
+        )
+    elif ingest_config.get("execution", "sequential") == "async":
+        counter = read_files_to_table_async(
+            file_after_setup,
+            POSTGRES_CREDENTIAL,
+            ingest_config.get("schema", "source_files"),
+            decrypt_cache,
         )
-        counter = counter + len(result)
+    else:
+        counter = 0
+        for sub_dict in file_after_setup:
+            result = read_file_to_table.map(
+                [i[1] for i in sub_dict.values()],
+                list(sub_dict.keys()),
+                [i[0] for i in sub_dict.values()],
+                unmapped(POSTGRES_CREDENTIAL),
+                unmapped(ingest_config.get("schema", "source_files")),
+                [i[2] for i in sub_dict.values()],
+                [i[3] for i in sub_dict.values()],
+                unmapped(decrypt_cache),
+            )
+            counter = counter + len(result)
+    flush_workflow_records(POSTGRES_CREDENTIAL)
+    for database, stats in pool_stats().items():
+        logger.info(f"connection pool {database}: {stats}")
     logger.info(
         f"""
 -----------------------------------------------------------------------------------------------------------------------------------------------
                                         {PROJECT_NAME} Ingest Stage Finished
-                                            Source files: total {len(file_reading_config_dict.keys())} files
+                                            Source files: total {len(file_reading_config_dict.keys())} files, {len(file_to_ingest)} new or changed
                                             Database: {PROJECT_NAME}
                                                 |-Schema: workflow_info
                                                     |--table: source_file_reading_config
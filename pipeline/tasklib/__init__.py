@@ -1 +1,4 @@
 from .postgres_task import *
+from .ingest_file import *
+from .workflow_records import *
+from .async_ingest import *
@@ -0,0 +1,300 @@
+from yclib.datastore import AsyncPostgres
+from yclib.core import (
+    CsvPassthrough,
+    DecryptedFileCache,
+    ExcelFileHandler,
+    PeakMemory,
+    SourceManifest,
+)
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional
+from .ingest_file import CollectedLog
+import threading
+import asyncio
+import re
+import pandas as pd
+
+
+def _produce_frames(
+    loop: asyncio.AbstractEventLoop,
+    queue: asyncio.Queue,
+    stop: threading.Event,
+    filepath: Path,
+    reading_config: dict,
+    content_hash: Optional[str],
+    decrypt_cache: Optional[DecryptedFileCache],
+):
+    """parse a file in an executor thread and put (key, dataframe) on the queue, then None.
+    Blocks while the queue is full, so at most maxsize parsed frames wait for COPY"""
+
+    def _put(item) -> bool:
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=1)
+                return True
+            except TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+
+    try:
+        pandas_attributes = reading_config["pandas_attributes"]
+        engine = reading_config.get("engine", "pandas")
+        with (
+            (decrypt_cache or DecryptedFileCache()).open(
+                filepath, reading_config["password"], content_hash
+            )
+            if reading_config["password"]
+            else nullcontext(filepath)
+        ) as source:
+            if reading_config.get("chunksize"):
+                frames = ExcelFileHandler.read_file_in_chunks(
+                    source, pandas_attributes, reading_config["chunksize"], engine
+                )
+            else:
+                frames = ExcelFileHandler.read_file(
+                    source, pandas_attributes, engine
+                ).items()
+            for item in frames:
+                if not _put(item):
+                    return
+    finally:
+        if not stop.is_set():
+            _put(None)
+
+
+def _streams_raw_csv(filepath: Path, reading_config: dict) -> bool:
+    """the file is streamed to postgres as raw csv, without pandas"""
+    return (
+        reading_config.get("raw_copy", True)
+        and not reading_config["password"]
+        and CsvPassthrough.is_supported(filepath, reading_config["pandas_attributes"])
+    )
+
+
+async def load_file_to_table_async(
+    apg: AsyncPostgres,
+    dataset: str,
+    filepath: Path,
+    reading_config: dict,
+    schema: str,
+    logger,
+    executor: ThreadPoolExecutor,
+    content_hash: Optional[str] = None,
+    decrypt_cache: Optional[DecryptedFileCache] = None,
+    queue_size: int = 2,
+) -> dict[str, list]:
+    """read a file->create table(s)->insert data->write lineage to workflow.source_file_reading_config,
+    with parsing and COPY overlapped: the file is parsed (chunk by chunk with read_file->chunksize)
+    in an executor thread while the previous frames are copied to postgres, through a queue of
+    queue_size frames. Raw csv files are streamed as in load_file_to_table.
+
+    Unlike load_file_to_table, compact lineage, typed tables and binary COPY are not supported:
+    the file is loaded as text with a 'Source' column.
+
+    Parameters
+    ----------
+    apg : AsyncPostgres
+        connected AsyncPostgres object
+    dataset:  str
+        yaml->datasets->[dataset name]
+    filepath : Path
+        file path
+    reading_config : dict
+        yaml->ingest_source_data->datasets->[dataset name]->read_file
+    schema : str
+        yaml->ingest_source_data->schema
+    logger :
+        prefect run logger or CollectedLog
+    executor : ThreadPoolExecutor
+        threads parsing files
+    content_hash : Optional[str], optional
+        file content hash, keys the decrypted copy of a protected workbook. with it, every
+        table is recorded as loading in workflow.source_file_manifest before data is copied
+        into it (see tasklib.record_manifest). by default None
+    decrypt_cache : Optional[DecryptedFileCache], optional
+        cache of decrypted workbooks, by default a DecryptedFileCache with default settings
+    queue_size : int, optional
+        parsed frames waiting for COPY at most, by default 2
+
+    Returns
+    -------
+    dict[str, list]
+        table name as keys and [rows, columns] ingested as values
+    """
+    pandas_attributes = reading_config["pandas_attributes"]
+    tables = {}
+    loop = asyncio.get_running_loop()
+
+    async def _record_loading(table: str, n_columns: int):
+        if content_hash is not None:
+            await apg.dataframe_insert_to_table(
+                "workflow",
+                "source_file_manifest",
+                SourceManifest.file_records(
+                    filepath,
+                    dataset,
+                    content_hash,
+                    {table: [None, n_columns]},
+                    status="loading",
+                ),
+            )
+
+    if _streams_raw_csv(filepath, reading_config):
+        with CsvPassthrough(filepath, pandas_attributes) as stream:
+            table = re.sub(r"[^a-zA-Z0-9]+", "_", Path(filepath).stem)
+            await apg.create_table(
+                schema=schema,
+                table=table,
+                column_with_dtype={col: "text" for col in stream.columns},
+            )
+            await _record_loading(table, len(stream.columns))
+            await apg.stream_insert_to_table(
+                schema, table, stream, stream.columns, stream.sep
+            )
+            tables[table] = [stream.row_number, len(stream.columns)]
+            if stream.bad_lines:
+                logger.warning(
+                    f"{Path(filepath).name}: {stream.bad_lines} bad line(s) skipped"
+                )
+        logger.info(f"{Path(filepath).name} has been streamed to postgres as raw csv")
+    else:
+        queue = asyncio.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        producer = loop.run_in_executor(
+            executor,
+            _produce_frames,
+            loop,
+            queue,
+            stop,
+            filepath,
+            reading_config,
+            content_hash,
+            decrypt_cache,
+        )
+        try:
+            while (item := await queue.get()) is not None:
+                key, val = item
+                table = re.sub(r"[^a-zA-Z0-9]+", "_", key)
+                if table not in tables:
+                    await apg.create_table(
+                        schema=schema,
+                        table=table,
+                        column_with_dtype={col: "text" for col in val.columns},
+                    )
+                    await _record_loading(table, val.shape[1])
+                    tables[table] = [0, val.shape[1]]
+                await apg.dataframe_insert_to_table(schema, table, val)
+                tables[table][0] += val.shape[0]
+        finally:
+            # a failed COPY stops the parser instead of leaving it blocked on a full queue
+            stop.set()
+            # re-raises parser errors
+            await producer
+
+    for table, (rows, n_columns) in tables.items():
+        logger.info(
+            f"{schema}.{table}: total {str(rows)} rows x {str(n_columns)} columns have been ingested"
+        )
+    await apg.dataframe_insert_to_table(
+        "workflow",
+        "source_file_reading_config",
+        pd.DataFrame(
+            {
+                "dataset": dataset,
+                "filename": Path(filepath).name,
+                "pandas_attributes": [str(pandas_attributes)] * len(tables),
+            }
+        ),
+    )
+    return tables
+
+
+async def load_files_async(
+    file_groups: list[dict[Path, list]],
+    db_creds: dict[str, str or int],
+    schema: str,
+    max_concurrency: int,
+    decrypt_cache: Optional[DecryptedFileCache] = None,
+) -> list[tuple[Path, dict[str, list], list[tuple[str, str]]]]:
+    """load files to postgres on one event loop, max_concurrency files at a time. Each file is
+    parsed in a thread while its frames are copied over a pool of max_concurrency connections,
+    so throughput is bound by the slower of parsing and COPY rather than their sum.
+    Groups are loaded one after another, so the memory bound set by concurrency_setup still holds.
+
+    Files of a group share one process, so the peak memory (see PeakMemory) is measured per
+    group and every file gets a share proportional to its estimated memory. Files streamed as
+    raw csv get no actual memory, as in load_file_to_table.
+
+    Parameters
+    ----------
+    file_groups : list[dict[Path, list]]
+        output of task concurrency_setup. path as keys and [read settings, dataset, content hash, estimated memory] as values
+    db_creds : dict[str, str or int]
+        postgres db connect credentials
+    schema : str
+        yaml->ingest_source_data->schema
+    max_concurrency : int
+        files loaded at the same time, and size of the connection pool
+    decrypt_cache : Optional[DecryptedFileCache], optional
+        cache of decrypted workbooks, by default None (default settings)
+
+    Returns
+    -------
+    list[tuple[Path, dict[str, list], list[tuple[str, str]], Optional[int]]]
+        (file path, tables ingested or None on failure, [(log level, message)], share of the
+        peak memory of its group in bytes or None) per file
+    """
+    apg = AsyncPostgres(db_creds, pool_size=max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _load(filepath, reading_config, dataset, content_hash=None, *_):
+        logger = CollectedLog()
+        async with semaphore:
+            try:
+                tables = await load_file_to_table_async(
+                    apg,
+                    dataset,
+                    filepath,
+                    reading_config,
+                    schema,
+                    logger,
+                    executor,
+                    content_hash,
+                    decrypt_cache,
+                )
+            except Exception as e:
+                logger.messages.append(("error", f"{Path(filepath).name} failed: {e!r}"))
+                tables = None
+        return filepath, tables, logger.messages
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        async with apg.connect():
+            for file_group in file_groups:
+                with PeakMemory() as measured:
+                    loaded = await asyncio.gather(
+                        *[
+                            _load(filepath, *file_config)
+                            for filepath, file_config in file_group.items()
+                        ]
+                    )
+                estimates = {
+                    filepath: file_config[3] if len(file_config) > 3 else None
+                    for filepath, file_config in file_group.items()
+                }
+                total = sum(filter(None, estimates.values()))
+                for filepath, tables, messages in loaded:
+                    share = None
+                    if (
+                        measured.bytes is not None
+                        and total
+                        and estimates[filepath]
+                        and not _streams_raw_csv(filepath, file_group[filepath][0])
+                    ):
+                        share = int(measured.bytes * estimates[filepath] / total)
+                    results.append((filepath, tables, messages, share))
+    return results
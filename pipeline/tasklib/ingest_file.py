@@ -0,0 +1,522 @@
+from yclib.datastore import ConnectionStatus, Postgres
+from yclib.core import (
+    CsvPassthrough,
+    DecryptedFileCache,
+    ExcelFileHandler,
+    PeakMemory,
+    SourceManifest,
+    TypeInference,
+)
+from psycopg2 import sql
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Iterator, Optional
+from .workflow_records import configure_workflow_records, workflow_record_writer
+import multiprocessing
+import atexit
+import re
+import pandas as pd
+
+
+class CollectedLog:
+    """logger stand-in for worker processes. Messages are collected and replayed
+    by the flow's run logger in the parent process"""
+
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message: str):
+        self.messages.append(("info", message))
+
+    def warning(self, message: str):
+        self.messages.append(("warning", message))
+
+
+class SourceLineage:
+    """resolve lineage prefixes (file stem, or file stem + sheet name) to the integer
+    source_file_id of workflow.source_file_lineage, registering new prefixes on first use.
+    Used as lineage_id by ExcelFileHandler in compact lineage mode"""
+
+    table_structure = {
+        "source_file_id": "serial primary key",
+        "prefix": "text unique",
+        "dataset": "text",
+        "filename": "text",
+        "created_at": "timestamp default now()",
+    }
+
+    def __init__(self, postgres: Postgres, dataset: str, filepath: Path):
+        self.postgres = postgres
+        self.dataset = dataset
+        self.filename = Path(filepath).name
+        self.ids = {}
+
+    def __call__(self, prefix: str) -> int:
+        if prefix not in self.ids:
+            self.ids[prefix] = self.postgres.execute_fetchone(
+                """INSERT INTO "workflow"."source_file_lineage" ("prefix", "dataset", "filename")
+                VALUES (%s, %s, %s)
+                ON CONFLICT ("prefix") DO UPDATE SET "dataset" = EXCLUDED."dataset", "filename" = EXCLUDED."filename"
+                RETURNING "source_file_id";""",
+                (prefix, self.dataset, self.filename),
+            )[0]
+        return self.ids[prefix]
+
+
+def create_lineage_view(postgres: Postgres, schema: str, table: str, columns: list):
+    """create view [schema]_view.[table] showing a compact lineage table with the readable
+    'Source' column (prefix:row:N) in place of source_file_id and source_row
+
+    Parameters
+    ----------
+    postgres : Postgres
+        connected Postgres object
+    schema : str
+        schema of the table
+    table : str
+        table name
+    columns : list
+        columns of the table
+    """
+    postgres.create_schema(f"{schema}_view")
+    view = sql.SQL("{schema}.{table}").format(
+        schema=sql.Identifier(f"{schema}_view"), table=sql.Identifier(table)
+    )
+    postgres.execute(sql.SQL("DROP VIEW IF EXISTS {view}").format(view=view))
+    postgres.execute(
+        sql.SQL(
+            """CREATE VIEW {view} AS
+            SELECT {columns}, l."prefix" || ':row:' || t."source_row" AS "Source"
+            FROM {schema}.{table} t
+            LEFT JOIN "workflow"."source_file_lineage" l ON l."source_file_id" = t."source_file_id";"""
+        ).format(
+            view=view,
+            columns=sql.SQL(",").join(
+                sql.SQL("t.{}").format(sql.Identifier(col))
+                for col in columns
+                if col not in ExcelFileHandler.compact_lineage_columns
+            ),
+            schema=sql.Identifier(schema),
+            table=sql.Identifier(table),
+        )
+    )
+
+
+def load_file_to_table(
+    postgres: Postgres,
+    dataset: str,
+    filepath: Path,
+    reading_config: dict,
+    schema: str,
+    logger,
+    content_hash: Optional[str] = None,
+    decrypt_cache: Optional[DecryptedFileCache] = None,
+) -> tuple[dict[str, list], Optional[int]]:
+    """read a file->create table(s)->insert data->write lineage to workflow.source_file_reading_config
+    (buffered, see workflow_record_writer) on a connected Postgres object
+
+    Parameters
+    ----------
+    postgres : Postgres
+        connected Postgres object
+    dataset:  str
+        yaml->datasets->[dataset name]
+    filepath : Path
+        file path
+    reading_config : dict
+        yaml->ingest_source_data->datasets->[dataset name]->read_file.
+        optional keys: chunksize, raw_copy, engine (excel reader engine, see yclib.core.EXCEL_ENGINES),
+        lineage ('text' for a 'Source' column, default, or 'compact' for integer
+        source_file_id/source_row columns with a readable view, see create_lineage_view),
+        copy_format ('csv', default, or 'binary', see Postgres.dataframe_insert_to_table),
+        typed (infer column types instead of all text, see TypeInference; implies pandas),
+        sample_rows (rows used to infer types, default 10000)
+    schema : str
+        yaml->ingest_source_data->schema
+    logger :
+        prefect run logger, or CollectedLog in worker processes
+    content_hash : Optional[str], optional
+        file content hash, keys the decrypted copy of a protected workbook. with it, every
+        table is recorded as loading in workflow.source_file_manifest before data is copied
+        into it (see record_manifest). by default None
+    decrypt_cache : Optional[DecryptedFileCache], optional
+        cache of decrypted workbooks, by default a DecryptedFileCache with default settings
+
+    Returns
+    -------
+    tuple[dict[str, list], Optional[int]]
+        table name as keys and [rows, columns] ingested as values,
+        and the peak resident memory of the read and COPY in bytes, see PeakMemory (None when
+        streamed as raw csv or not measurable)
+    """
+    pandas_attributes = reading_config["pandas_attributes"]
+
+    # table -> [rows, columns] ingested
+    tables = {}
+    column_types = {}
+    peak_memory = None
+    lineage_id = (
+        SourceLineage(postgres, dataset, filepath)
+        if reading_config.get("lineage", "text") == "compact"
+        else None
+    )
+    # table -> inferred types and columns downgraded to text
+    inferred, downgraded = {}, {}
+    inference = (
+        TypeInference(
+            reading_config.get("sample_rows", 10000),
+            skip_columns=["Source"] + list(ExcelFileHandler.compact_lineage_columns),
+        )
+        if reading_config.get("typed")
+        else None
+    )
+    if (
+        reading_config.get("raw_copy", True)
+        and not reading_config["password"]
+        and inference is None
+        and CsvPassthrough.is_supported(filepath, pandas_attributes)
+    ):
+        with CsvPassthrough(
+            filepath,
+            pandas_attributes,
+            source_file_id=lineage_id(Path(filepath).stem) if lineage_id else None,
+        ) as stream:
+            table = re.sub(r"[^a-zA-Z0-9]+", "_", Path(filepath).stem)
+            column_types[table] = {
+                col: ExcelFileHandler.compact_lineage_columns.get(col, "text")
+                for col in stream.columns
+            }
+            postgres.create_table(
+                schema=schema,
+                table=table,
+                column_with_dtype=column_types[table],
+            )
+            record_manifest(
+                postgres,
+                filepath,
+                dataset,
+                content_hash,
+                {table: [None, len(stream.columns)]},
+                loading=True,
+            )
+            postgres.stream_insert_to_table(
+                schema=schema,
+                table=table,
+                stream=stream,
+                columns=stream.columns,
+                delimiter=stream.sep,
+            )
+            tables[table] = [stream.row_number, len(stream.columns)]
+            if stream.bad_lines:
+                logger.warning(
+                    f"{Path(filepath).name}: {stream.bad_lines} bad line(s) skipped"
+                )
+        logger.info(f"{Path(filepath).name} has been streamed to postgres as raw csv")
+    else:
+        # protected workbooks are decrypted once into the local cache and read from there
+        with PeakMemory() as measured, (
+            (decrypt_cache or DecryptedFileCache()).open(
+                filepath, reading_config["password"], content_hash
+            )
+            if reading_config["password"]
+            else nullcontext(filepath)
+        ) as source:
+            chunksize = reading_config.get("chunksize")
+            engine = reading_config.get("engine", "pandas")
+            if chunksize:
+                frames = ExcelFileHandler.read_file_in_chunks(
+                    source, pandas_attributes, chunksize, engine, lineage_id
+                )
+                logger.info(
+                    f"{Path(filepath).name} will be read in chunks of {chunksize} rows"
+                )
+            else:
+                df_dict = ExcelFileHandler.read_file(
+                    source, pandas_attributes, engine, lineage_id
+                )
+                frames = df_dict.items()
+                logger.info(
+                    f"{Path(filepath).name} with {len(df_dict.keys())} dataframe(s) have been read into pandas.DataFrames"
+                )
+
+            for key, val in frames:
+                table = re.sub(r"[^a-zA-Z0-9]+", "_", key)
+                if table not in tables:
+                    column_types[table] = {
+                        col: ExcelFileHandler.compact_lineage_columns.get(col, "text")
+                        for col in val.columns
+                    }
+                    if inference is not None:
+                        inferred[table] = inference.infer(val)
+                        downgraded[table] = []
+                        column_types[table].update(
+                            Postgres.align_datatype(column_with_dtype=inferred[table])
+                        )
+                    postgres.create_table(
+                        schema=schema,
+                        table=table,
+                        column_with_dtype=column_types[table],
+                    )
+                    record_manifest(
+                        postgres,
+                        filepath,
+                        dataset,
+                        content_hash,
+                        {table: [None, val.shape[1]]},
+                        loading=True,
+                    )
+                    tables[table] = [0, val.shape[1]]
+                if inference is not None:
+                    # types were inferred from a sample: check every chunk in full
+                    for col in inference.validate(val, inferred[table]):
+                        logger.info(
+                            f"{schema}.{table}.{col}: values do not fit type {column_types[table][col]}, changed to text"
+                        )
+                        if tables[table][0]:
+                            logger.warning(
+                                f"{schema}.{table}.{col}: {tables[table][0]} row(s) already loaded are rewritten "
+                                f"as the postgres text of {column_types[table][col]}, not the source text"
+                            )
+                        postgres.alter_column_type(schema, table, col, "text")
+                        inferred[table][col] = "object"
+                        column_types[table][col] = "text"
+                        downgraded[table].append(col)
+                    val = TypeInference.empty_to_null(val, inferred[table])
+                postgres.dataframe_insert_to_table(
+                    schema=schema,
+                    table=table,
+                    df=val,
+                    copy_format=reading_config.get("copy_format", "csv"),
+                    column_types=column_types[table],
+                )
+                tables[table][0] += val.shape[0]
+        peak_memory = measured.bytes
+
+    for table, (rows, n_columns) in tables.items():
+        if lineage_id is not None:
+            create_lineage_view(postgres, schema, table, list(column_types[table]))
+        logger.info(
+            f"{schema}.{table}: total {str(rows)} rows x {str(n_columns)} columns have been ingested"
+        )
+    if inferred:
+        workflow_record_writer("source_column_types", "metadata").add(
+            postgres,
+            pd.DataFrame(
+                [
+                    {
+                        "schema": schema,
+                        "table_name": table,
+                        "column_name": col,
+                        "data_type": dtype,
+                        "downgraded": col in downgraded[table],
+                    }
+                    for table in inferred
+                    for col, dtype in column_types[table].items()
+                ]
+            ),
+        )
+    # lineage is journaled and written in bulk, see WorkflowRecordWriter
+    workflow_record_writer("source_file_reading_config").add(
+        postgres,
+        pd.DataFrame(
+            {
+                "dataset": dataset,
+                "filename": Path(filepath).name,
+                "pandas_attributes": [str(pandas_attributes)] * len(tables),
+            }
+        ),
+    )
+    return tables, peak_memory
+
+
+def record_manifest(
+    postgres: Postgres,
+    filepath: Path,
+    dataset: str,
+    content_hash: Optional[str],
+    tables: dict[str, list],
+    loading: bool = False,
+):
+    """write the tables of a file to workflow.source_file_manifest, as loading before data is
+    copied into them, or as ingested once the whole file is loaded. the ingested records replace
+    the loading records of the file; tables left loading by a failed load are dropped by the
+    next SourceManifest.plan
+
+    Parameters
+    ----------
+    postgres : Postgres
+        connected Postgres object
+    filepath : Path
+        file path
+    dataset : str
+        dataset name
+    content_hash : Optional[str]
+        content hash from SourceManifest.plan. nothing is recorded without it
+    tables : dict[str, list]
+        tables returned by load_file_to_table, or the table about to be loaded
+    loading : bool, optional
+        record the tables as loading, by default False
+    """
+    if content_hash is None or not tables:
+        return
+    postgres.dataframe_insert_to_table(
+        schema="workflow",
+        table="source_file_manifest",
+        df=SourceManifest.file_records(
+            filepath,
+            dataset,
+            content_hash,
+            tables,
+            status="loading" if loading else "ingested",
+        ),
+    )
+    if not loading:
+        # after the insert: a crash in between leaves both, and the next plan reloads the file
+        postgres.execute(
+            'DELETE FROM "workflow"."source_file_manifest" WHERE "filepath" = %s AND "status" = %s',
+            (str(filepath), "loading"),
+        )
+
+
+def record_memory_profile(
+    postgres: Postgres,
+    filepath: Path,
+    estimated_memory: Optional[int],
+    actual_memory: Optional[int],
+):
+    """write estimated vs. actual memory of a file to workflow.ingest_memory_profile,
+    which calibrates MemoryEstimator in later runs
+
+    Parameters
+    ----------
+    postgres : Postgres
+        connected Postgres object
+    filepath : Path
+        file path
+    estimated_memory : Optional[int]
+        bytes estimated by MemoryEstimator, without the correction of the history
+    actual_memory : Optional[int]
+        peak bytes returned by load_file_to_table, or the share of a file in the peak of
+        files loaded together (see load_files_async)
+    """
+    if estimated_memory is None or actual_memory is None:
+        return
+    workflow_record_writer("ingest_memory_profile").add(
+        postgres,
+        pd.DataFrame(
+            {
+                "filename": [Path(filepath).name],
+                "suffix": [Path(filepath).suffix.lower()],
+                "file_size": [Path(filepath).stat().st_size],
+                "estimated_memory": [estimated_memory],
+                "actual_memory": [actual_memory],
+            }
+        ),
+    )
+
+
+# one connected Postgres object per worker process
+_worker_postgres = None
+_worker_decrypt_cache = None
+
+
+def _init_worker(
+    db_creds: dict[str, str or int],
+    decrypt_cache: Optional[DecryptedFileCache],
+    journal_folder: Optional[Path],
+):
+    global _worker_postgres, _worker_decrypt_cache
+    _worker_decrypt_cache = decrypt_cache
+    # records a worker has not flushed stay in its journal and are replayed by the flow
+    configure_workflow_records(journal_folder)
+    _worker_postgres = Postgres(db_creds)
+    connection = _worker_postgres.connect()
+    connection.__enter__()
+    atexit.register(connection.__exit__, None, None, None)
+
+
+def _worker_load_file(
+    dataset: str,
+    filepath: Path,
+    reading_config: dict,
+    schema: str,
+    content_hash: Optional[str] = None,
+    estimated_memory: Optional[int] = None,
+) -> tuple[Path, dict[str, list], list[tuple[str, str]]]:
+    logger = CollectedLog()
+    try:
+        tables, actual_memory = load_file_to_table(
+            _worker_postgres,
+            dataset,
+            filepath,
+            reading_config,
+            schema,
+            logger,
+            content_hash,
+            _worker_decrypt_cache,
+        )
+        record_manifest(_worker_postgres, filepath, dataset, content_hash, tables)
+        record_memory_profile(
+            _worker_postgres, filepath, estimated_memory, actual_memory
+        )
+    except Exception as e:
+        if _worker_postgres.status == ConnectionStatus.CONNECTED:
+            _worker_postgres.connection.rollback()
+        logger.messages.append(("error", f"{Path(filepath).name} failed: {e!r}"))
+        tables = None
+    return filepath, tables, logger.messages
+
+
+def load_files_in_process_pool(
+    file_groups: list[dict[Path, list]],
+    db_creds: dict[str, str or int],
+    schema: str,
+    max_workers: int,
+    decrypt_cache: Optional[DecryptedFileCache] = None,
+    journal_folder: Optional[Path] = None,
+) -> Iterator[tuple[Path, dict[str, list], list[tuple[str, str]]]]:
+    """load files to postgres in a pool of worker processes. Every worker holds its own
+    postgres connection for its lifetime. Groups are loaded one after another, so the memory
+    bound set by concurrency_setup still holds; files within a group run in parallel.
+
+    Parameters
+    ----------
+    file_groups : list[dict[Path, list]]
+        output of task concurrency_setup. path as keys and [read settings, dataset, content hash, estimated memory] as values
+    db_creds : dict[str, str or int]
+        postgres db connect credentials
+    schema : str
+        yaml->ingest_source_data->schema
+    max_workers : int
+        number of worker processes
+    decrypt_cache : Optional[DecryptedFileCache], optional
+        cache of decrypted workbooks shared by the workers, by default None (default settings)
+    journal_folder : Optional[Path], optional
+        journal folder of the workers' WorkflowRecordWriter, by default None (default folder)
+
+    Yields
+    ------
+    Iterator[tuple[Path, dict[str, list], list[tuple[str, str]]]]
+        (file path, tables ingested or None on failure, [(log level, message)]) per file, as files complete
+    """
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(db_creds, decrypt_cache, journal_folder),
+    ) as executor:
+        for file_group in file_groups:
+            futures = [
+                executor.submit(
+                    _worker_load_file,
+                    dataset,
+                    filepath,
+                    reading_config,
+                    schema,
+                    *extra,
+                )
+                for filepath, (reading_config, dataset, *extra) in file_group.items()
+            ]
+            for future in as_completed(futures):
+                yield future.result()
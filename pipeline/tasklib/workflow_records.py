@@ -0,0 +1,212 @@
+from yclib.datastore import Postgres
+from pathlib import Path
+from typing import Optional
+import threading
+import json
+import fcntl
+import time
+import uuid
+import os
+import pandas as pd
+
+
+class WorkflowRecordWriter:
+    """buffer records for an append-only workflow table (e.g. workflow.source_file_reading_config)
+    and write them with one COPY and one commit per flush instead of one per record.
+
+    Records are flushed when max_records are buffered, when max_seconds have passed since the
+    last flush, and at the end of the flow (see flush_workflow_records).
+    Every record is appended to a local JSONL journal (fsynced) before add returns, and the
+    journal is only truncated after the flush is committed. Journals left behind by a crashed
+    run or by worker processes are replayed into postgres by WorkflowRecordWriter.replay,
+    so no record is lost; a crash between commit and truncate can replay a batch twice.
+    """
+
+    def __init__(
+        self,
+        schema: str,
+        table: str,
+        journal_folder: Path,
+        max_records: int = 1000,
+        max_seconds: float = 30.0,
+    ):
+        """
+        Parameters
+        ----------
+        schema : str
+            schema name
+        table : str
+            table name
+        journal_folder : Path
+            folder of the local journals
+        max_records : int, optional
+            records buffered before a flush, by default 1000
+        max_seconds : float, optional
+            seconds since the last flush before the next add flushes, by default 30.0
+        """
+        self.schema = schema
+        self.table = table
+        self.journal_folder = Path(journal_folder)
+        self.max_records = max_records
+        self.max_seconds = max_seconds
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._journal = None
+
+    @property
+    def journal_pattern(self) -> str:
+        return f"{self.schema}.{self.table}.*.jsonl"
+
+    def _open_journal(self):
+        """create the journal of this writer, locked for its lifetime so replay skips it"""
+        self.journal_folder.mkdir(parents=True, exist_ok=True)
+        path = (
+            self.journal_folder
+            / f"{self.schema}.{self.table}.{os.getpid()}-{uuid.uuid4().hex}.jsonl"
+        )
+        self._journal = open(path, "a+", encoding="utf-8")
+        fcntl.flock(self._journal, fcntl.LOCK_EX)
+
+    def add(self, postgres: Postgres, records: pd.DataFrame):
+        """journal records and buffer them, flushing if the size or time limit is reached
+
+        Parameters
+        ----------
+        postgres : Postgres
+            connected Postgres object, used if the buffer is flushed
+        records : pd.DataFrame
+            records with the columns of the table
+        """
+        with self._lock:
+            if self._journal is None:
+                self._open_journal()
+            self._journal.write(
+                records.to_json(orient="records", lines=True, date_format="iso")
+                + "\n"
+            )
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self.buffer.append(records)
+            due = (
+                sum(df.shape[0] for df in self.buffer) >= self.max_records
+                or time.monotonic() - self.last_flush >= self.max_seconds
+            )
+        if due:
+            self.flush(postgres)
+
+    def flush(self, postgres: Postgres) -> int:
+        """write buffered records in one COPY, then truncate the journal
+
+        Returns
+        -------
+        int
+            number of records written
+        """
+        with self._lock:
+            self.last_flush = time.monotonic()
+            if not self.buffer:
+                return 0
+            records = pd.concat(self.buffer, ignore_index=True)
+            postgres.dataframe_insert_to_table(
+                schema=self.schema, table=self.table, df=records
+            )
+            self.buffer = []
+            self._journal.seek(0)
+            self._journal.truncate()
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            return records.shape[0]
+
+    def replay(self, postgres: Postgres) -> int:
+        """write the records of journals no live writer holds (crashed runs, finished worker
+        processes) and delete those journals
+
+        Returns
+        -------
+        int
+            number of records written
+        """
+        if not self.journal_folder.is_dir():
+            return 0
+        counter = 0
+        for path in sorted(self.journal_folder.glob(self.journal_pattern)):
+            with open(path, "r", encoding="utf-8") as journal:
+                try:
+                    fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                lines = [line for line in journal.read().splitlines() if line]
+                try:
+                    json.loads(lines[-1]) if lines else None
+                except json.JSONDecodeError:
+                    # torn write of a crashed process, its add never returned
+                    lines = lines[:-1]
+                if lines:
+                    records = pd.DataFrame([json.loads(line) for line in lines])
+                    postgres.dataframe_insert_to_table(
+                        schema=self.schema, table=self.table, df=records
+                    )
+                    counter += records.shape[0]
+                path.unlink()
+        return counter
+
+    def close(self):
+        """release the journal. unflushed records stay in it and are replayed later"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+# writers of this process, shared by the tasks running in it
+_writers = {}
+_writer_settings = {"journal_folder": Path(__file__).parents[1] / "journal"}
+
+
+def configure_workflow_records(
+    journal_folder: Optional[Path] = None,
+    max_records: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+):
+    """set the journal folder and flush limits of writers created afterwards in this process"""
+    for key, val in {
+        "journal_folder": journal_folder,
+        "max_records": max_records,
+        "max_seconds": max_seconds,
+    }.items():
+        if val is not None:
+            _writer_settings[key] = val
+
+
+def workflow_record_writer(table: str, schema: str = "workflow") -> WorkflowRecordWriter:
+    """the writer of a workflow table in this process"""
+    if (schema, table) not in _writers:
+        _writers[(schema, table)] = WorkflowRecordWriter(
+            schema, table, **_writer_settings
+        )
+    return _writers[(schema, table)]
+
+
+def flush_workflow_records(
+    postgres: Postgres, tables: list[tuple[str, str]]
+) -> dict[str, int]:
+    """flush the writers of this process and replay leftover journals of the given tables
+
+    Parameters
+    ----------
+    postgres : Postgres
+        connected Postgres object
+    tables : list[tuple[str, str]]
+        (schema, table) of workflow tables written through WorkflowRecordWriter
+
+    Returns
+    -------
+    dict[str, int]
+        schema.table as keys and number of records written as values
+    """
+    result = {}
+    for schema, table in tables:
+        writer = workflow_record_writer(table, schema)
+        result[f"{schema}.{table}"] = writer.flush(postgres) + writer.replay(postgres)
+    return result
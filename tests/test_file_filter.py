@@ -0,0 +1,50 @@
+import os
+from yclib.core import FileFilter
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("c\n1\n")
+    return path
+
+
+def test_files_are_listed_recursively(tmp_path):
+    expected = [
+        touch(tmp_path / "a.csv"),
+        touch(tmp_path / "sub" / "b.xlsx"),
+        touch(tmp_path / "sub" / "deeper" / "c.txt"),
+    ]
+    touch(tmp_path / "sub" / "notes.md")
+    touch(tmp_path / "archive" / "d.csv")
+    assert (
+        FileFilter.get_filepath_list(tmp_path, filepath_exclude=["archive"])
+        == sorted(expected)
+    )
+
+
+def test_cached_listing_sees_new_files(tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    root = tmp_path / "root"
+    first = touch(root / "sub" / "deeper" / "a.csv")
+    assert FileFilter.get_filepath_list(root, cache_path=cache_path) == [first]
+    assert FileFilter.get_filepath_list(root, cache_path=cache_path) == [first]
+    second = touch(root / "sub" / "deeper" / "b.csv")
+    # only the mtime of the deepest directory changed
+    assert FileFilter.get_filepath_list(root, cache_path=cache_path) == [first, second]
+
+
+def test_unlistable_directory_is_skipped(tmp_path, monkeypatch):
+    kept = touch(tmp_path / "a" / "a.csv")
+    touch(tmp_path / "denied" / "b.csv")
+    scandir = os.scandir
+
+    def denying_scandir(path):
+        if os.path.basename(path) == "denied":
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", denying_scandir)
+    messages = []
+    assert FileFilter.get_filepath_list(tmp_path, log=messages.append) == [kept]
+    assert len(messages) == 1
+    assert "denied" in messages[0]
@@ -0,0 +1,132 @@
+import os
+import pandas as pd
+import pytest
+from yclib.core import SourceManifest, file_content_hash
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def ingested(*files, status="ingested"):
+    """manifest records of files ingested to the table named after their stem"""
+    return pd.concat(
+        [
+            SourceManifest.file_records(
+                path,
+                "dataset",
+                file_content_hash(path),
+                {path.stem: [1, 1]},
+                status=status,
+            )
+            for path in files
+        ],
+        ignore_index=True,
+    )
+
+
+@pytest.fixture
+def files(tmp_path):
+    return {
+        "x": write(tmp_path / "a" / "x.csv", "c\n1\n"),
+        "y": write(tmp_path / "a" / "y.csv", "c\n2\n"),
+    }
+
+
+def test_new_files_are_ingested(files):
+    to_ingest, unchanged, replaced, relocated = SourceManifest().plan(
+        list(files.values())
+    )
+    assert to_ingest == {path: file_content_hash(path) for path in files.values()}
+    assert unchanged == []
+    assert replaced == []
+    assert relocated.empty
+
+
+def test_unchanged_files_are_skipped(files):
+    manifest = SourceManifest(ingested(*files.values()))
+    to_ingest, unchanged, replaced, relocated = manifest.plan(list(files.values()))
+    assert to_ingest == {}
+    assert unchanged == list(files.values())
+    assert replaced == []
+    assert relocated.empty
+
+
+def test_touched_file_with_same_content_is_skipped(files):
+    manifest = SourceManifest(ingested(files["x"]))
+    stat = os.stat(files["x"])
+    os.utime(files["x"], (stat.st_atime, stat.st_mtime + 10))
+    to_ingest, unchanged, replaced, _ = manifest.plan([files["x"]])
+    assert to_ingest == {}
+    assert unchanged == [files["x"]]
+    assert replaced == []
+
+
+def test_changed_file_replaces_its_table(files):
+    manifest = SourceManifest(ingested(*files.values()))
+    write(files["x"], "c\n1\n3\n")
+    to_ingest, unchanged, replaced, _ = manifest.plan(list(files.values()))
+    assert to_ingest == {files["x"]: file_content_hash(files["x"])}
+    assert unchanged == [files["y"]]
+    assert replaced == ["x"]
+
+
+def test_copy_at_new_path_is_relocated(files, tmp_path):
+    manifest = SourceManifest(ingested(*files.values()))
+    copy = write(tmp_path / "b" / "z.csv", files["y"].read_text())
+    to_ingest, unchanged, replaced, relocated = manifest.plan(
+        list(files.values()) + [copy]
+    )
+    assert to_ingest == {}
+    assert copy in unchanged
+    assert replaced == []
+    assert relocated["filepath"].tolist() == [str(copy)]
+    assert relocated["table_name"].tolist() == ["y"]
+    assert relocated["status"].tolist() == ["ingested"]
+    assert "ingested_at" not in relocated
+
+
+def test_copy_of_replaced_content_is_ingested(files, tmp_path):
+    manifest = SourceManifest(ingested(*files.values()))
+    copy = write(tmp_path / "b" / "z.csv", files["x"].read_text())
+    write(files["x"], "c\n1\n3\n")
+    to_ingest, _, replaced, relocated = manifest.plan(list(files.values()) + [copy])
+    # the content of the copy only lives in table x, which is dropped
+    assert set(to_ingest) == {files["x"], copy}
+    assert replaced == ["x"]
+    assert relocated.empty
+
+
+def test_duplicate_content_is_ingested_once(files, tmp_path):
+    manifest = SourceManifest(ingested(files["x"]))
+    copy = write(tmp_path / "b" / "x_copy.csv", files["x"].read_text())
+    to_ingest, unchanged, _, relocated = manifest.plan([files["x"], copy])
+    assert to_ingest == {}
+    assert unchanged == [files["x"], copy]
+    assert relocated["table_name"].tolist() == ["x"]
+
+
+def test_partial_load_is_dropped_and_reloaded(files):
+    records = pd.concat(
+        [ingested(files["x"]), ingested(files["y"], status="loading")],
+        ignore_index=True,
+    )
+    manifest = SourceManifest(records)
+    to_ingest, unchanged, replaced, _ = manifest.plan(list(files.values()))
+    assert to_ingest == {files["y"]: file_content_hash(files["y"])}
+    assert unchanged == [files["x"]]
+    assert replaced == ["y"]
+
+
+def test_unchanged_file_sharing_a_replaced_table_is_reloaded(tmp_path):
+    # same file name in two folders, both ingested to table x
+    first = write(tmp_path / "a" / "x.csv", "c\n1\n")
+    second = write(tmp_path / "b" / "x.csv", "c\n2\n")
+    manifest = SourceManifest(ingested(first, second))
+    write(first, "c\n1\n3\n")
+    to_ingest, unchanged, replaced, _ = manifest.plan([first, second])
+    assert set(to_ingest) == {first, second}
+    assert unchanged == []
+    assert replaced == ["x"]
@@ -0,0 +1,33 @@
+import warnings
+import pandas as pd
+import pytest
+from yclib.core import ExcelFileHandler
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"a": [str(i) for i in range(5)], "b": list("vwxyz")})
+
+
+def chunks(path, pandas_attributes, engine="pandas"):
+    return list(
+        ExcelFileHandler.read_file_in_chunks(path, pandas_attributes, 2, engine)
+    )
+
+
+def test_csv_is_read_in_chunks_without_warning(tmp_path, frame):
+    path = tmp_path / "data.csv"
+    frame.to_csv(path, index=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = chunks(path, {"dtype": object})
+    assert [chunk.shape[0] for _, chunk in result] == [2, 2, 1]
+    assert result[-1][1]["Source"].tolist() == ["data:row:6"]
+
+
+def test_whole_file_read_is_warned(tmp_path, frame):
+    path = tmp_path / "data.pkl"
+    frame.to_pickle(path)
+    with pytest.warns(UserWarning, match="chunksize does not bound memory"):
+        result = chunks(path, {})
+    assert [chunk.shape[0] for _, chunk in result] == [2, 2, 1]
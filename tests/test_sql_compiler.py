@@ -0,0 +1,123 @@
+import pytest
+from psycopg2 import sql
+from yclib.transform import ProjectionCompiler, SQLCompileError, compile_functions
+
+
+def render(composable) -> str:
+    """SQL text of a composable, without the connection as_string needs"""
+    if isinstance(composable, sql.Composed):
+        return "".join(render(part) for part in composable)
+    if isinstance(composable, sql.Identifier):
+        return ".".join(
+            '"' + name.replace('"', '""') + '"' for name in composable.strings
+        )
+    if isinstance(composable, sql.Literal):
+        value = composable.wrapped
+        if isinstance(value, str):
+            return "'" + value.replace("'", "''") + "'"
+        return repr(value)
+    return composable.string
+
+
+def compiled(functions, columns=("a", "b")):
+    compiler, remaining = compile_functions(functions, list(columns))
+    source = sql.SQL("SELECT * FROM t")
+    return (render(compiler.compile(source)) if compiler else None), remaining
+
+
+def test_column_functions_compile_to_one_select():
+    query, remaining = compiled(
+        {
+            "rename_columns": {"name_map": {"a": "x"}},
+            "change_data_type": {"dtype_map": {"x": "float64"}},
+            "create_columns_with_default_value": {
+                "column_name": "c",
+                "default_value": "n/a",
+            },
+        }
+    )
+    assert query == (
+        'SELECT CAST("a" AS numeric) AS "x","b",\'n/a\'::text AS "c" '
+        "FROM (SELECT * FROM t) src"
+    )
+    assert remaining == {}
+
+
+@pytest.mark.parametrize(
+    "dtype, postgres_type",
+    [
+        ("int64", "bigint"),
+        ("Int64", "bigint"),
+        ("int", "bigint"),
+        ("int32", "integer"),
+        ("Int32", "integer"),
+        ("int16", "smallint"),
+        ("uint32", "bigint"),
+        ("datetime64[ns]", "timestamp"),
+        ("bool", "boolean"),
+        ("object", "text"),
+    ],
+)
+def test_change_data_type(dtype, postgres_type):
+    compiler = ProjectionCompiler(["a"])
+    compiler.change_data_type({"a": dtype})
+    assert render(compiler.columns["a"]) == f'CAST("a" AS {postgres_type})'
+
+
+@pytest.mark.parametrize("dtype", ["datetime64[ns, UTC]", "uint64", "category"])
+def test_change_data_type_without_postgres_equivalent(dtype):
+    with pytest.raises(SQLCompileError):
+        ProjectionCompiler(["a"]).change_data_type({"a": dtype})
+
+
+def test_change_data_type_of_missing_column():
+    with pytest.raises(SQLCompileError):
+        ProjectionCompiler(["a"]).change_data_type({"z": "int64"})
+
+
+def test_rename_to_duplicate_columns():
+    with pytest.raises(SQLCompileError):
+        ProjectionCompiler(["a", "b"]).rename_columns({"a": "b"})
+
+
+def test_only_the_leading_functions_are_compiled():
+    functions = {
+        "rename_columns": {"name_map": {"a": "x"}},
+        "table_filter": None,
+        "change_data_type": {"dtype_map": {"x": "datetime64[ns, UTC]"}},
+        "create_columns_with_default_value": {"column_name": "c"},
+    }
+    query, remaining = compiled(functions)
+    assert query == 'SELECT "a" AS "x","b" FROM (SELECT * FROM t) src'
+    # the first function without SQL equivalent and all after it run in pandas
+    assert list(remaining) == ["change_data_type", "create_columns_with_default_value"]
+
+
+def test_nothing_compiled():
+    functions = {
+        "flatten_effective_date": {},
+        "rename_columns": {"name_map": {"a": "x"}},
+    }
+    query, remaining = compiled(functions)
+    assert query is None
+    assert remaining == functions
+
+
+def test_bad_arguments_are_left_to_pandas():
+    functions = {"rename_columns": {"mapping": {"a": "x"}}}
+    query, remaining = compiled(functions)
+    assert query is None
+    assert remaining == functions
+
+
+@pytest.mark.parametrize(
+    "dtype, postgres_type",
+    [("Int64", "bigint"), ("float64", "numeric"), ("datetime64[ns, UTC]", "timestamptz")],
+)
+def test_postgres_type(dtype, postgres_type):
+    assert ProjectionCompiler.postgres_type(dtype) == postgres_type
+
+
+def test_postgres_type_without_equivalent():
+    with pytest.raises(SQLCompileError):
+        ProjectionCompiler.postgres_type("category")
@@ -1 +1,7 @@
 from .reader import *
+from .scheduler import *
+from .manifest import *
+from .classifier import *
+from .excel_engines import *
+from .decrypt_cache import *
+from .type_inference import *
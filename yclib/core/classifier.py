@@ -0,0 +1,151 @@
+import os
+import pathlib
+from collections import deque
+from typing import Hashable, Iterable, Optional
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton finding every keyword of a fixed set in a text in one scan"""
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Parameters
+        ----------
+        keywords : Iterable[str]
+            keywords to search for. empty and duplicated keywords are dropped
+        """
+        self.keywords = list(dict.fromkeys(kw for kw in keywords if kw))
+        self.index = {kw: i for i, kw in enumerate(self.keywords)}
+        goto = [{}]
+        output = [set()]
+        for i, kw in enumerate(self.keywords):
+            state = 0
+            for char in kw:
+                if char not in goto[state]:
+                    goto.append({})
+                    output.append(set())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            output[state].add(i)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0) if goto[f].get(char, 0) != nxt else 0
+                output[nxt] |= output[fail[nxt]]
+        self._goto, self._fail, self._output = goto, fail, output
+
+    def search(self, text: str) -> set[int]:
+        """ids (position in self.keywords) of all keywords found in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class DatasetClassifier:
+    """assign file paths (or table names) to datasets in one pass over all datasets' filters.
+
+    Filters have the same meaning as FileFilter.filelist_filter: every filename_include keyword
+    and no filename_exclude keyword must be in the file name (case sensitive), and no
+    filepath_exclude keyword may be in the parent path (case insensitive).
+    All keywords of all datasets are compiled into two Aho-Corasick automatons, so each
+    path is scanned once instead of once per dataset and keyword.
+    """
+
+    def __init__(self, filters: dict[Hashable, dict]):
+        """
+        Parameters
+        ----------
+        filters : dict[Hashable, dict]
+            dataset as keys and {filename_include, filename_exclude, filepath_exclude} as values.
+            a missing filepath_exclude defaults to ["archive", "delete"]
+        """
+        self.datasets = list(filters)
+        self._name_automaton = KeywordAutomaton(
+            kw
+            for f in filters.values()
+            for kw in (f.get("filename_include") or [])
+            + (f.get("filename_exclude") or [])
+        )
+        self._path_automaton = KeywordAutomaton(
+            kw.lower()
+            for f in filters.values()
+            for kw in f.get("filepath_exclude", ["archive", "delete"]) or []
+        )
+        self._rules = [
+            (
+                dataset,
+                frozenset(
+                    self._name_automaton.index[kw]
+                    for kw in f.get("filename_include") or []
+                    if kw
+                ),
+                frozenset(
+                    self._name_automaton.index[kw]
+                    for kw in f.get("filename_exclude") or []
+                    if kw
+                ),
+                frozenset(
+                    self._path_automaton.index[kw.lower()]
+                    for kw in f.get("filepath_exclude", ["archive", "delete"]) or []
+                    if kw
+                ),
+            )
+            for dataset, f in filters.items()
+        ]
+        self.ambiguous = {}
+        self.unmatched = []
+
+    def match(self, filepath: pathlib.Path or str) -> list[Hashable]:
+        """datasets whose filters keep a file path"""
+        filepath = os.fspath(filepath)
+        name_found = self._name_automaton.search(os.path.basename(filepath))
+        path_found = self._path_automaton.search(os.path.dirname(filepath).lower())
+        return [
+            dataset
+            for dataset, include, exclude, path_exclude in self._rules
+            if include <= name_found
+            and not exclude & name_found
+            and not path_exclude & path_found
+        ]
+
+    def classify(
+        self, filepath_list: list[pathlib.Path] or list[str]
+    ) -> dict[Hashable, list]:
+        """classify file paths. Files matching several datasets are listed under each of them and
+        recorded in self.ambiguous; files matching none are recorded in self.unmatched
+
+        Parameters
+        ----------
+        filepath_list : list[pathlib.Path] or list[str]
+            a list of file paths (or table names)
+
+        Returns
+        -------
+        dict[Hashable, list]
+            dataset as keys and the matched file paths, in input order, as values
+        """
+        result = {dataset: [] for dataset in self.datasets}
+        self.ambiguous, self.unmatched = {}, []
+        for filepath in filepath_list:
+            datasets = self.match(filepath)
+            for dataset in datasets:
+                result[dataset].append(filepath)
+            if len(datasets) > 1:
+                self.ambiguous[filepath] = datasets
+            elif not datasets:
+                self.unmatched.append(filepath)
+        return result
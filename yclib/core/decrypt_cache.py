@@ -0,0 +1,230 @@
+import pathlib
+import tempfile
+import shutil
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import msoffcrypto
+from .manifest import file_content_hash
+
+
+def default_cache_folder() -> pathlib.Path:
+    """/dev/shm (tmpfs, never written to disk) when available, otherwise the system temp folder"""
+    shm = pathlib.Path("/dev/shm")
+    root = shm if shm.is_dir() and os.access(shm, os.W_OK) else tempfile.gettempdir()
+    return pathlib.Path(root) / "yclib_decrypted"
+
+
+class DecryptedFileCache:
+    """decrypt-once cache of password protected workbooks.
+
+    Each workbook is decrypted with msoffcrypto once and spooled to
+    folder/<entry key>/<original file name>, so re-runs and retries read the decrypted file
+    straight from the local folder. The entry key digests the content hash together with the
+    password, so a cached copy is only handed out for the password that decrypted it and a
+    wrong password fails like it does on the encrypted file. Keeping the original name means readers produce the same
+    table names and Source values as for the encrypted file.
+
+    The folder and files are private to the user (0o700/0o600). The cache is bounded to
+    max_bytes by evicting the least recently used entries, which are overwritten with zeros
+    before they are unlinked. Entries being read (see DecryptedFileCache.open) hold a shared
+    lock and are never evicted, so worker processes can share one cache folder. The lock file
+    lives in the entry folder and is removed with it, so a lock is only held once the lock file
+    is checked to still be the one in the entry folder (see DecryptedFileCache._lock).
+    """
+
+    def __init__(
+        self,
+        folder: Optional[pathlib.Path or str] = None,
+        max_bytes: int = 2 * 1024**3,
+    ):
+        """
+        Parameters
+        ----------
+        folder : Optional[pathlib.Path or str], optional
+            cache folder, by default default_cache_folder()
+        max_bytes : int, optional
+            total size of decrypted files kept, by default 2GB
+        """
+        self.folder = pathlib.Path(folder) if folder else default_cache_folder()
+        self.max_bytes = max_bytes
+
+    def _entry(self, content_hash: str, password: str or int) -> pathlib.Path:
+        """entry folder of a workbook content decrypted with a password"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(content_hash.encode())
+        digest.update(b"\0")
+        digest.update(str(password).encode())
+        return self.folder / digest.hexdigest()
+
+    @staticmethod
+    def _lock(entry: pathlib.Path, operation: int):
+        """open and flock the lock file of an entry. returns the file descriptor, or None if busy
+        or if the entry was removed meanwhile"""
+        lock_path = entry / ".lock"
+        try:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(fd, operation)
+            # an entry evicted while waiting for the lock takes its lock file with it
+            if os.stat(lock_path).st_ino == os.fstat(fd).st_ino:
+                return fd
+        except (BlockingIOError, FileNotFoundError):
+            pass
+        os.close(fd)
+        return None
+
+    def get(
+        self,
+        filepath: pathlib.Path,
+        password: str or int,
+        content_hash: Optional[str] = None,
+    ) -> pathlib.Path:
+        """path of the decrypted copy of a workbook, decrypting it on a cache miss
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            encrypted workbook
+        password : str or int
+            workbook password
+        content_hash : Optional[str], optional
+            file_content_hash of the encrypted workbook, computed when not given. by default None
+
+        Returns
+        -------
+        pathlib.Path
+            decrypted file with the original file name
+        """
+        filepath = pathlib.Path(filepath)
+        content_hash = content_hash or file_content_hash(filepath)
+        entry = self._entry(content_hash, password)
+        target = entry / filepath.name
+        fd = None
+        while fd is None:
+            self.folder.mkdir(mode=0o700, parents=True, exist_ok=True)
+            entry.mkdir(mode=0o700, exist_ok=True)
+            fd = self._lock(entry, fcntl.LOCK_EX)
+        try:
+            if target.exists():
+                os.utime(entry)
+                return target
+            # decrypt to a temporary name first, so a crash never leaves a partial file behind
+            partial = entry / f".{filepath.name}.partial"
+            try:
+                with open(
+                    os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb"
+                ) as output, open(filepath, "rb") as file:
+                    office_file = msoffcrypto.OfficeFile(file)
+                    office_file.load_key(password=password)
+                    office_file.decrypt(output)
+            except Exception:
+                # e.g. a wrong password: leave no entry behind for it
+                if partial.exists():
+                    self.secure_delete(partial)
+                shutil.rmtree(entry, ignore_errors=True)
+                raise
+            os.replace(partial, target)
+            os.utime(entry)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self.evict(keep=entry)
+        return target
+
+    @contextmanager
+    def open(
+        self,
+        filepath: pathlib.Path,
+        password: str or int,
+        content_hash: Optional[str] = None,
+    ) -> Iterator[pathlib.Path]:
+        """context manager around get, holding the entry so it is not evicted while being read"""
+        while True:
+            target = self.get(filepath, password, content_hash)
+            fd = self._lock(target.parent, fcntl.LOCK_SH)
+            if fd is None:
+                # evicted by another process between get and the lock
+                continue
+            if target.exists():
+                break
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        try:
+            yield target
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @staticmethod
+    def secure_delete(filepath: pathlib.Path, block_size: int = 1024**2):
+        """overwrite a file with zeros, flush it to the device and unlink it"""
+        size = os.path.getsize(filepath)
+        with open(filepath, "r+b") as file:
+            zeros = bytes(block_size)
+            for start in range(0, size, block_size):
+                file.write(zeros[: min(block_size, size - start)])
+            file.flush()
+            os.fsync(file.fileno())
+        os.unlink(filepath)
+
+    def _remove(self, entry: pathlib.Path) -> bool:
+        """securely delete an entry unless it is being read. returns whether it was removed"""
+        fd = self._lock(entry, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if fd is None:
+            return False
+        try:
+            for file in entry.iterdir():
+                if file.name != ".lock":
+                    self.secure_delete(file)
+            shutil.rmtree(entry, ignore_errors=True)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        return True
+
+    def entries(self) -> list[tuple[pathlib.Path, float, int]]:
+        """(entry folder, last used time, bytes) of cached files, least recently used first"""
+        if not self.folder.is_dir():
+            return []
+        entries = []
+        for entry in self.folder.iterdir():
+            try:
+                size = sum(
+                    f.stat().st_size for f in entry.iterdir() if f.name != ".lock"
+                )
+                entries.append((entry, entry.stat().st_mtime, size))
+            except FileNotFoundError:
+                # removed by another process meanwhile
+                continue
+        return sorted(entries, key=lambda x: x[1])
+
+    @property
+    def size(self) -> int:
+        """bytes held by the cache"""
+        return sum(size for _, _, size in self.entries())
+
+    def evict(self, keep: Optional[pathlib.Path] = None):
+        """remove least recently used entries until the cache fits in max_bytes
+
+        Parameters
+        ----------
+        keep : Optional[pathlib.Path], optional
+            entry folder never evicted, e.g. the one just added. by default None
+        """
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        for entry, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if entry != keep and self._remove(entry):
+                total -= size
+
+    def clear(self):
+        """securely remove every entry that is not being read"""
+        for entry, _, _ in self.entries():
+            self._remove(entry)
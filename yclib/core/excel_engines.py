@@ -0,0 +1,244 @@
+import abc
+import importlib
+import pandas as pd
+import pathlib
+import warnings
+from typing import Any, Iterable, Iterator, Optional
+
+
+class ExcelEngine(abc.ABC):
+    """base class of row-streaming excel reader engines.
+
+    An engine only has to implement iter_sheets, which yields every requested sheet with a lazy
+    iterator over its rows (tuples of cell values). Turning rows into dataframes the way
+    pd.read_excel does (skiprows, header, column naming, trailing empty rows) is shared here,
+    so sheets and row blocks can be yielded one at a time.
+
+    Supported pandas attributes: sheet_name, header (int or None), skiprows (int), nrows and
+    a text dtype. Anything else makes ExcelFileHandler fall back to pd.read_excel.
+    """
+
+    name = None
+    package = None
+    suffixes = ()
+    supported_pandas_attributes = {"sheet_name", "header", "skiprows", "nrows", "dtype"}
+
+    def supports(self, filepath: pathlib.Path, pandas_attributes: dict) -> bool:
+        """check whether the engine can read a file with the given pandas attributes"""
+        suffix = (
+            pathlib.Path(filepath).suffix.lower()
+            if isinstance(filepath, (str, pathlib.Path))
+            else ".xlsx"
+        )
+        return (
+            suffix in self.suffixes
+            and set(pandas_attributes) <= self.supported_pandas_attributes
+            and isinstance(pandas_attributes.get("skiprows", 0) or 0, int)
+            and isinstance(pandas_attributes.get("header", 0), (int, type(None)))
+            and pandas_attributes.get("dtype", object)
+            in [object, str, "object", "str", "string"]
+        )
+
+    @abc.abstractmethod
+    def iter_sheets(
+        self, source, sheet_name: Any
+    ) -> Iterator[tuple[str, Iterator[tuple]]]:
+        """yield (sheet title, row iterator) for every requested sheet
+
+        Parameters
+        ----------
+        source :
+            file path or file-like object
+        sheet_name : Any
+            pandas sheet_name: sheet index, sheet name, list of them or None for all sheets
+        """
+
+    def _import(self, module: str):
+        """import the reader module of the engine, with a clear error when it is missing"""
+        try:
+            return importlib.import_module(module)
+        except ImportError as e:
+            raise ImportError(
+                f"excel engine '{self.name}' needs the {self.package} package, "
+                f"install it with pip install {self.package} or pick another engine"
+            ) from e
+
+    @staticmethod
+    def _select_sheets(sheet_names: list[str], sheet_name: Any) -> list[str]:
+        if sheet_name is None:
+            return list(sheet_names)
+        selected = []
+        for sheet in sheet_name if isinstance(sheet_name, list) else [sheet_name]:
+            selected.append(sheet_names[sheet] if isinstance(sheet, int) else sheet)
+        return selected
+
+    @staticmethod
+    def _convert_cell(value):
+        if value == "":
+            return None
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+
+    @staticmethod
+    def _column_names(header: Optional[tuple], width: int) -> list:
+        if header is None:
+            return list(range(width))
+        columns = []
+        for i, col in enumerate(list(header) + [None] * (width - len(header))):
+            col = ExcelEngine._convert_cell(col)
+            col = f"Unnamed: {i}" if col is None else col
+            name, counter = col, 1
+            while name in columns:
+                name = f"{col}.{counter}"
+                counter += 1
+            columns.append(name)
+        return columns
+
+    def iter_blocks(
+        self,
+        rows: Iterable[tuple],
+        pandas_attributes: dict,
+        chunksize: Optional[int] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """turn the rows of a sheet into dataframes like pd.read_excel does
+
+        Parameters
+        ----------
+        rows : Iterable[tuple]
+            rows of cell values
+        pandas_attributes : dict
+            pandas attributes
+        chunksize : Optional[int], optional
+            rows per dataframe. None reads the whole sheet into one dataframe, by default None
+
+        Yields
+        ------
+        Iterator[pd.DataFrame]
+            blocks of rows. with chunksize set, columns are fixed by the header row and cells
+            beyond the header are dropped with a warning, as the sheet width is not known upfront
+        """
+        skiprows = pandas_attributes.get("skiprows", 0) or 0
+        header = pandas_attributes.get("header", 0)
+        nrows = pandas_attributes.get("nrows")
+        dtype = object if "dtype" in pandas_attributes else None
+
+        rows = iter(rows)
+        for _ in range(skiprows + (header or 0)):
+            next(rows, None)
+        header_row = None
+        if header is not None:
+            header_row = tuple(next(rows, ()))
+            while header_row and header_row[-1] in [None, ""]:
+                header_row = header_row[:-1]
+
+        def _trim(row):
+            row = [self._convert_cell(cell) for cell in row]
+            while row and row[-1] is None:
+                row.pop()
+            return row
+
+        if chunksize is None:
+            data = [_trim(row) for row in rows]
+            while data and not data[-1]:
+                data.pop()
+            data = data[:nrows] if nrows is not None else data
+            width = max([len(header_row or ())] + [len(row) for row in data])
+            columns = self._column_names(header_row, width)
+            yield pd.DataFrame(
+                [row + [None] * (width - len(row)) for row in data],
+                columns=columns,
+                dtype=dtype,
+            )
+            return
+
+        width = len(header_row or ())
+        columns = self._column_names(header_row, width)
+        block, blanks, n_rows, truncated, emitted = [], 0, 0, 0, False
+        for row in rows:
+            if nrows is not None and n_rows >= nrows:
+                break
+            row = _trim(row)
+            if not row:
+                # trailing empty rows are dropped, so hold them until a non-empty row follows
+                blanks += 1
+                continue
+            if header_row is None and not width:
+                width = len(row)
+                columns = self._column_names(None, width)
+            if len(row) > width:
+                truncated += 1
+                row = row[:width]
+            block.extend([[None] * width] * blanks)
+            n_rows += blanks + 1
+            blanks = 0
+            block.append(row + [None] * (width - len(row)))
+            if len(block) >= chunksize:
+                yield pd.DataFrame(block[:chunksize], columns=columns, dtype=dtype)
+                block = block[chunksize:]
+                emitted = True
+        if block or not emitted:
+            yield pd.DataFrame(block, columns=columns, dtype=dtype)
+        if truncated:
+            warnings.warn(
+                f"{truncated} row(s) have cells beyond the header row, which are not read in streaming mode"
+            )
+
+
+class OpenpyxlEngine(ExcelEngine):
+    """read-only row streaming with openpyxl (xlsx/xlsm)"""
+
+    name = "openpyxl"
+    package = "openpyxl"
+    suffixes = (".xlsx", ".xlsm")
+
+    def iter_sheets(self, source, sheet_name):
+        openpyxl = self._import("openpyxl")
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            for sheet in self._select_sheets(workbook.sheetnames, sheet_name):
+                yield sheet, workbook[sheet].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+
+class CalamineEngine(ExcelEngine):
+    """rust calamine reader through python-calamine (xlsx/xlsm/xlsb/xls)"""
+
+    name = "calamine"
+    package = "python-calamine"
+    suffixes = (".xlsx", ".xlsm", ".xlsb", ".xls")
+
+    def iter_sheets(self, source, sheet_name):
+        python_calamine = self._import("python_calamine")
+        workbook = python_calamine.CalamineWorkbook.from_object(source)
+        for sheet in self._select_sheets(workbook.sheet_names, sheet_name):
+            calamine_sheet = workbook.get_sheet_by_name(sheet)
+            yield sheet, (
+                calamine_sheet.iter_rows()
+                if hasattr(calamine_sheet, "iter_rows")
+                else iter(calamine_sheet.to_python())
+            )
+
+
+class PyxlsbEngine(ExcelEngine):
+    """row streaming for binary workbooks with pyxlsb (xlsb)"""
+
+    name = "pyxlsb"
+    package = "pyxlsb"
+    suffixes = (".xlsb",)
+
+    def iter_sheets(self, source, sheet_name):
+        pyxlsb = self._import("pyxlsb")
+        with pyxlsb.open_workbook(source) as workbook:
+            for sheet in self._select_sheets(workbook.sheets, sheet_name):
+                with workbook.get_sheet(sheet) as xlsb_sheet:
+                    yield sheet, (
+                        tuple(cell.v for cell in row) for row in xlsb_sheet.rows()
+                    )
+
+
+EXCEL_ENGINES = {
+    engine.name: engine()
+    for engine in [OpenpyxlEngine, CalamineEngine, PyxlsbEngine]
+}
@@ -0,0 +1,210 @@
+import pandas as pd
+import pathlib
+import hashlib
+import os
+from typing import Optional
+
+
+def file_content_hash(filepath: pathlib.Path, block_size: int = 1024**2) -> str:
+    """blake2b hex digest of a file's content, read in blocks
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        file path
+    block_size : int, optional
+        bytes read at a time, by default 1MB
+
+    Returns
+    -------
+    str
+        hex digest
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SourceManifest:
+    """content-addressed manifest of ingested source files, one record per file and table(sheet)
+    as stored in workflow.source_file_manifest.
+
+    A file is unchanged when its path, size and mtime match a record (no hashing needed),
+    or when its content hash matches any record, e.g. the same file delivered to a new path.
+    Everything else is new or changed and has to be ingested.
+
+    Loaders record every table with status 'loading' before copying data into it (see
+    file_records) and as 'ingested' once the whole file is loaded, so the tables of a file that
+    failed half way are known and dropped by the next plan instead of being appended to.
+    """
+
+    table_structure = {
+        "filepath": "text",
+        "filename": "text",
+        "dataset": "text",
+        "table_name": "text",
+        "file_size": "bigint",
+        "mtime": "double precision",
+        "content_hash": "text",
+        "rows": "bigint",
+        "status": "text",
+        "ingested_at": "timestamp default now()",
+    }
+
+    def __init__(self, records: Optional[pd.DataFrame] = None):
+        """
+        Parameters
+        ----------
+        records : Optional[pd.DataFrame], optional
+            manifest records with the columns of SourceManifest.table_structure, by default None
+        """
+        self.records = (
+            records
+            if records is not None
+            else pd.DataFrame(columns=list(self.table_structure))
+        ).reindex(columns=list(self.table_structure))
+        loading = self.records["status"].eq("loading").to_numpy(dtype=bool)
+        # tables of loads that did not finish, whatever happened to their file since
+        self.partial_tables = set(self.records.loc[loading, "table_name"])
+        self.ingested = self.records[~loading]
+        self._stats = {
+            (row.filepath, int(row.file_size), float(row.mtime))
+            for row in self.ingested.itertuples()
+        }
+        self._hashes = set(self.ingested["content_hash"])
+
+    def plan(
+        self, filepath_list: list[pathlib.Path]
+    ) -> tuple[dict[pathlib.Path, str], list[pathlib.Path], list[str], pd.DataFrame]:
+        """split files into files to ingest and unchanged files. Nothing is changed in the
+        database: the caller drops the tables returned before ingesting
+
+        Tables are named after files, so a table of a previous version of a file to ingest
+        (same path or same file name) is dropped and re-ingested, as is a table a load did not
+        finish. Unchanged files with rows in a dropped table are re-ingested as well, otherwise
+        their rows would be lost, and so are files found by content hash whose content only
+        lives in dropped tables.
+
+        Parameters
+        ----------
+        filepath_list : list[pathlib.Path]
+            file paths
+
+        Returns
+        -------
+        tuple[dict[pathlib.Path, str], list[pathlib.Path], list[str], pd.DataFrame]
+            files to ingest with their content hash,
+            unchanged files,
+            tables to drop before ingesting,
+            manifest records to add for unchanged files found at a new path
+        """
+        to_ingest, unchanged = {}, {}
+        for filepath in filepath_list:
+            stat = os.stat(filepath)
+            if (str(filepath), stat.st_size, stat.st_mtime) in self._stats:
+                unchanged[filepath] = None
+                continue
+            content_hash = file_content_hash(filepath)
+            if content_hash in self._hashes:
+                unchanged[filepath] = content_hash
+            else:
+                to_ingest[filepath] = content_hash
+
+        ingested = self.ingested
+        while True:
+            replaced = self.partial_tables | set(
+                ingested.loc[
+                    ingested["filepath"].isin([str(fp) for fp in to_ingest])
+                    | ingested["filename"].isin(
+                        [pathlib.Path(fp).name for fp in to_ingest]
+                    ),
+                    "table_name",
+                ]
+            )
+            dropped = ingested["table_name"].isin(replaced)
+            affected = set(ingested.loc[dropped, "filepath"])
+            kept_hashes = set(ingested.loc[~dropped, "content_hash"])
+            moved = [
+                fp
+                for fp, content_hash in unchanged.items()
+                if str(fp) in affected
+                or (content_hash is not None and content_hash not in kept_hashes)
+            ]
+            if not moved:
+                break
+            for filepath in moved:
+                unchanged.pop(filepath)
+                to_ingest[filepath] = file_content_hash(filepath)
+
+        # unchanged content at a new path: record the new path, in the tables holding the content
+        # after the drops, so the next run can skip it on stat
+        kept = ingested[~dropped]
+        relocated = []
+        for filepath, content_hash in unchanged.items():
+            if content_hash is None:
+                continue
+            stat = os.stat(filepath)
+            relocated.append(
+                kept.loc[kept["content_hash"] == content_hash]
+                .drop_duplicates("table_name")
+                .assign(
+                    filepath=str(filepath),
+                    filename=pathlib.Path(filepath).name,
+                    file_size=stat.st_size,
+                    mtime=stat.st_mtime,
+                    status="ingested",
+                )
+                .drop(columns=["ingested_at"])
+            )
+        relocated = (
+            pd.concat(relocated, ignore_index=True)
+            if relocated
+            else pd.DataFrame(columns=list(self.table_structure)[:-1])
+        )
+        return to_ingest, list(unchanged), sorted(replaced), relocated
+
+    @staticmethod
+    def file_records(
+        filepath: pathlib.Path,
+        dataset: str,
+        content_hash: str,
+        tables: dict[str, list],
+        status: str = "ingested",
+    ) -> pd.DataFrame:
+        """manifest records of the tables of a file
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            file path
+        dataset : str
+            dataset name
+        content_hash : str
+            file_content_hash of the file
+        tables : dict[str, list]
+            table name as keys and [rows, columns] as values
+        status : str, optional
+            'loading' for a table about to be filled (rows may be None), 'ingested' once the
+            whole file is loaded, by default 'ingested'
+
+        Returns
+        -------
+        pd.DataFrame
+            records to insert into workflow.source_file_manifest
+        """
+        stat = os.stat(filepath)
+        return pd.DataFrame(
+            {
+                "filepath": str(filepath),
+                "filename": pathlib.Path(filepath).name,
+                "dataset": dataset,
+                "table_name": list(tables),
+                "file_size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "content_hash": content_hash,
+                "rows": pd.array([val[0] for val in tables.values()], dtype="Int64"),
+                "status": status,
+            }
+        )
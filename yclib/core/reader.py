@@ -1,10 +1,17 @@
 import pandas as pd
 import numpy as np
 import pathlib
-from typing import Optional
+from typing import Any, Callable, Iterator, Optional
+from pandas._libs.parsers import STR_NA_VALUES
 import os
 import io
+import csv
+import re
+import json
+import warnings
 import msoffcrypto
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .excel_engines import EXCEL_ENGINES, ExcelEngine
 
 
 class FileFilter:
@@ -16,28 +23,111 @@ class FileFilter:
         _description_
     """
 
+    source_suffixes = (".xlsx", ".xls", ".xlsm", ".txt", ".csv", ".xlsb", ".pkl")
+
     @staticmethod
-    def get_filepath_list(folder_path: str) -> list[pathlib.Path]:
-        """get a list of excel files
+    def get_filepath_list(
+        folder_path: str,
+        filepath_exclude: Optional[list[str]] = None,
+        max_workers: int = 16,
+        cache_path: Optional[str] = None,
+        log: Optional[Callable[[str], Any]] = None,
+    ) -> list[pathlib.Path]:
+        """get a list of excel/csv/pickle files. Subtrees are scanned concurrently with os.scandir,
+        which suits slow network shares where every directory listing is a round trip. The mtime of
+        a directory is taken from the listing of its parent, only directories under a cached
+        directory are stat-ed. A directory that cannot be listed (e.g. permission denied) is
+        skipped with its subtree and reported to log.
 
         Parameters
         ----------
         folder_path : str
             a folder path that the function will walk through
+        filepath_exclude : Optional[list[str]], optional
+            directories whose path contains any of these keywords (case insensitive) are not descended,
+            by default None
+        max_workers : int, optional
+            number of directories scanned at the same time, by default 16
+        cache_path : Optional[str], optional
+            json file caching the listing of every directory. a directory whose mtime has not changed
+            is not listed again, only stat-ed. by default None (no cache)
+        log : Optional[Callable[[str], Any]], optional
+            called with the message of every directory skipped, e.g. logger.warning,
+            by default warnings.warn
 
         Returns
         -------
         list[pathlib.Path]
-            a list of excel file paths
+            a list of excel file paths, sorted
         """
-        folder_path = pathlib.Path(folder_path)
-        return [
-            pathlib.Path(os.path.join(root, file))
-            for root, dirs, files in os.walk(folder_path)
-            for file in files
-            if pathlib.Path(file).suffix.lower()
-            in [".xlsx", ".xls", ".xlsm", ".txt", ".csv", ".xlsb", ".pkl"]
-        ]
+        filepath_exclude = [kw.lower() for kw in filepath_exclude or [] if kw]
+        suffixes = FileFilter.source_suffixes
+        cache = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path) as fd:
+                cache = json.load(fd)
+            if cache.get("suffixes") != list(suffixes):
+                cache = {}
+        cached_dirs = cache.get("directories", {})
+        new_cache = {}
+        log = log or warnings.warn
+
+        def _is_excluded(directory: str) -> bool:
+            return any(kw in directory.lower() for kw in filepath_exclude)
+
+        def _scan(
+            directory: str, mtime: Optional[float] = None
+        ) -> tuple[list[str], list[tuple[str, Optional[float]]]]:
+            try:
+                if mtime is None:
+                    mtime = os.stat(directory).st_mtime
+                cached = cached_dirs.get(directory)
+                if cached and cached["mtime"] == mtime:
+                    files, dirs = cached["files"], cached["dirs"]
+                    # mtimes of the subdirectories are not known without listing
+                    subdirs = [(d, None) for d in dirs]
+                else:
+                    files, dirs, subdirs = [], [], []
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                try:
+                                    entry_mtime = entry.stat(
+                                        follow_symlinks=False
+                                    ).st_mtime
+                                except OSError:
+                                    entry_mtime = None
+                                dirs.append(entry.path)
+                                subdirs.append((entry.path, entry_mtime))
+                            elif entry.name.lower().endswith(suffixes):
+                                files.append(entry.path)
+            except OSError as e:
+                log(f"directory {directory} is skipped: {e}")
+                return [], []
+            new_cache[directory] = {"mtime": mtime, "files": files, "dirs": dirs}
+            return files, [(d, m) for d, m in subdirs if not _is_excluded(d)]
+
+        filepath_list = []
+        root = os.fspath(folder_path)
+        if os.path.isdir(root) and not _is_excluded(root):
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pending = {executor.submit(_scan, root)}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        files, dirs = future.result()
+                        filepath_list.extend(files)
+                        pending.update(
+                            executor.submit(_scan, d, m) for d, m in dirs
+                        )
+
+        if cache_path:
+            tmp_path = f"{cache_path}.tmp"
+            with open(tmp_path, "w") as fd:
+                json.dump({"suffixes": list(suffixes), "directories": new_cache}, fd)
+            os.replace(tmp_path, cache_path)
+
+        return [pathlib.Path(filepath) for filepath in sorted(filepath_list)]
 
     @staticmethod
     def filelist_filter(
@@ -112,8 +202,133 @@ class FileFilter:
 
 
 class ExcelFileHandler:
+    pd_filetype_mapper = {
+        "excel": [".xlsx", ".xls", ".xlsm", ".xlsb"],
+        "csv": [".txt", ".csv"],
+        "pkl": [".pkl"],
+    }
+    pd_func_mapper = {
+        "excel": pd.read_excel,
+        "csv": pd.read_csv,
+        "pkl": pd.read_pickle,
+    }
+    # postgres types of the compact lineage columns, which replace 'Source'
+    compact_lineage_columns = {"source_file_id": "integer", "source_row": "integer"}
+
+    @staticmethod
+    def get_filetype(filepath: pathlib.Path) -> str:
+        """get the reader file type ('excel', 'csv' or 'pkl') of a file path
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            file path
+
+        Returns
+        -------
+        str
+            key of ExcelFileHandler.pd_func_mapper
+        """
+        filepath = (
+            filepath if isinstance(filepath, pathlib.Path) else pathlib.Path(filepath)
+        )
+        for key, val in ExcelFileHandler.pd_filetype_mapper.items():
+            if filepath.suffix.lower() in val:
+                return key
+        raise ValueError(f"file type {filepath.suffix} is not supported")
+
     @staticmethod
-    def read_file(filepath: pathlib.Path, pandas_attributes) -> dict[str, pd.DataFrame]:
+    def add_source_column(
+        df: pd.DataFrame,
+        prefix: str,
+        pandas_attributes: dict,
+        row_offset: int = 0,
+        lineage_id: Optional[Callable[[str], int]] = None,
+    ) -> pd.DataFrame:
+        """add the 'Source' lineage column (prefix:row:N) to a dataframe in place.
+        in compact mode (lineage_id given) integer columns source_file_id and source_row are added
+        instead, so no string is built per row
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            dataframe read from a file or a sheet
+        prefix : str
+            file stem, or file stem + sheet name
+        pandas_attributes : dict
+            pandas attributes used to read the file. skiprows and header shift the row number
+        row_offset : int, optional
+            number of data rows read before this dataframe, by default 0.
+            used when a file is read in chunks
+        lineage_id : Optional[Callable[[str], int]], optional
+            resolves a prefix to its source_file_id, e.g. from workflow.source_file_lineage.
+            by default None (text lineage)
+
+        Returns
+        -------
+        pd.DataFrame
+            the same dataframe with the 'Source' column, or source_file_id and source_row
+        """
+        rows = (
+            pd.RangeIndex(row_offset, row_offset + df.shape[0])
+            + 2
+            + int(pandas_attributes.get("skiprows", 0) or 0)
+            + int(pandas_attributes.get("header", 0) or 0)
+        )
+        if lineage_id is not None:
+            df["source_file_id"] = np.full(df.shape[0], lineage_id(prefix), "int32")
+            df["source_row"] = rows.astype("int32")
+        else:
+            df["Source"] = prefix + ":row:" + rows.astype("string")
+        return df
+
+    @staticmethod
+    def _excel_engine(
+        filepath: pathlib.Path, pandas_attributes: dict, engine: str
+    ) -> Optional[ExcelEngine]:
+        """streaming engine for an excel file, or None when pd.read_excel has to be used"""
+        if engine in [None, "pandas"]:
+            return None
+        if engine not in EXCEL_ENGINES:
+            raise ValueError(
+                f"excel engine {engine} is not one of {['pandas'] + list(EXCEL_ENGINES)}"
+            )
+        return (
+            EXCEL_ENGINES[engine]
+            if EXCEL_ENGINES[engine].supports(filepath, pandas_attributes)
+            else None
+        )
+
+    @staticmethod
+    def _iter_excel(
+        filepath: pathlib.Path,
+        pandas_attributes: dict,
+        engine: ExcelEngine,
+        chunksize: Optional[int] = None,
+        lineage_id: Optional[Callable[[str], int]] = None,
+    ) -> Iterator[tuple[str, pd.DataFrame]]:
+        """(key, dataframe) per sheet, or per row block with chunksize, read with a streaming engine.
+        keys and Source values are the same as read_file with pd.read_excel"""
+        sheet_name = pandas_attributes.get("sheet_name", 0)
+        multiple = sheet_name is None or isinstance(sheet_name, list)
+        for sheet, rows in engine.iter_sheets(filepath, sheet_name):
+            key = "_".join([filepath.stem, sheet]) if multiple else filepath.stem
+            prefix = filepath.stem + sheet if multiple else filepath.stem
+            row_offset = 0
+            for block in engine.iter_blocks(rows, pandas_attributes, chunksize):
+                ExcelFileHandler.add_source_column(
+                    block, prefix, pandas_attributes, row_offset, lineage_id
+                )
+                row_offset += block.shape[0]
+                yield key, block
+
+    @staticmethod
+    def read_file(
+        filepath: pathlib.Path,
+        pandas_attributes,
+        engine: str = "pandas",
+        lineage_id: Optional[Callable[[str], int]] = None,
+    ) -> dict[str, pd.DataFrame]:
         """read a file path to a dict with file name as key and pandas dataframe as value
 
         Parameters
@@ -122,6 +337,11 @@ class ExcelFileHandler:
             file path
         **kwargs : variables
             pandas attributes
+        engine : str, optional
+            excel reader engine: 'pandas' (pd.read_excel) or a key of EXCEL_ENGINES.
+            falls back to pandas when the engine cannot honour the pandas attributes. by default 'pandas'
+        lineage_id : Optional[Callable[[str], int]], optional
+            compact lineage id resolver, see add_source_column. by default None
         Returns
         -------
         dict[str, pd.DataFrame]
@@ -131,52 +351,114 @@ class ExcelFileHandler:
         filepath = (
             filepath if isinstance(filepath, pathlib.Path) else pathlib.Path(filepath)
         )
-        pd_filetype_mapper = {
-            "excel": [".xlsx", ".xls", ".xlsm", ".xlsb"],
-            "csv": [".txt", ".csv"],
-            "pkl": ["pkl"],
-        }
-        pd_func_mapper = {
-            "excel": pd.read_excel,
-            "csv": pd.read_csv,
-            "pkl": pd.read_pickle,
-        }
-
-        df = [
-            pd_func_mapper[key](filepath, **pandas_attributes)
-            for key, val in pd_filetype_mapper.items()
-            if filepath.suffix.lower() in val
-        ][0]
+        filetype = ExcelFileHandler.get_filetype(filepath)
+        excel_engine = (
+            ExcelFileHandler._excel_engine(filepath, pandas_attributes, engine)
+            if filetype == "excel"
+            else None
+        )
+        if excel_engine is not None:
+            return dict(
+                ExcelFileHandler._iter_excel(
+                    filepath, pandas_attributes, excel_engine, lineage_id=lineage_id
+                )
+            )
+
+        df = ExcelFileHandler.pd_func_mapper[filetype](filepath, **pandas_attributes)
 
         if isinstance(df, pd.DataFrame):
-            df["Source"] = (
-                filepath.stem
-                + ":row:"
-                + (
-                    df.index
-                    + 2
-                    + int(pandas_attributes.get("skiprows", 0))
-                    + int(pandas_attributes.get("header", 0))
-                ).astype("string")
+            ExcelFileHandler.add_source_column(
+                df, filepath.stem, pandas_attributes, lineage_id=lineage_id
             )
-
             df_dict = {filepath.stem: df}
         else:
             for sheet in df:
-                df[sheet]["Source"] = (
-                    filepath.stem
-                    + sheet
-                    + ":row:"
-                    + (
-                        df[sheet].index
-                        + 2
-                        + int(pandas_attributes.get("skiprows", 0))
-                        + int(pandas_attributes.get("header", 0))
-                    ).astype("string")
+                ExcelFileHandler.add_source_column(
+                    df[sheet],
+                    filepath.stem + sheet,
+                    pandas_attributes,
+                    lineage_id=lineage_id,
                 )
             df_dict = {"_".join([filepath.stem, key]): val for key, val in df.items()}
         return df_dict
 
+    @staticmethod
+    def read_file_in_chunks(
+        filepath: pathlib.Path,
+        pandas_attributes: dict,
+        chunksize: int,
+        engine: str = "pandas",
+        lineage_id: Optional[Callable[[str], int]] = None,
+    ) -> Iterator[tuple[str, pd.DataFrame]]:
+        """read a file in chunks of rows. Each chunk gets a 'Source' column with
+        row numbers continuing across chunks, so the result is the same as read_file
+        but only one chunk is held in memory at a time.
+
+        csv/txt files are parsed lazily with pandas' chunked reader. excel files are streamed
+        sheet by sheet and row block by row block with a streaming engine (see EXCEL_ENGINES).
+        with engine 'pandas', or a streaming engine that cannot read the file with its pandas
+        attributes, excel and pickle files are parsed whole and then handed out chunk by chunk:
+        chunksize does not bound memory for them, which is warned about.
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            file path
+        pandas_attributes : dict
+            pandas attributes
+        chunksize : int
+            number of rows per chunk
+        engine : str, optional
+            excel reader engine, see read_file. by default 'pandas'
+        lineage_id : Optional[Callable[[str], int]], optional
+            compact lineage id resolver, see add_source_column. by default None
+
+        Yields
+        ------
+        Iterator[tuple[str, pd.DataFrame]]
+            (key, chunk) with the same keys as read_file. chunks of one key are yielded in row order
+        """
+        filepath = (
+            filepath if isinstance(filepath, pathlib.Path) else pathlib.Path(filepath)
+        )
+        filetype = ExcelFileHandler.get_filetype(filepath)
+
+        if filetype == "csv":
+            row_offset = 0
+            with pd.read_csv(
+                filepath, chunksize=chunksize, **pandas_attributes
+            ) as reader:
+                for chunk in reader:
+                    ExcelFileHandler.add_source_column(
+                        chunk, filepath.stem, pandas_attributes, row_offset, lineage_id
+                    )
+                    row_offset += chunk.shape[0]
+                    yield filepath.stem, chunk
+        elif (
+            filetype == "excel"
+            and ExcelFileHandler._excel_engine(filepath, pandas_attributes, engine)
+            is not None
+        ):
+            yield from ExcelFileHandler._iter_excel(
+                filepath,
+                pandas_attributes,
+                ExcelFileHandler._excel_engine(filepath, pandas_attributes, engine),
+                chunksize,
+                lineage_id,
+            )
+        else:
+            warnings.warn(
+                f"{filepath.name}: chunksize does not bound memory with engine '{engine}' "
+                f"for this file and its pandas attributes, it is read whole before being cut "
+                f"into chunks. excel files stream with engine "
+                f"{' | '.join(EXCEL_ENGINES)}, pickle files never do"
+            )
+            for key, df in ExcelFileHandler.read_file(
+                filepath, pandas_attributes, lineage_id=lineage_id
+            ).items():
+                for start in range(0, max(df.shape[0], 1), chunksize):
+                    yield key, df.iloc[start : start + chunksize]
+
     @staticmethod
     def save_dict_to_folder(target: dict[str, pd.DataFrame], folder_name: pathlib.Path):
         folder_name = (
@@ -218,3 +500,232 @@ class ExcelFileHandler:
             office_file.load_key(password=password)
             office_file.decrypt(decrypted_workbook)
         return decrypted_workbook
+
+
+class CsvPassthrough:
+    """file-like object streaming a csv/txt file as csv text with the 'Source' lineage
+    column (or source_file_id and source_row in compact mode) appended to every record,
+    without parsing the file into pandas.
+    It is meant to be handed straight to cursor.copy_expert (see Postgres.stream_insert_to_table).
+
+    Records are split on quote parity, so quoted fields with embedded new lines stay intact.
+    Records with fewer fields than the header are padded with nulls and records with more
+    fields are handled by on_bad_lines ('error', 'warn' or 'skip'), the same as pandas.
+    Fields pandas reads as NaN by default (empty, quoted or not, 'NA', 'N/A', 'null', 'nan',
+    ...) are written as NULL, so a file loads the same whether it is streamed or not.
+    Only a small set of pandas attributes can be honoured this way, see CsvPassthrough.is_supported.
+    """
+
+    supported_pandas_attributes = {
+        "encoding",
+        "encoding_errors",
+        "on_bad_lines",
+        "dtype",
+        "sep",
+        "delimiter",
+    }
+    text_dtypes = [object, str, "object", "str", "string"]
+    # fields read_csv reads as NaN by default. files setting na_values, keep_default_na or
+    # na_filter are read with pandas
+    na_values = STR_NA_VALUES | {""}
+
+    def __init__(
+        self,
+        filepath: pathlib.Path,
+        pandas_attributes: dict,
+        batch_lines: int = 10000,
+        source_file_id: Optional[int] = None,
+    ):
+        self.filepath = (
+            filepath if isinstance(filepath, pathlib.Path) else pathlib.Path(filepath)
+        )
+        self.sep = pandas_attributes.get("sep") or pandas_attributes.get(
+            "delimiter", ","
+        )
+        self.on_bad_lines = pandas_attributes.get("on_bad_lines", "error")
+        self.batch_lines = batch_lines
+        encoding = pandas_attributes.get("encoding") or "utf-8"
+        self.file = open(
+            self.filepath,
+            "r",
+            encoding="utf-8-sig"
+            if encoding.lower().replace("_", "-") in ["utf-8", "utf8"]
+            else encoding,
+            errors=pandas_attributes.get("encoding_errors", "strict"),
+            newline="",
+        )
+        self.source_file_id = source_file_id
+        self.source_prefix = (
+            f"{self.sep}{source_file_id}{self.sep}"
+            if source_file_id is not None
+            else f'{self.sep}"' + self.filepath.stem.replace('"', '""') + ":row:"
+        )
+        self.source_suffix = "\n" if source_file_id is not None else '"\n'
+        # na values as whole fields of unquoted records, one record per line. the class of
+        # first characters is checked first, which skips most positions quickly
+        na_values = sorted(value for value in STR_NA_VALUES if value)
+        field_end = f"[^{re.escape(self.sep)}\n]"
+        self._na_pattern = re.compile(
+            f"(?=[{''.join(sorted({re.escape(value[0]) for value in na_values}))}])"
+            f"(?<!{field_end})(?:{'|'.join(map(re.escape, na_values))})(?!{field_end})"
+        )
+        self._writer_buffer = io.StringIO()
+        # fields with new lines are only quoted if the line terminator contains them
+        self._writer = csv.writer(
+            self._writer_buffer, delimiter=self.sep, lineterminator="\r\n"
+        )
+        self.columns = self._header()
+        self.line_number = 1
+        self.row_number = 0
+        self.bad_lines = 0
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    @staticmethod
+    def is_supported(filepath: pathlib.Path, pandas_attributes: dict) -> bool:
+        """check whether a file can be streamed without pandas
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            file path
+        pandas_attributes : dict
+            pandas attributes configured for the dataset
+
+        Returns
+        -------
+        bool
+            True if the file is csv/txt and every pandas attribute can be honoured by CsvPassthrough
+        """
+        filepath = (
+            filepath if isinstance(filepath, pathlib.Path) else pathlib.Path(filepath)
+        )
+        sep = pandas_attributes.get("sep") or pandas_attributes.get("delimiter", ",")
+        return (
+            filepath.suffix.lower() in ExcelFileHandler.pd_filetype_mapper["csv"]
+            and set(pandas_attributes) <= CsvPassthrough.supported_pandas_attributes
+            and pandas_attributes.get("dtype", object) in CsvPassthrough.text_dtypes
+            and isinstance(sep, str)
+            and len(sep) == 1
+            and sep != '"'
+        )
+
+    def _next_record(self) -> Optional[str]:
+        """read one record, joining physical lines while a quoted field is open"""
+        record = self.file.readline()
+        if not record:
+            return None
+        while record.count('"') % 2:
+            line = self.file.readline()
+            if not line:
+                break
+            record += line
+        return record.rstrip("\r\n")
+
+    def _split(self, record: str) -> list[str]:
+        return next(csv.reader([record], delimiter=self.sep))
+
+    def _header(self) -> list[str]:
+        record = self._next_record()
+        if record is None:
+            raise ValueError(f"file {self.filepath.name} is empty")
+        columns = []
+        for i, col in enumerate(self._split(record)):
+            col = col or f"Unnamed: {i}"
+            name, counter = col, 1
+            while name in columns:
+                name = f"{col}.{counter}"
+                counter += 1
+            columns.append(name)
+        if self.source_file_id is not None:
+            return columns + list(ExcelFileHandler.compact_lineage_columns)
+        return columns + ["Source"]
+
+    @property
+    def n_lineage_columns(self) -> int:
+        return 1 if self.source_file_id is None else 2
+
+    def _null_fields(self, fields: list[str]) -> str:
+        """a record of fields with na values written as unquoted empty fields, i.e. NULL"""
+        self._writer_buffer.seek(0)
+        self._writer_buffer.truncate()
+        # a trailing field keeps a single empty field from being written as "", it is cut
+        # off with the line terminator
+        self._writer.writerow(
+            [None if field in self.na_values else field for field in fields] + [None]
+        )
+        return self._writer_buffer.getvalue()[:-3]
+
+    def _format(self, record: str) -> Optional[str]:
+        """a record padded to the header with its lineage, and na values as NULL if it has
+        quotes (others are done a batch at a time, see _read_batch). None for blank and bad
+        lines"""
+        self.line_number += 1
+        if not record:
+            return None
+        if '"' in record:
+            fields = self._split(record)
+            n_fields = len(fields)
+        else:
+            fields = None
+            n_fields = record.count(self.sep) + 1
+        expected = len(self.columns) - self.n_lineage_columns
+        if n_fields > expected:
+            message = f"Skipping line {self.line_number}: expected {expected} fields, saw {n_fields}"
+            if self.on_bad_lines == "error":
+                raise ValueError(f"{self.filepath.name}: " + message)
+            if self.on_bad_lines == "warn":
+                warnings.warn(f"{self.filepath.name}: " + message)
+            self.bad_lines += 1
+            return None
+        self.row_number += 1
+        if fields is not None:
+            record = self._null_fields(fields)
+        return (
+            record
+            + self.sep * (expected - n_fields)
+            + f"{self.source_prefix}{self.row_number + 1}{self.source_suffix}"
+        )
+
+    def _read_batch(self) -> str:
+        batch, quoted = [], []
+        for _ in range(self.batch_lines):
+            record = self._next_record()
+            if record is None:
+                self._eof = True
+                break
+            line = self._format(record)
+            if line is not None:
+                batch.append(line)
+                quoted.append('"' in record)
+        # lineage never holds a whole na value unless the file name contains the separator,
+        # so without quoted records one substitution over the batch is enough
+        if not any(quoted) and self.sep not in self.filepath.stem:
+            return self._na_pattern.sub("", "".join(batch))
+        lines = []
+        for line, is_quoted in zip(batch, quoted):
+            if not is_quoted:
+                lineage = line.rindex(self.source_prefix)
+                line = self._na_pattern.sub("", line[:lineage]) + line[lineage:]
+            lines.append(line)
+        return "".join(lines)
+
+    def read(self, size: int = -1) -> str:
+        """read csv text including the lineage column(s), for cursor.copy_expert"""
+        while (size < 0 or len(self._buffer) - self._pos < size) and not self._eof:
+            self._buffer = self._buffer[self._pos :] + self._read_batch()
+            self._pos = 0
+        end = len(self._buffer) if size < 0 else self._pos + size
+        result = self._buffer[self._pos : end]
+        self._pos = end
+        return result
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
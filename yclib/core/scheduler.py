@@ -0,0 +1,283 @@
+import pandas as pd
+import numpy as np
+import pathlib
+import zipfile
+import io
+import os
+import sys
+import gc
+import ctypes
+from typing import Hashable, Optional
+from .reader import CsvPassthrough, ExcelFileHandler
+
+
+class MemoryEstimator:
+    """estimate the in-memory footprint of source files once read into pandas,
+    and pack files into concurrent waves under a memory budget.
+
+    Estimates start from the file format:
+        csv/txt: the first sample_bytes are parsed by pandas and the measured bytes per
+            file byte are scaled up to the file size
+        xlsx/xlsm: the uncompressed size of the worksheet and shared string xml parts,
+            times an expansion factor
+        xls/xlsb/pkl: file size times an expansion factor
+    and are then corrected by the median of actual/estimated recorded for the same suffix
+    in previous runs (see history). The actual memory is the peak resident memory of the
+    load (see PeakMemory), recorded against the uncorrected estimate.
+    """
+
+    expansion_factor = {
+        ".csv": 4.0,
+        ".txt": 4.0,
+        ".xlsx": 2.0,
+        ".xlsm": 2.0,
+        ".xlsb": 25.0,
+        ".xls": 4.0,
+        ".pkl": 1.5,
+    }
+    # bytes of the lineage column(s) per row: 'Source' string or compact integer ids
+    source_bytes_per_row = {"text": 80, "compact": 8}
+    # footprint of a file streamed with CsvPassthrough
+    passthrough_bytes = 64 * 1024**2
+    # minimum number of recorded runs before a suffix is calibrated
+    min_history = 3
+
+    def __init__(
+        self, history: Optional[pd.DataFrame] = None, sample_bytes: int = 1024**2
+    ):
+        """
+        Parameters
+        ----------
+        history : Optional[pd.DataFrame], optional
+            previous runs with columns suffix, estimated_memory and actual_memory,
+            i.e. table workflow.ingest_memory_profile, by default None
+        sample_bytes : int, optional
+            bytes read from the head of csv/txt files to measure their expansion, by default 1MB
+        """
+        self.sample_bytes = sample_bytes
+        self.correction = {}
+        if history is not None and not history.empty:
+            history = history.dropna(subset=["estimated_memory", "actual_memory"])
+            history = history.loc[history["estimated_memory"].astype(float) > 0]
+            ratio = history["actual_memory"].astype(float) / history[
+                "estimated_memory"
+            ].astype(float)
+            for suffix, group in ratio.groupby(history["suffix"]):
+                if group.shape[0] >= self.min_history:
+                    self.correction[suffix] = float(group.median())
+
+    def _csv_estimate(
+        self,
+        filepath: pathlib.Path,
+        pandas_attributes: dict,
+        size: int,
+        lineage: str = "text",
+    ) -> tuple[int, float]:
+        """returns (estimated bytes, estimated bytes per row)"""
+        with open(filepath, "rb") as file:
+            sample = file.read(self.sample_bytes)
+        if len(sample) == size:
+            sample_size = size
+        else:
+            # cut the sample at the last complete line
+            sample = sample[: sample.rfind(b"\n") + 1]
+            sample_size = len(sample)
+        try:
+            df = pd.read_csv(
+                io.BytesIO(sample),
+                **{
+                    key: val
+                    for key, val in pandas_attributes.items()
+                    if key not in ["chunksize", "iterator", "nrows"]
+                },
+            )
+        except Exception:
+            return int(size * self.expansion_factor[".csv"]), 0.0
+        if df.empty or sample_size == 0:
+            return int(size * self.expansion_factor[".csv"]), 0.0
+        bytes_per_row = (
+            df.memory_usage(deep=True).sum() / df.shape[0]
+            + self.source_bytes_per_row[lineage]
+        )
+        rows = df.shape[0] * size / sample_size
+        return int(bytes_per_row * rows), bytes_per_row
+
+    def _excel_estimate(self, filepath: pathlib.Path, size: int) -> int:
+        suffix = filepath.suffix.lower()
+        if suffix in [".xlsx", ".xlsm"] and zipfile.is_zipfile(filepath):
+            with zipfile.ZipFile(filepath) as workbook:
+                xml_size = sum(
+                    info.file_size
+                    for info in workbook.infolist()
+                    if info.filename.startswith("xl/worksheets/")
+                    or info.filename == "xl/sharedStrings.xml"
+                )
+            return int(xml_size * self.expansion_factor[suffix])
+        return int(size * self.expansion_factor.get(suffix, 4.0))
+
+    def estimate(
+        self, filepath: pathlib.Path, reading_config: dict, corrected: bool = True
+    ) -> int:
+        """estimate the peak memory in bytes to read a file with its dataset reading config
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            file path
+        reading_config : dict
+            yaml->ingest_source_data->datasets->[dataset name]->read_file
+        corrected : bool, optional
+            apply the correction of the history. the uncorrected estimate is the one to record
+            against the actual memory, see correct. by default True
+
+        Returns
+        -------
+        int
+            estimated bytes
+        """
+        filepath = (
+            filepath if isinstance(filepath, pathlib.Path) else pathlib.Path(filepath)
+        )
+        suffix = filepath.suffix.lower()
+        size = filepath.stat().st_size
+        pandas_attributes = reading_config.get("pandas_attributes", {})
+        filetype = ExcelFileHandler.get_filetype(filepath)
+
+        if filetype == "csv":
+            if (
+                reading_config.get("raw_copy", True)
+                and not reading_config.get("password")
+                and not reading_config.get("typed")
+                and CsvPassthrough.is_supported(filepath, pandas_attributes)
+            ):
+                return self.passthrough_bytes
+            estimated, bytes_per_row = self._csv_estimate(
+                filepath, pandas_attributes, size, reading_config.get("lineage", "text")
+            )
+            if reading_config.get("chunksize") and bytes_per_row:
+                estimated = min(estimated, int(bytes_per_row * reading_config["chunksize"]))
+        elif filetype == "excel":
+            estimated = self._excel_estimate(filepath, size)
+        else:
+            estimated = int(size * self.expansion_factor.get(suffix, 4.0))
+        return self.correct(filepath, estimated) if corrected else int(estimated)
+
+    def correct(self, filepath: pathlib.Path, estimated: int) -> int:
+        """an uncorrected estimate corrected by the history of the suffix of a file"""
+        suffix = pathlib.Path(filepath).suffix.lower()
+        return int(estimated * self.correction.get(suffix, 1.0))
+
+    @staticmethod
+    def bin_pack(
+        estimates: dict[Hashable, int], budget: float, max_items: int
+    ) -> list[list[Hashable]]:
+        """pack items into waves with first-fit decreasing: the largest items are placed first,
+        each into the first wave that still has room under the memory budget and the item limit.
+        A wave never exceeds the budget unless it holds a single item larger than the budget.
+
+        Parameters
+        ----------
+        estimates : dict[Hashable, int]
+            item as keys and estimated bytes as values
+        budget : float
+            memory budget per wave in bytes
+        max_items : int
+            maximum items per wave, i.e. CONCURRENCY_LIMIT
+
+        Returns
+        -------
+        list[list[Hashable]]
+            waves of items. the first wave holds the largest item
+        """
+        waves, loads = [], []
+        for item, size in sorted(estimates.items(), key=lambda kv: kv[1], reverse=True):
+            for i, wave in enumerate(waves):
+                if len(wave) < max_items and loads[i] + size <= budget:
+                    wave.append(item)
+                    loads[i] += size
+                    break
+            else:
+                waves.append([item])
+                loads.append(size)
+        return waves
+
+    @staticmethod
+    def dataframe_memory(df: pd.DataFrame) -> int:
+        """footprint of a dataframe in bytes"""
+        return int(np.sum(df.memory_usage(deep=True)))
+
+
+class PeakMemory:
+    """context manager measuring the peak resident memory of this process above its resident
+    memory when entered, so parser buffers, workbook xml trees and intermediate copies count,
+    not only the frames left at the end. The result is in bytes, None when it cannot be measured.
+
+    Memory freed by earlier work is handed back to the system when entered (gc and glibc
+    malloc_trim), as a block reusing it would not raise the resident memory. Memory held by
+    python's own allocator may still be reused, so a long-lived process measures somewhat less
+    than a fresh one.
+
+    On linux the peak (VmHWM) is reset when entered, through /proc/self/clear_refs. Elsewhere
+    the process high-water mark (ru_maxrss) only tells the peak when the block raised it, the
+    result is None otherwise. The peak is the one of the whole process: blocks measured at the
+    same time in several threads see each other's memory and reset each other's peak, so
+    concurrent loads are measured together (see tasklib.load_files_async).
+    """
+
+    def __init__(self):
+        self.bytes = None
+        self._rss_before = None
+        self._maxrss_before = None
+        self._reset = False
+
+    @staticmethod
+    def _status(field: str) -> Optional[int]:
+        """a memory field of /proc/self/status in bytes"""
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+        return None
+
+    @staticmethod
+    def _maxrss() -> Optional[int]:
+        """high-water mark of the resident memory of this process in bytes"""
+        try:
+            import resource
+        except ImportError:
+            return None
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on linux, bytes on macOS
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    @staticmethod
+    def _release_free_memory():
+        """hand memory freed by earlier work back to the system, so it is not reused unseen
+        by the measured block (glibc keeps freed heap memory resident)"""
+        gc.collect()
+        try:
+            ctypes.CDLL(None).malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+    def __enter__(self) -> "PeakMemory":
+        self._release_free_memory()
+        try:
+            self._rss_before = self._status("VmRSS")
+            with open("/proc/self/clear_refs", "w") as clear_refs:
+                clear_refs.write("5")
+            self._reset = self._rss_before is not None
+        except OSError:
+            self._reset = False
+        self._maxrss_before = self._maxrss()
+        return self
+
+    def __exit__(self, *exc):
+        if self._reset:
+            peak = self._status("VmHWM")
+            self.bytes = None if peak is None else max(peak - self._rss_before, 0)
+        else:
+            maxrss = self._maxrss()
+            if self._maxrss_before is not None and maxrss > self._maxrss_before:
+                self.bytes = maxrss - (self._rss_before or self._maxrss_before)
+        return False
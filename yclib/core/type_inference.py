@@ -0,0 +1,143 @@
+import pandas as pd
+import numpy as np
+from typing import Optional
+
+
+class TypeInference:
+    """infer column types of text read from source files, and check chunks against them.
+
+    Types are named like pandas dtypes, so Postgres.align_datatype maps them to postgres
+    types: 'int', 'float', 'bool', 'date', 'datetime' and 'object' (text).
+    Inference is deliberately strict, as a wrong guess costs a table rewrite later, which
+    turns the rows already loaded into the postgres text of the type, not the source text
+    (see Postgres.alter_column_type):
+        int: optional sign and digits, no leading zero (codes like '007' stay text),
+            within the 32 bit range of postgres INT
+        float: decimal or scientific notation, no leading zero either
+        bool: true/false (any case)
+        date/datetime: ISO 8601 only (2022-07-01, 2022-07-01 13:45:00[.ffffff]), so
+            day/month order is never guessed
+    Null and empty values are ignored. A column without values is text.
+    """
+
+    patterns = {
+        "int": r"[+-]?(?:0|[1-9]\d*)",
+        "float": r"[+-]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?",
+        "bool": r"(?i:true|false)",
+        "date": r"\d{4}-\d{2}-\d{2}",
+        "datetime": r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?",
+    }
+    # candidates from the most to the least specific
+    order = ["int", "float", "bool", "date", "datetime"]
+    int_range = (-(2**31), 2**31 - 1)
+
+    def __init__(self, sample_rows: int = 10000, skip_columns: Optional[list] = None):
+        """
+        Parameters
+        ----------
+        sample_rows : int, optional
+            rows of the first frame used to infer types, by default 10000
+        skip_columns : Optional[list], optional
+            columns never inferred (e.g. lineage columns), by default None
+        """
+        self.sample_rows = sample_rows
+        self.skip_columns = set(skip_columns or [])
+
+    @staticmethod
+    def _values(series: pd.Series) -> pd.Series:
+        values = series.dropna()
+        values = values[values.astype(str).str.strip() != ""]
+        return values.astype(str).str.strip()
+
+    @classmethod
+    def check(cls, series: pd.Series, kind: str) -> bool:
+        """whether every non-empty value of a column can be loaded as a type"""
+        if kind == "object":
+            return True
+        if series.dtype != object and not pd.api.types.is_string_dtype(series.dtype):
+            return cls.dtype_kind(series) in ([kind, "int"] if kind == "float" else [kind])
+        values = cls._values(series)
+        if values.empty:
+            return True
+        if not values.str.fullmatch(cls.patterns[kind]).all():
+            return False
+        if kind == "int":
+            numbers = pd.to_numeric(values, errors="coerce")
+            return bool(numbers.between(*cls.int_range).all())
+        if kind in ["date", "datetime"]:
+            parsed = pd.to_datetime(values, errors="coerce", format="ISO8601")
+            return bool(parsed.notna().all())
+        return True
+
+    @classmethod
+    def dtype_kind(cls, series: pd.Series) -> str:
+        """type of a column that pandas already parsed (e.g. excel numbers and dates)"""
+        if pd.api.types.is_bool_dtype(series.dtype):
+            return "bool"
+        if pd.api.types.is_integer_dtype(series.dtype):
+            return "int" if series.between(*cls.int_range).all() else "float"
+        if pd.api.types.is_float_dtype(series.dtype):
+            return "float"
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return "datetime"
+        return "object"
+
+    def infer_column(self, series: pd.Series) -> str:
+        """the most specific type every sampled value fits"""
+        if series.dtype != object and not pd.api.types.is_string_dtype(series.dtype):
+            return self.dtype_kind(series)
+        values = self._values(series.head(self.sample_rows))
+        if values.empty:
+            return "object"
+        for kind in self.order:
+            if self.check(values, kind):
+                return kind
+        return "object"
+
+    def infer(self, df: pd.DataFrame) -> dict[str, str]:
+        """type per column of a frame, using its first sample_rows rows
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            first frame (or chunk) of a table
+
+        Returns
+        -------
+        dict[str, str]
+            column name as keys and type as values. skipped columns are left out
+        """
+        return {
+            col: self.infer_column(df[col])
+            for col in df.columns
+            if col not in self.skip_columns
+        }
+
+    def validate(self, df: pd.DataFrame, types: dict[str, str]) -> list[str]:
+        """columns of a frame whose values do not all fit their inferred type
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            frame or chunk
+        types : dict[str, str]
+            column types from infer
+
+        Returns
+        -------
+        list[str]
+            columns to downgrade to text
+        """
+        return [
+            col
+            for col, kind in types.items()
+            if kind != "object" and col in df.columns and not self.check(df[col], kind)
+        ]
+
+    @staticmethod
+    def empty_to_null(df: pd.DataFrame, types: dict[str, str]) -> pd.DataFrame:
+        """blank strings of typed columns as nulls, as postgres cannot cast '' to a number or date"""
+        typed = [col for col, kind in types.items() if kind != "object"]
+        if typed:
+            df[typed] = df[typed].replace(r"^\s*$", np.nan, regex=True)
+        return df
@@ -1,2 +1,6 @@
 from .datastore import ConnectionStatus, DataStore, NotConnectedError
+from ._arrow import arrow_csv_convert_options, arrow_to_pandas, postgres_arrow_type
+from ._binary_copy import BinaryCopyStream, binary_type
+from ._pool import ConnectionPool, PoolTimeoutError, get_pool, pool_stats
 from ._postgres import Postgres
+from ._async_postgres import AsyncPostgres
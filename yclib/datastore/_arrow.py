@@ -0,0 +1,100 @@
+import pandas as pd
+from typing import Optional
+
+
+def postgres_arrow_type(
+    type_code: int, precision: Optional[int] = None, scale: Optional[int] = None
+):
+    """pyarrow type of a postgres result column by type oid, types without a mapping as text.
+    numeric is never rounded: numeric(precision, scale) is read as an arrow decimal and
+    numeric without a type modifier (or wider than decimal128, which pyarrow's csv reader
+    cannot parse to decimal256) as its exact text
+
+    Parameters
+    ----------
+    type_code : int
+        type oid
+    precision : Optional[int], optional
+        precision of a numeric column declared with a type modifier, by default None
+    scale : Optional[int], optional
+        scale of a numeric column declared with a type modifier, by default None
+    """
+    import pyarrow as pa
+
+    if type_code == 1700:
+        if precision is not None and scale is not None and precision <= 38:
+            return pa.decimal128(precision, scale)
+        return pa.string()
+    return {
+        16: pa.bool_(),
+        20: pa.int64(),
+        21: pa.int16(),
+        23: pa.int32(),
+        700: pa.float32(),
+        701: pa.float64(),
+        1082: pa.date32(),
+        1114: pa.timestamp("us"),
+        1184: pa.timestamp("us", tz="UTC"),
+    }.get(type_code, pa.string())
+
+
+def arrow_csv_convert_options(
+    column_types: dict[str, int],
+    null: str,
+    numeric_modifiers: Optional[dict[str, tuple[int, int]]] = None,
+):
+    """pyarrow csv ConvertOptions for COPY ... TO STDOUT (FORMAT csv) output: columns typed by
+    their postgres type oid (see postgres_arrow_type), unquoted null as NULL and quoted empty
+    strings kept as empty strings
+
+    Parameters
+    ----------
+    column_types : dict[str, int]
+        result column names and their type oids
+    null : str
+        NULL string of the COPY
+    numeric_modifiers : Optional[dict[str, tuple[int, int]]], optional
+        (precision, scale) of the numeric columns declared with a type modifier, by default None
+
+    Returns
+    -------
+    pyarrow.csv.ConvertOptions
+        convert options
+    """
+    import pyarrow.csv as pacsv
+
+    return pacsv.ConvertOptions(
+        column_types={
+            name: postgres_arrow_type(
+                type_code, *(numeric_modifiers or {}).get(name, (None, None))
+            )
+            for name, type_code in column_types.items()
+        },
+        null_values=[null],
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+        true_values=["t"],
+        false_values=["f"],
+    )
+
+
+def arrow_to_pandas(table, zero_copy: bool = True) -> pd.DataFrame:
+    """pyarrow Table (or RecordBatch) as a dataframe
+
+    Parameters
+    ----------
+    table : pyarrow.Table | pyarrow.RecordBatch
+        arrow result, e.g. of DataStore.get_query_arrow
+    zero_copy : bool, optional
+        True backs every column with its arrow array (pd.ArrowDtype), so no data is copied
+        and text stays in arrow's compact string layout instead of one python str per value.
+        False converts to numpy dtypes and python objects. by default True
+
+    Returns
+    -------
+    pd.DataFrame
+        the dataframe
+    """
+    if zero_copy:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas()
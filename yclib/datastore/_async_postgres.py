@@ -0,0 +1,247 @@
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+import yclib.datastore as ds
+from ._arrow import arrow_csv_convert_options, arrow_to_pandas
+import pandas as pd
+import asyncio
+
+
+def _quote_ident(name: str) -> str:
+    """quote an identifier, as psycopg2.sql.Identifier does"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+@dataclass
+class AsyncPostgres(ds.DataStore):
+    """Execute Postgres commands on an asyncio event loop, with asyncpg.
+
+    connect() opens a pool of pool_size connections. Every method borrows its own connection
+    for the statement, so COPY streams and catalog queries started with asyncio.gather or
+    as separate tasks run concurrently instead of one after another.
+    """
+
+    DB_CREDENTIAL: dict | None
+
+    def __init__(self, DB_CREDENTIAL: dict, pool_size: int = 4):
+        self.credentials = DB_CREDENTIAL
+        self.pool_size = pool_size
+        self.pool = None
+
+    @staticmethod
+    def _asyncpg_credentials(credentials: dict) -> dict:
+        """psycopg2 style credentials (dbname) as asyncpg.connect arguments (database)"""
+        return {
+            ("database" if key == "dbname" else key): val
+            for key, val in credentials.items()
+        }
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[None]:
+        """Async context manager for a pool of postgres connections"""
+        import asyncpg
+
+        self.pool = await asyncpg.create_pool(
+            min_size=1,
+            max_size=self.pool_size,
+            **self._asyncpg_credentials(self.credentials),
+        )
+        try:
+            yield
+        finally:
+            await self.pool.close()
+            self.pool = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Async context manager borrowing a connection of the pool"""
+        if self.status != ds.ConnectionStatus.CONNECTED:
+            raise ds.NotConnectedError
+        async with self.pool.acquire() as connection:
+            yield connection
+
+    @property
+    def status(self) -> ds.ConnectionStatus:
+        """Returns the status of the connection pool"""
+        if self.pool is None or self.pool.is_closing():
+            return ds.ConnectionStatus.DISCONNECTED
+        else:
+            return ds.ConnectionStatus.CONNECTED
+
+    async def execute(self, query: str, *args) -> str:
+        """execute a statement ($1, $2... parameters) and return its status, e.g. 'INSERT 0 1'"""
+        async with self.acquire() as connection:
+            return await connection.execute(query, *args)
+
+    async def get_query_results(self, query: str, *args) -> pd.DataFrame:
+        """Runs the query, returning results as a dataframe"""
+        async with self.acquire() as connection:
+            statement = await connection.prepare(query)
+            records = await statement.fetch(*args)
+            return pd.DataFrame.from_records(
+                [tuple(record) for record in records],
+                columns=[attribute.name for attribute in statement.get_attributes()],
+            )
+
+    async def get_query_arrow(self, query: str, *args, spool_size: int = 64 * 1024**2):
+        """Runs the query, returning results as a pyarrow Table. The COPY output is spooled as
+        Postgres.get_query_arrow does and parsed by pyarrow's csv reader in an executor thread.
+        asyncpg does not report type modifiers, so numeric is always read as its exact text
+
+        Parameters
+        ----------
+        query : str
+            SELECT query ($1, $2... parameters)
+        *args :
+            query parameters
+        spool_size : int, optional
+            bytes of COPY output kept in memory before spilling to disk, by default 64MB
+
+        Returns
+        -------
+        pyarrow.Table
+            query result
+        """
+        import pyarrow.csv as pacsv
+
+        query = query.strip().rstrip(";")
+        with SpooledTemporaryFile(max_size=spool_size, mode="w+b") as spool:
+            async with self.acquire() as connection:
+                statement = await connection.prepare(query)
+                column_types = {
+                    attribute.name: attribute.type.oid
+                    for attribute in statement.get_attributes()
+                }
+                await connection.copy_from_query(
+                    query,
+                    *args,
+                    output=spool,
+                    format="csv",
+                    header=True,
+                    null=ds.Postgres.copy_null,
+                )
+            spool.seek(0)
+            return await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: pacsv.read_csv(
+                    spool,
+                    convert_options=arrow_csv_convert_options(
+                        column_types, ds.Postgres.copy_null
+                    ),
+                ),
+            )
+
+    async def get_query_arrow_dataframe(self, query: str, *args) -> pd.DataFrame:
+        """Runs the query, returning results as a dataframe backed by arrow arrays
+        (pd.ArrowDtype), converted from get_query_arrow without copying"""
+        return arrow_to_pandas(await self.get_query_arrow(query, *args))
+
+    async def create_schema(self, schema: str):
+        await self.execute(f"CREATE SCHEMA IF NOT EXISTS {_quote_ident(schema)}")
+        return f"schema {schema} is created"
+
+    async def create_table(
+        self,
+        schema: str,
+        table: str,
+        column_with_dtype: Optional[dict[str, str]] = None,
+    ):
+        await self.execute(
+            "CREATE TABLE IF NOT EXISTS {schema}.{table} ({columns});".format(
+                schema=_quote_ident(schema),
+                table=_quote_ident(table),
+                columns=",".join(
+                    f"{_quote_ident(key)} {val}"
+                    for key, val in column_with_dtype.items()
+                ),
+            )
+        )
+        return f"table {table} are created with structure {column_with_dtype}"
+
+    async def inspect_table(self, schema: str, table: str) -> dict[str, str]:
+        async with self.acquire() as connection:
+            records = await connection.fetch(
+                "SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = $1 and table_name = $2;",
+                schema,
+                table,
+            )
+            return {record[0]: record[1] for record in records}
+
+    async def dataframe_insert_to_table(
+        self, schema: str, table: str, df: pd.DataFrame
+    ):
+        """COPY a dataframe into a table as csv. The dataframe is formatted in an executor
+        thread, so the event loop keeps serving other COPY streams meanwhile
+
+        Parameters
+        ----------
+        schema : str
+            schema name
+        table : str
+            table name
+        df : pd.DataFrame
+            dataframe with columns of the table
+        """
+
+        def _to_csv() -> BytesIO:
+            buffer = BytesIO()
+            df.to_csv(buffer, index=False, header=False, encoding="utf-8")
+            buffer.seek(0)
+            return buffer
+
+        buffer = await asyncio.get_running_loop().run_in_executor(None, _to_csv)
+        async with self.acquire() as connection:
+            await connection.copy_to_table(
+                table,
+                source=buffer,
+                columns=[str(col) for col in df.columns],
+                schema_name=schema,
+                format="csv",
+            )
+        return f'{df.shape[0]} records are inserted into "{schema}.{table}"'
+
+    async def stream_insert_to_table(
+        self,
+        schema: str,
+        table: str,
+        stream,
+        columns: list[str],
+        delimiter: str = ",",
+        block_size: int = 65536,
+    ):
+        """COPY a file-like object of csv text (without header) into a table. The stream is
+        read in an executor thread one block at a time, see Postgres.stream_insert_to_table
+
+        Parameters
+        ----------
+        schema : str
+            schema name
+        table : str
+            table name
+        stream :
+            file-like object with a read(size) method, e.g. yclib.core.CsvPassthrough
+        columns : list[str]
+            target columns, in the order of the fields in the stream
+        delimiter : str, optional
+            csv delimiter, by default ","
+        block_size : int, optional
+            size of the blocks read from the stream, by default 65536
+        """
+        loop = asyncio.get_running_loop()
+
+        async def _blocks():
+            while block := await loop.run_in_executor(None, stream.read, block_size):
+                yield block.encode() if isinstance(block, str) else block
+
+        async with self.acquire() as connection:
+            status = await connection.copy_to_table(
+                table,
+                source=_blocks(),
+                columns=columns,
+                schema_name=schema,
+                format="csv",
+                delimiter=delimiter,
+            )
+        return f'{status.split()[-1]} records are inserted into "{schema}.{table}"'
@@ -0,0 +1,237 @@
+from psycopg2.extensions import connection, TRANSACTION_STATUS_IDLE
+from contextlib import contextmanager
+from typing import Generator
+import threading
+import psycopg2
+import time
+import os
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection became free within the timeout"""
+
+
+class ConnectionPool:
+    """thread-safe, size-bounded pool of postgres connections for one set of credentials.
+
+    Borrowing prefers an idle connection (a hit), opens a new one while the pool holds fewer
+    than max_size (a miss) and otherwise waits until one is returned. Connections idle for
+    longer than health_check_interval are checked with 'SELECT 1' before being handed out and
+    replaced when broken, so callers transparently get a working connection after a server
+    restart or a dropped socket. Connecting and checking happen outside the pool lock, on a
+    slot reserved under it, so a slow server never blocks other borrowers. A connection that
+    breaks while borrowed is not replaced: the error reaches the caller, as the work done in
+    its transaction is lost, and the connection is discarded when returned.
+    Returned connections are rolled back and reset to non-autocommit; broken ones are discarded.
+
+    Counters are kept in ConnectionPool.stats:
+        borrowed: connections handed out
+        hits: borrowed from the idle connections
+        created: connections opened (misses and reconnects)
+        waits: borrows that had to wait for a connection to be returned
+        wait_seconds: total time spent waiting
+        health_check_failures: idle connections found broken
+        discarded: connections closed by the pool (churn)
+    """
+
+    def __init__(
+        self,
+        credentials: dict,
+        max_size: int = 8,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+    ):
+        """
+        Parameters
+        ----------
+        credentials : dict
+            psycopg2.connect keyword arguments
+        max_size : int, optional
+            maximum connections open at once, by default 8
+        timeout : float, optional
+            seconds to wait for a free connection before PoolTimeoutError, by default 30.0
+        health_check_interval : float, optional
+            idle seconds after which a connection is checked before reuse, by default 30.0
+        """
+        self.credentials = credentials
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.stats = dict.fromkeys(
+            [
+                "borrowed",
+                "hits",
+                "created",
+                "waits",
+                "wait_seconds",
+                "health_check_failures",
+                "discarded",
+            ],
+            0,
+        )
+        # idle connections with the time they were returned, most recent last
+        self._idle = []
+        self._in_use = set()
+        # slots of connections being opened or checked outside the lock
+        self._pending = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        """connections currently open (idle, in use, being opened or checked)"""
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    def _is_healthy(self, conn: connection, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn: connection):
+        with self._condition:
+            self.stats["discarded"] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self) -> connection:
+        """borrow a connection. It has to be given back with putconn"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            with self._condition:
+                while True:
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        break
+                    if self.size < self.max_size:
+                        conn, idle_since = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"no connection became free within {self.timeout} seconds, "
+                            f"all {self.max_size} are in use"
+                        )
+                    if not waited:
+                        self.stats["waits"] += 1
+                        waited = True
+                    start = time.monotonic()
+                    self._condition.wait(remaining)
+                    self.stats["wait_seconds"] += time.monotonic() - start
+                self._pending += 1
+            # the slot is reserved, connect or check without holding the lock
+            try:
+                if conn is None:
+                    conn = psycopg2.connect(**self.credentials)
+                    outcome = "created"
+                elif self._is_healthy(conn, idle_since):
+                    outcome = "hits"
+                else:
+                    self._discard(conn)
+                    outcome = "health_check_failures"
+            except BaseException:
+                with self._condition:
+                    self._pending -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._pending -= 1
+                self.stats[outcome] += 1
+                if outcome != "health_check_failures":
+                    self._in_use.add(conn)
+                    self.stats["borrowed"] += 1
+                    return conn
+                # the slot is free again, take another idle connection or open a new one
+
+    def putconn(self, conn: connection, discard: bool = False):
+        """give a borrowed connection back
+
+        Parameters
+        ----------
+        conn : connection
+            connection from getconn
+        discard : bool, optional
+            close the connection instead of keeping it, by default False
+        """
+        with self._condition:
+            self._in_use.discard(conn)
+            if not discard and not conn.closed:
+                try:
+                    if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    conn.autocommit = False
+                except psycopg2.Error:
+                    discard = True
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Generator[connection, None, None]:
+        """context manager borrowing a connection"""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """close idle connections. connections in use are closed when they are returned"""
+        with self._condition:
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._closed = True
+
+
+# pools of this process, by credentials
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(credentials: dict, **kwargs) -> ConnectionPool:
+    """the ConnectionPool of this process for a set of credentials, created on first use.
+    Pools are never shared across processes: a forked or spawned process gets its own
+
+    Parameters
+    ----------
+    credentials : dict
+        psycopg2.connect keyword arguments
+    **kwargs :
+        ConnectionPool arguments, used when the pool is created
+
+    Returns
+    -------
+    ConnectionPool
+        the pool
+    """
+    key = (os.getpid(), tuple(sorted((k, str(v)) for k, v in credentials.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(dict(credentials), **kwargs)
+        return _pools[key]
+
+
+def pool_stats() -> dict[str, dict]:
+    """stats of the pools of this process, by host/dbname/user"""
+    return {
+        "{host}/{dbname}/{user}".format(
+            host=pool.credentials.get("host"),
+            dbname=pool.credentials.get("dbname"),
+            user=pool.credentials.get("user"),
+        ): dict(pool.stats, size=pool.size)
+        for (pid, _), pool in _pools.items()
+        if pid == os.getpid()
+    }
@@ -1,14 +1,20 @@
 from dataclasses import dataclass
 from psycopg2 import sql
-from contextlib import contextmanager
+from contextlib import closing, contextmanager
+from decimal import Decimal
 import pandas as pd
-from typing import Iterable, Optional, Literal
+from typing import ClassVar, Iterable, Optional, Literal
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT, cursor, connection
 from psycopg2.errors import DuplicateDatabase
 from io import StringIO
+from tempfile import SpooledTemporaryFile
 import yclib.datastore as ds
-from typing import Generator
+from ._binary_copy import BinaryCopyStream, binary_type
+from ._pool import get_pool
+from ._arrow import arrow_csv_convert_options
+from typing import Generator, Iterator
 import psycopg2
+import uuid
 import re
 
 
@@ -17,13 +23,41 @@ class Postgres(ds.DataStore):
     """Execute Postgres commands"""
 
     DB_CREDENTIAL: dict | None
+    # max connections of the per-process pool connect() borrows from, see configure_pool.
+    # 0 opens and closes a connection per connect()
+    pool_size: ClassVar[int] = 0
 
-    def __init__(self, DB_CREDENTIAL: dict):
+    def __init__(self, DB_CREDENTIAL: dict, pool_size: Optional[int] = None):
         self.credentials = DB_CREDENTIAL
+        self.connection = None
+        if pool_size is not None:
+            self.pool_size = pool_size
+
+    @classmethod
+    def configure_pool(cls, pool_size: int):
+        """borrow connections from a per-process ConnectionPool of pool_size connections
+        (per credentials) in connect(), for every Postgres object of this process
+
+        Parameters
+        ----------
+        pool_size : int
+            maximum connections per credentials, 0 disables pooling
+        """
+        cls.pool_size = pool_size
 
     @contextmanager
     def connect(self) -> connection:
-        """Context manager for a postgres connection"""
+        """Context manager for a postgres connection, borrowed from the pool of this process
+        if pool_size is set"""
+        if self.pool_size:
+            pool = get_pool(self.credentials, max_size=self.pool_size)
+            self.connection = pool.getconn()
+            try:
+                yield
+            finally:
+                pool.putconn(self.connection)
+                self.connection = None
+            return
         self.connection = psycopg2.connect(**self.credentials)
         try:
             yield
@@ -64,6 +98,7 @@ class Postgres(ds.DataStore):
             "float": "numeric",
             "bool": "boolean",
             "datetime": "timestamp",
+            "date": "date",
             "timedelta": "interval",
             "UUID": "UUID",
         }
@@ -128,6 +163,55 @@ class Postgres(ds.DataStore):
             self.connection.commit()
             return f"table {table} are created with structure {column_with_dtype}"
 
+    def drop_table(self, schema: str, table: str, cascade: bool = False):
+        with self.cursor() as cursor:
+            cursor.execute(
+                sql.SQL("DROP TABLE IF EXISTS {schema}.{table}{cascade};").format(
+                    schema=sql.Identifier(schema),
+                    table=sql.Identifier(table),
+                    cascade=sql.SQL(" CASCADE" if cascade else ""),
+                )
+            )
+            self.connection.commit()
+            return f"table {schema}.{table} is dropped"
+
+    def execute(self, query: str or sql.Composable, vars: Optional[Iterable] = None):
+        """execute a statement without results and commit"""
+        with self.cursor() as cursor:
+            cursor.execute(query, vars)
+            rowcount = cursor.rowcount
+            self.connection.commit()
+            return f"{rowcount} records are affected"
+
+    def execute_fetchone(
+        self, query: str or sql.Composable, vars: Optional[Iterable] = None
+    ) -> Optional[tuple]:
+        """execute a statement, commit and return its first row, e.g. of INSERT ... RETURNING"""
+        with self.cursor() as cursor:
+            cursor.execute(query, vars)
+            result = cursor.fetchone()
+            self.connection.commit()
+            return result
+
+    def alter_column_type(self, schema: str, table: str, column: str, dtype: str):
+        """change the type of a column, e.g. to text, which every type can be cast to.
+        values already in the column are rewritten with the postgres cast, so they are not the
+        source text any more, e.g. 1e5 becomes 100000 and 2024-01-02T03:04 becomes
+        2024-01-02 03:04:00"""
+        with self.cursor() as cursor:
+            cursor.execute(
+                sql.SQL(
+                    "ALTER TABLE {schema}.{table} ALTER COLUMN {column} TYPE {dtype} USING {column}::{dtype};"
+                ).format(
+                    schema=sql.Identifier(schema),
+                    table=sql.Identifier(table),
+                    column=sql.Identifier(column),
+                    dtype=sql.SQL(dtype),
+                )
+            )
+            self.connection.commit()
+            return f"column {column} of {schema}.{table} is changed to {dtype}"
+
     def create_column(
         self,
         schema: str,
@@ -153,28 +237,549 @@ class Postgres(ds.DataStore):
             self.connection.commit()
             return f"additional columns {str(column_with_dtype)} are created in table {table}"
 
-    def dataframe_insert_to_table(self, schema: str, table: str, df: pd.DataFrame):
+    @staticmethod
+    def copy_from_query(
+        schema: str, table: str, columns: Iterable, options: str or sql.Composable
+    ) -> sql.Composed:
+        """COPY ... FROM STDIN statement listing its target columns, so columns of the table
+        not in the list get their default (e.g. recorded_at timestamp default now())
+
+        Parameters
+        ----------
+        schema : str
+            schema name
+        table : str
+            table name
+        columns : Iterable
+            target columns, in the order of the fields
+        options : str or sql.Composable
+            COPY options, e.g. "FORMAT binary"
+
+        Returns
+        -------
+        sql.Composed
+            the COPY statement
+        """
+        return sql.SQL(
+            "COPY {schema}.{table} ({columns}) FROM STDIN ({options})"
+        ).format(
+            schema=sql.Identifier(schema),
+            table=sql.Identifier(table),
+            columns=sql.SQL(",").join(sql.Identifier(str(col)) for col in columns),
+            options=sql.SQL(options) if isinstance(options, str) else options,
+        )
+
+    def dataframe_insert_to_table(
+        self,
+        schema: str,
+        table: str,
+        df: pd.DataFrame,
+        copy_format: Literal["csv", "binary"] = "csv",
+        column_types: Optional[dict[str, str]] = None,
+    ):
+        """COPY a dataframe into a table
+
+        Parameters
+        ----------
+        schema : str
+            schema name
+        table : str
+            table name
+        df : pd.DataFrame
+            dataframe with columns of the table. columns of the table not in df get their default
+        copy_format : Literal["csv", "binary"], optional
+            'csv' formats the dataframe with to_csv. 'binary' encodes typed columns straight
+            into binary COPY format (see BinaryCopyStream); falls back to csv when a target
+            column type has no binary encoding. by default 'csv'
+        column_types : Optional[dict[str, str]], optional
+            postgres types of the target columns for binary COPY, by default looked up
+            with inspect_table
+        """
+        if copy_format == "binary":
+            column_types = column_types or self.inspect_table(schema, table)
+            column_types = {col: column_types[col] for col in df.columns}
+            if all(binary_type(dt) for dt in column_types.values()):
+                with self.cursor() as cursor:
+                    cursor.copy_expert(
+                        self.copy_from_query(
+                            schema, table, df.columns, "FORMAT binary"
+                        ),
+                        BinaryCopyStream(df, column_types),
+                    )
+                    self.connection.commit()
+                    return f'{df.shape[0]} records are inserted into "{schema}.{table}"'
         with self.cursor() as cursor:
             buffer = StringIO()
             df.to_csv(buffer, index=False)
             buffer.seek(0)
             cursor.copy_expert(
-                f"""COPY "{schema}"."{table}" FROM STDIN (FORMAT 'csv', HEADER True)""",
+                self.copy_from_query(
+                    schema, table, df.columns, "FORMAT 'csv', HEADER True"
+                ),
                 buffer,
             )
             self.connection.commit()
             return f'{df.shape[0]} records are inserted into "{schema}.{table}"'
 
-    def query_to_dataframe(self, query: str) -> pd.DataFrame:
+    def stream_insert_to_table(
+        self,
+        schema: str,
+        table: str,
+        stream,
+        columns: list[str],
+        delimiter: str = ",",
+    ):
+        """COPY a file-like object of csv text (without header) into a table.
+        The stream is read in small blocks by copy_expert, so it is never held in memory at once.
+
+        Parameters
+        ----------
+        schema : str
+            schema name
+        table : str
+            table name
+        stream :
+            file-like object with a read(size) method, e.g. yclib.core.CsvPassthrough
+        columns : list[str]
+            target columns, in the order of the fields in the stream
+        delimiter : str, optional
+            csv delimiter, by default ","
+        """
+        with self.cursor() as cursor:
+            options = sql.SQL(
+                "FORMAT 'csv', HEADER False, DELIMITER {delimiter}"
+            ).format(delimiter=sql.Literal(delimiter))
+            cursor.copy_expert(
+                self.copy_from_query(schema, table, columns, options),
+                stream,
+            )
+            rowcount = cursor.rowcount
+            self.connection.commit()
+            return f'{rowcount} records are inserted into "{schema}.{table}"'
+
+    # information_schema data types a NULL or a text value cannot be cast to by name
+    union_untyped = {"ARRAY", "USER-DEFINED"}
+
+    def union_select(
+        self, sources: list[tuple[str, str]]
+    ) -> tuple[sql.Composable, dict[str, str]]:
+        """UNION ALL of source tables with their columns aligned by name: a column missing
+        from a table is selected as NULL, and a column whose type differs between tables is
+        cast to text
+
+        Parameters
+        ----------
+        sources : list[tuple[str, str]]
+            (schema, table) of the tables
+
+        Returns
+        -------
+        tuple[sql.Composable, dict[str, str]]
+            the query, and the column types of its result
+        """
+        source_types = [self.inspect_table(schema, table) for schema, table in sources]
+        result_types = {}
+        for types in source_types:
+            for col, dtype in types.items():
+                dtype = "text" if dtype in self.union_untyped else dtype
+                if result_types.setdefault(col, dtype) != dtype:
+                    result_types[col] = "text"
+
+        def _column(types: dict[str, str], col: str) -> sql.Composable:
+            if col not in types:
+                return sql.SQL("NULL::{dtype} AS {col}").format(
+                    dtype=sql.SQL(result_types[col]), col=sql.Identifier(col)
+                )
+            if types[col] != result_types[col]:
+                return sql.SQL("{col}::text AS {col}").format(col=sql.Identifier(col))
+            return sql.Identifier(col)
+
+        query = sql.SQL(" UNION ALL ").join(
+            sql.SQL("SELECT {columns} FROM {schema}.{table}").format(
+                columns=sql.SQL(",").join(_column(types, col) for col in result_types),
+                schema=sql.Identifier(schema),
+                table=sql.Identifier(table),
+            )
+            for (schema, table), types in zip(sources, source_types)
+        )
+        return query, result_types
+
+    def describe_query(self, query: str or sql.Composable) -> dict[str, str]:
+        """result columns of a query and their types, named as in
+        information_schema.columns.data_type (e.g. 'integer', 'timestamp without time zone')"""
+        with self.cursor() as cursor:
+            cursor.execute(
+                sql.SQL("SELECT * FROM ({query}) q LIMIT 0").format(
+                    query=sql.SQL(query) if isinstance(query, str) else query
+                )
+            )
+            description = cursor.description
+            cursor.execute(
+                "SELECT oid, format_type(oid, NULL) FROM pg_type WHERE oid = ANY(%s)",
+                ([col.type_code for col in description],),
+            )
+            names = dict(cursor.fetchall())
+        return {col.name: names[col.type_code] for col in description}
+
+    def query_to_table(
+        self, schema: str, table: str, query: str or sql.Composable
+    ) -> int:
+        """materialize the result of a query into schema.table without moving data through
+        python: CREATE TABLE ... AS when the table does not exist, otherwise INSERT ... SELECT
+        with columns aligned by name. columns missing from the table are added, columns
+        missing from the result are left NULL and columns whose types differ become text
+
+        Parameters
+        ----------
+        schema : str
+            schema of the target table
+        table : str
+            target table name
+        query : str or sql.Composable
+            SELECT query
+
+        Returns
+        -------
+        int
+            rows added
+        """
+        query = sql.SQL(query) if isinstance(query, str) else query
+        target_types = self.inspect_table(schema, table)
+        target = sql.SQL("{schema}.{table}").format(
+            schema=sql.Identifier(schema), table=sql.Identifier(table)
+        )
+        result_types = self.describe_query(query) if target_types else {}
+        with self.cursor() as cursor:
+            if not target_types:
+                cursor.execute(
+                    sql.SQL("CREATE TABLE {target} AS {query}").format(
+                        target=target, query=query
+                    )
+                )
+            else:
+                self._align_columns(cursor, target, target_types, result_types)
+                cursor.execute(
+                    sql.SQL(
+                        "INSERT INTO {target} ({columns}) SELECT {values} FROM ({query}) q"
+                    ).format(
+                        target=target,
+                        columns=sql.SQL(",").join(map(sql.Identifier, result_types)),
+                        values=sql.SQL(",").join(
+                            sql.SQL("q.{col}").format(col=sql.Identifier(col))
+                            if target_types[col] == dtype
+                            else sql.SQL("q.{col}::text").format(col=sql.Identifier(col))
+                            for col, dtype in result_types.items()
+                        ),
+                        query=query,
+                    )
+                )
+            rowcount = cursor.rowcount
+            self.connection.commit()
+            return rowcount
+
+    @staticmethod
+    def _align_columns(
+        cursor: cursor,
+        target: sql.Composable,
+        target_types: dict[str, str],
+        column_types: dict[str, str],
+    ):
+        """add the columns missing from a table and turn the ones whose type differs to text,
+        updating target_types. types are named as in information_schema.columns.data_type"""
+        for col, dtype in column_types.items():
+            if col not in target_types:
+                statement = "ALTER TABLE {target} ADD COLUMN {col} {dtype}"
+                target_types[col] = dtype
+            elif target_types[col] not in [dtype, "text"]:
+                statement = "ALTER TABLE {target} ALTER COLUMN {col} TYPE {dtype} USING {col}::{dtype}"
+                target_types[col] = dtype = "text"
+            else:
+                continue
+            cursor.execute(
+                sql.SQL(statement).format(
+                    target=target, col=sql.Identifier(col), dtype=sql.SQL(dtype)
+                )
+            )
+
+    def align_table(
+        self, schema: str, table: str, column_with_dtype: dict[str, str]
+    ) -> dict[str, str]:
+        """create schema.table with the given columns, or align an existing table to them as
+        query_to_table does: columns missing from the table are added and columns whose types
+        differ become text, so rows with these columns can be inserted
+
+        Parameters
+        ----------
+        schema : str
+            schema of the table
+        table : str
+            table name
+        column_with_dtype : dict[str, str]
+            column names and postgres types, e.g. from align_datatype
+
+        Returns
+        -------
+        dict[str, str]
+            columns and types of the table, as inspect_table
+        """
+        target = sql.SQL("{schema}.{table}").format(
+            schema=sql.Identifier(schema), table=sql.Identifier(table)
+        )
+        with self.cursor() as cursor:
+            # type names as information_schema.columns.data_type, e.g. int4 -> integer
+            cursor.execute(
+                "SELECT t, format_type(t::regtype, NULL) FROM unnest(%s::text[]) t",
+                (list(set(column_with_dtype.values())),),
+            )
+            names = dict(cursor.fetchall())
+            column_types = {col: names[dtype] for col, dtype in column_with_dtype.items()}
+            target_types = self.inspect_table(schema, table)
+            if not target_types:
+                cursor.execute(
+                    sql.SQL("CREATE TABLE {target} ({columns})").format(
+                        target=target,
+                        columns=sql.SQL(",").join(
+                            sql.SQL("{col} {dtype}").format(
+                                col=sql.Identifier(col), dtype=sql.SQL(dtype)
+                            )
+                            for col, dtype in column_types.items()
+                        ),
+                    )
+                )
+                target_types = dict(column_types)
+            else:
+                self._align_columns(cursor, target, target_types, column_types)
+            self.connection.commit()
+        return target_types
+
+    def union_to_table(
+        self, schema: str, table: str, sources: list[tuple[str, str]]
+    ) -> int:
+        """materialize the UNION ALL of source tables (see union_select) into schema.table
+        inside postgres, see query_to_table
+
+        Parameters
+        ----------
+        schema : str
+            schema of the target table
+        table : str
+            target table name
+        sources : list[tuple[str, str]]
+            (schema, table) of the tables
+
+        Returns
+        -------
+        int
+            rows added
+        """
+        return self.query_to_table(schema, table, self.union_select(sources)[0])
+
+    def query_to_dataframe(
+        self, query: str, method: Literal["fetch", "copy"] = "fetch"
+    ) -> pd.DataFrame:
+        """run a query and return its result as a dataframe
+
+        Parameters
+        ----------
+        query : str
+            SELECT query
+        method : Literal["fetch", "copy"], optional
+            'fetch' builds the dataframe from fetchall tuples, with python values as psycopg2
+            returns them (e.g. Decimal for numeric). 'copy' reads COPY (query) TO STDOUT as csv
+            straight into columns without per-row tuples, much faster and lighter for large
+            results; types are restored from the result columns (see copy_dtypes), numeric
+            as Decimal like 'fetch' and timestamptz as UTC. by default 'fetch'
+        """
+        if method == "copy":
+            with closing(self.read_query_in_chunks(query, None, "copy")) as chunks:
+                return next(chunks)
         with self.cursor() as cursor:
             cursor.execute(query)
             data = cursor.fetchall()
             df = pd.DataFrame(data=data, columns=[col[0] for col in cursor.description])
             return df
 
+    # result column type oid -> pandas dtype for results read with COPY. others are read as text,
+    # except numeric, parsed to Decimal (see _copy_decimal) so no digit is lost
+    copy_dtypes = {
+        16: "boolean",
+        20: "Int64",
+        21: "Int64",
+        23: "Int64",
+        700: "float64",
+        701: "float64",
+    }
+    # date, timestamp, timestamptz
+    copy_datetime_types = {1082, 1114, 1184}
+    copy_null = "\\N"
+
+    @staticmethod
+    def _copy_decimal(value: str) -> Optional[Decimal]:
+        """numeric value of COPY csv output, None for NULL"""
+        return None if value == Postgres.copy_null else Decimal(value)
+
+    @contextmanager
+    def _copy_query(self, query: str, spool_size: int) -> Generator[tuple, None, None]:
+        """spool COPY (query) TO STDOUT as csv (with header, NULL as copy_null) to a temporary
+        file, kept in memory up to spool_size bytes. yields (result description, spool at 0)"""
+        query = query.strip().rstrip(";")
+        with self.cursor() as cursor:
+            cursor.execute(
+                sql.SQL("SELECT * FROM ({query}) q LIMIT 0").format(query=sql.SQL(query))
+            )
+            description = cursor.description
+        with SpooledTemporaryFile(max_size=spool_size, mode="w+b") as spool:
+            with self.cursor() as cursor:
+                cursor.copy_expert(
+                    sql.SQL(
+                        "COPY ({query}) TO STDOUT (FORMAT csv, HEADER true, NULL {null})"
+                    ).format(query=sql.SQL(query), null=sql.Literal(self.copy_null)),
+                    spool,
+                )
+            spool.seek(0)
+            yield description, spool
+
+    def read_query_in_chunks(
+        self,
+        query: str,
+        chunksize: Optional[int] = 100000,
+        method: Literal["cursor", "copy"] = "cursor",
+        spool_size: int = 64 * 1024**2,
+    ) -> Iterator[pd.DataFrame]:
+        """run a query and yield its result as dataframes of chunksize rows, so a large result
+        is never held in memory at once
+
+        Parameters
+        ----------
+        query : str
+            SELECT query
+        chunksize : Optional[int], optional
+            rows per dataframe, None for one dataframe. by default 100000
+        method : Literal["cursor", "copy"], optional
+            'cursor' fetches chunksize rows at a time from a named (server-side) cursor, with
+            python values as query_to_dataframe(method='fetch'). 'copy' spools
+            COPY (query) TO STDOUT to a temporary file (in memory up to spool_size) and parses it
+            with pandas' chunked csv reader, as query_to_dataframe(method='copy').
+            by default 'cursor'
+        spool_size : int, optional
+            bytes of COPY output kept in memory before spilling to disk, by default 64MB
+
+        Yields
+        ------
+        Iterator[pd.DataFrame]
+            chunks in result order. at least one, possibly empty, dataframe is yielded
+        """
+        if self.status != ds.ConnectionStatus.CONNECTED:
+            raise ds.NotConnectedError
+        query = query.strip().rstrip(";")
+        if method == "copy":
+            with self._copy_query(query, spool_size) as (description, spool):
+                reader = pd.read_csv(
+                    spool,
+                    chunksize=chunksize,
+                    dtype={
+                        col.name: self.copy_dtypes.get(col.type_code, "object")
+                        for col in description
+                        if col.type_code not in self.copy_datetime_types | {1700}
+                    },
+                    converters={
+                        col.name: self._copy_decimal
+                        for col in description
+                        if col.type_code == 1700
+                    },
+                    keep_default_na=False,
+                    na_values=[self.copy_null],
+                    true_values=["t"],
+                    false_values=["f"],
+                )
+                for df in [reader] if chunksize is None else reader:
+                    for col in description:
+                        if col.type_code in self.copy_datetime_types:
+                            # timestamptz is written in the session time zone, whose offset
+                            # changes across DST: parsed to UTC, as in get_query_arrow
+                            df[col.name] = pd.to_datetime(
+                                df[col.name], format="ISO8601", utc=col.type_code == 1184
+                            )
+                    yield df
+            return
+
+        # a named cursor lives in the current transaction until it is closed
+        cursor = self.connection.cursor(name=f"yclib_{uuid.uuid4().hex}")
+        try:
+            cursor.itersize = chunksize or 100000
+            cursor.execute(query)
+            rows = cursor.fetchmany(chunksize) if chunksize else cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+            yield pd.DataFrame(data=rows, columns=columns)
+            while chunksize and len(rows) == chunksize:
+                rows = cursor.fetchmany(chunksize)
+                if rows:
+                    yield pd.DataFrame(data=rows, columns=columns)
+        finally:
+            cursor.close()
+
+    def _arrow_convert_options(self, description):
+        return arrow_csv_convert_options(
+            {col.name: col.type_code for col in description},
+            self.copy_null,
+            {
+                # numeric without a type modifier reports 65535 for both
+                col.name: (col.precision, col.scale)
+                for col in description
+                if col.type_code == 1700 and col.internal_size != -1
+            },
+        )
+
+    def get_query_arrow(self, query: str, spool_size: int = 64 * 1024**2):
+        """run a query and return its result as a pyarrow Table. The COPY output is parsed by
+        pyarrow's multithreaded csv reader straight into typed columns (see postgres_arrow_type);
+        empty strings and NULL stay distinct
+
+        Parameters
+        ----------
+        query : str
+            SELECT query
+        spool_size : int, optional
+            bytes of COPY output kept in memory before spilling to disk, by default 64MB
+
+        Returns
+        -------
+        pyarrow.Table
+            query result
+        """
+        import pyarrow.csv as pacsv
+
+        with self._copy_query(query, spool_size) as (description, spool):
+            return pacsv.read_csv(
+                spool, convert_options=self._arrow_convert_options(description)
+            )
+
+    def read_query_arrow_batches(
+        self,
+        query: str,
+        block_size: int = 16 * 1024**2,
+        spool_size: int = 64 * 1024**2,
+    ):
+        """run a query and yield its result as pyarrow RecordBatches of about block_size bytes
+        of csv each, see get_query_arrow
+
+        Yields
+        ------
+        Iterator[pyarrow.RecordBatch]
+            batches in result order
+        """
+        import pyarrow.csv as pacsv
+
+        with self._copy_query(query, spool_size) as (description, spool):
+            yield from pacsv.open_csv(
+                spool,
+                read_options=pacsv.ReadOptions(block_size=block_size),
+                convert_options=self._arrow_convert_options(description),
+            )
+
     def inspect_table(self, schema: str, table: str) -> dict[str, str]:
         with self.cursor() as cursor:
-            query = f"SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = '{schema}' and table_name = '{table}';"
+            query = f"SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = '{schema}' and table_name = '{table}' ORDER BY ordinal_position;"
             cursor.execute(query)
             result = {rcd[0]: rcd[1] for rcd in cursor.fetchall()}
             return result
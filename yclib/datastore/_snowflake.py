@@ -74,6 +74,20 @@ class Snowflake(DataStore):
             cursor.execute(query)
             return cursor.fetch_pandas_all()
 
+    def get_query_arrow(self, query: str):
+        """Runs the query, returning results as a pyarrow Table"""
+
+        with self.cursor() as cursor:
+            cursor.execute(query)
+            return cursor.fetch_arrow_all(force_return_table=True)
+
+    def read_query_arrow_batches(self, query: str):
+        """Runs the query, yielding results as pyarrow Tables, one per result chunk"""
+
+        with self.cursor() as cursor:
+            cursor.execute(query)
+            yield from cursor.fetch_arrow_batches()
+
     @property
     def status(self) -> ConnectionStatus:
         """Returns the status of the connection"""
@@ -30,6 +30,18 @@ class DataStore:
         """Runs the query, returning results as a dataframe"""
         ...
 
+    @abstractmethod
+    def get_query_arrow(self, query: str):
+        """Runs the query, returning results as a pyarrow Table, built column by column"""
+        ...
+
+    def get_query_arrow_dataframe(self, query: str) -> pd.DataFrame:
+        """Runs the query, returning results as a dataframe backed by arrow arrays
+        (pd.ArrowDtype), converted from get_query_arrow without copying"""
+        from ._arrow import arrow_to_pandas
+
+        return arrow_to_pandas(self.get_query_arrow(query))
+
     @abstractproperty
     def status(self) -> ConnectionStatus:
         """Returns the status of the connection"""
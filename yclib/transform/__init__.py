@@ -1 +1,11 @@
-from general_functions import *
+from .general_functions import *
+from .executor import TransformExecutor, plan_functions
+from .sql_compiler import ProjectionCompiler, SQLCompileError, compile_functions
+from .intervals import (
+    clip_intervals,
+    coalesce_intervals,
+    fill_open_ends,
+    interval_join,
+    point_matches,
+    split_at_cutovers,
+)
@@ -0,0 +1,265 @@
+import inspect
+from typing import Any, Callable, NamedTuple, Optional
+import pandas as pd
+from . import general_functions, profiling
+
+# functions that only rename, cast or add columns, fused into one column pass when adjacent
+COLUMN_FUNCTIONS = (
+    "rename_columns",
+    "change_data_type",
+    "create_columns_with_default_value",
+)
+
+
+class Column(NamedTuple):
+    """a result column of a column pass: a column of the input (source) or a default value
+    broadcast to every row (source is None), then cast to every dtype of casts in order"""
+
+    source: Optional[str]
+    default: Any
+    casts: tuple
+
+
+class UnfusableError(Exception):
+    """column functions that cannot be planned as one pass, e.g. a rename creating duplicate
+    columns. they run one by one instead, with the errors of general_functions"""
+
+
+def _bind(name: str, kwargs: dict) -> dict:
+    """keyword arguments of a general_functions function, with its defaults"""
+    func = getattr(general_functions, name).__wrapped__
+    try:
+        bound = inspect.signature(func).bind(None, **kwargs)
+    except TypeError as e:
+        raise UnfusableError(f"{name}: {e}")
+    bound.apply_defaults()
+    return {key: value for key, value in bound.arguments.items() if key != "df"}
+
+
+def column_layout(
+    columns: pd.Index, steps: list[tuple[str, dict]]
+) -> tuple[pd.Index, dict[Any, Column]]:
+    """plan adjacent column functions as one pass: the result columns in order, each with the
+    input column or default value it comes from and its casts, as the functions would leave
+    the frame one after the other
+
+    Parameters
+    ----------
+    columns : pd.Index
+        columns of the input frame
+    steps : list[tuple[str, dict]]
+        function names of COLUMN_FUNCTIONS and their keyword arguments, in order
+
+    Returns
+    -------
+    tuple[pd.Index, dict[Any, Column]]
+        the result columns, as the functions would build the index (rename infers its type,
+        new columns are inserted), and their Column by name
+
+    Raises
+    ------
+    UnfusableError
+        duplicate columns, casts of missing columns, non scalar defaults or bad arguments
+    """
+    layout = {col: Column(col, None, ()) for col in columns}
+    if len(layout) != len(columns):
+        raise UnfusableError("duplicate columns")
+    for name, kwargs in steps:
+        kwargs = _bind(name, kwargs)
+        if name == "rename_columns":
+            renamed = [kwargs["name_map"].get(col, col) for col in layout]
+            if len(set(renamed)) != len(renamed):
+                raise UnfusableError("rename_columns would create duplicate columns")
+            layout = dict(zip(renamed, layout.values()))
+            columns = pd.Index(renamed, name=columns.name, tupleize_cols=False)
+        elif name == "change_data_type":
+            missing = set(kwargs["dtype_map"]) - set(layout)
+            if missing:
+                raise UnfusableError(f"change_data_type: columns not found {missing}")
+            for col, dtype in kwargs["dtype_map"].items():
+                layout[col] = layout[col]._replace(
+                    casts=layout[col].casts + (dtype,)
+                )
+        else:
+            column_name, default_value = kwargs["column_name"], kwargs["default_value"]
+            if pd.api.types.is_list_like(default_value):
+                raise UnfusableError(
+                    "create_columns_with_default_value: non scalar default"
+                )
+            if not pd.api.types.is_list_like(column_name):
+                column_name = [column_name]
+            for col in column_name:
+                if col not in layout:
+                    columns = columns.insert(len(columns), col)
+                layout[col] = Column(None, default_value, ())
+    return columns, layout
+
+
+@general_functions.func_log
+def column_pass(
+    df: pd.DataFrame, columns: pd.Index, layout: dict[Any, Column]
+) -> pd.DataFrame:
+    """build the result of fused column functions (see column_layout) in one pass: kept and
+    renamed columns are shared with df, only cast and default columns are new data
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        source pandas dataframe, not modified
+    columns : pd.Index
+        result columns, see column_layout
+    layout : dict[Any, Column]
+        Column of every result column, see column_layout
+
+    Returns
+    -------
+    pd.DataFrame
+        pandas dataframe with the columns of layout
+    """
+    result = pd.DataFrame(
+        {
+            col: df[column.source] if column.source is not None else column.default
+            for col, column in layout.items()
+        },
+        index=df.index,
+        copy=False,
+    )
+    for col, column in layout.items():
+        for dtype in column.casts:
+            result[col] = result[col].astype(dtype, errors="raise")
+    result.columns = columns
+    return result
+
+
+def plan_functions(functions: dict[str, Optional[dict]]) -> list[tuple[str, Any]]:
+    """plan a yaml 'functions:' map: adjacent COLUMN_FUNCTIONS are grouped into one
+    'column_pass' stage, other functions are stages of their own. entries without
+    configuration (e.g. 'table_filter:' left empty) are skipped
+
+    Parameters
+    ----------
+    functions : dict[str, Optional[dict]]
+        general_functions function names as keys and their keyword arguments as values, in order
+
+    Returns
+    -------
+    list[tuple[str, Any]]
+        ('column_pass', [(name, kwargs), ...]) or (name, kwargs) per stage, in order
+    """
+    stages = []
+    for name, kwargs in functions.items():
+        if kwargs is None:
+            continue
+        func = getattr(general_functions, name, None)
+        if name.startswith("_") or not callable(func):
+            raise AttributeError(f"general_functions has no function {name}")
+        if name not in COLUMN_FUNCTIONS:
+            stages.append((name, kwargs))
+        elif stages and stages[-1][0] == "column_pass":
+            stages[-1][1].append((name, kwargs))
+        else:
+            stages.append(("column_pass", [(name, kwargs)]))
+    # a single column function gains nothing from a pass of its own
+    return [
+        steps[0] if name == "column_pass" and len(steps) == 1 else (name, steps)
+        for name, steps in stages
+    ]
+
+
+class TransformExecutor:
+    """run a yaml 'functions:' map of general_functions on a dataframe it owns.
+
+    The chain is planned once (see plan_functions): adjacent renames, casts and default
+    columns become one column pass, which shares every column it does not cast or create, so
+    a chain of column functions neither builds intermediate frames nor copies kept columns.
+    Functions working in place modify the owned frame, never the caller's: a frame that is
+    not owned is shallow copied once, and copy on write copies only what is modified.
+
+    After every run, report holds the number of functions and stages run, the intermediate
+    frames avoided by fusing, and the bytes of the stage results copied and shared with their
+    inputs (see profiling.bytes_copied_since).
+    """
+
+    def __init__(self, functions: dict[str, Optional[dict]]):
+        """
+        Parameters
+        ----------
+        functions : dict[str, Optional[dict]]
+            general_functions function names as keys and their keyword arguments as values,
+            in order
+        """
+        self.stages = plan_functions(functions)
+        self.report = {}
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        owned: bool = False,
+        log: Optional[Callable[[str], Any]] = None,
+    ) -> pd.DataFrame:
+        """run the planned functions
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            source pandas dataframe
+        owned : bool, optional
+            df is not used by the caller afterwards and may be modified in place, e.g. a frame
+            just read from postgres. by default False
+        log : Optional[Callable[[str], Any]], optional
+            called with the message of every stage, e.g. logger.info, by default None
+
+        Returns
+        -------
+        pd.DataFrame
+            pandas dataframe after the last function
+        """
+        if not owned:
+            df = df.copy(deep=False)
+        self.report = dict.fromkeys(
+            ("functions", "stages", "frames_avoided", "bytes_copied", "bytes_shared"), 0
+        )
+        for name, kwargs in self.stages:
+            if name != "column_pass":
+                df = self._stage(df, [(name, kwargs)], log)
+                continue
+            try:
+                columns, layout = column_layout(df.columns, kwargs)
+            except UnfusableError:
+                df = self._stage(df, kwargs, log)
+                continue
+            if log is not None:
+                log(f"{[step for step, _ in kwargs]} fused into one column pass")
+            df = self._stage(
+                df, [(name, {"columns": columns, "layout": layout})], log
+            )
+            self.report["functions"] += len(kwargs) - 1
+            self.report["frames_avoided"] += len(kwargs) - 1
+        return df
+
+    def _stage(
+        self, df: pd.DataFrame, steps: list[tuple[str, dict]], log: Optional[Callable]
+    ) -> pd.DataFrame:
+        """run functions one by one, counting the bytes of their results copied from df"""
+        for name, kwargs in steps:
+            func = (
+                column_pass
+                if name == "column_pass"
+                else getattr(general_functions, name)
+            )
+            # taken before the call, functions working in place add their columns to df
+            buffers = profiling.frame_buffers(df)
+            output = func(df, **kwargs)
+            if log is not None:
+                log(output["message"])
+            result = output["result"] if output["result"] is not None else df
+            self.report["functions"] += 1
+            self.report["stages"] += 1
+            if isinstance(result, pd.DataFrame):
+                copied = profiling.bytes_copied_since(buffers, result)
+                self.report["bytes_copied"] += copied
+                self.report["bytes_shared"] += int(
+                    result.memory_usage(index=False).sum() - copied
+                )
+            df = result
+        return df
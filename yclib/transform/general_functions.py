@@ -4,30 +4,28 @@ import operator
 import re
 import time
 import uuid
-import networkx
 import numpy as np
 import pandas as pd
 import traceback
 from typing import Any
 from datetime import datetime
+from . import intervals, lineage, profiling, temporal
 
 
 def func_log(func):
+    """log the run time of a transform function and wrap its result as {"result", "message"}.
+    while profiling is enabled (see yclib.transform.profiling), every call is also profiled"""
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        args_repr = [
-            "dataframe" if isinstance(a, pd.DataFrame) else repr(a) for a in args
-        ]
-        kwargs_repr = [
-            "{" + str(k) + ":dataframe}"
-            if isinstance(v, pd.DataFrame)
-            else "{" + str(k) + ":" + repr(v) + "}"
-            for k, v in kwargs.items()
-        ]
         try:
-            timestart = time.time()
-            result = func(*args, **kwargs)
-            run_time = round((time.time() - timestart), 2)
+            timestart = time.perf_counter()
+            if profiling.profiler.enabled:
+                result = profiling.profiler.call(func, args, kwargs)
+            else:
+                result = func(*args, **kwargs)
+            run_time = round((time.perf_counter() - timestart), 2)
+            args_repr = [profiling.cheap_repr(a) for a in args]
             message = f"Succesfully ran function: {func.__name__} with args {args_repr}. RunTime: {run_time} seconds"
             return {"result": result, "message": message}
         except Exception as e:
@@ -77,8 +75,7 @@ def rename_columns(df: pd.DataFrame, name_map: dict[str, str]) -> pd.DataFrame:
     pd.DataFrame
         pandas dataframe with new column names
     """
-
-    return df.rename(columns=name_map, inplace=True)
+    return df.rename(columns=name_map)
 
 
 @func_log
@@ -108,7 +105,8 @@ def flatten_effective_date(
     effective_date: Any,
     agg_settings: dict,
 ) -> pd.DataFrame:
-    """flatten dataframe with 1 effective date column to 2 columns with column name 'StartDate' and 'EndDate'
+    """flatten dataframe with 1 effective date column to 2 columns with column name 'StartDate' and 'EndDate'.
+    runs are found on whole columns at once (see yclib.transform.temporal); df is not modified
 
     Parameters
     ----------
@@ -128,23 +126,9 @@ def flatten_effective_date(
     pd.DataFrame
         pandas dataframe with new data types
     """
-    df.sort_values([key_col, effective_date], ascending=[True, True], inplace=True)
-    df.loc[
-        ((df[key_col] != df[key_col].shift()) | (df[flat_col] != df[flat_col].shift())),
-        "rolling_index",
-    ] = 1
-    df["rolling_index"] = df["rolling_index"].fillna(0)
-    df["rolling_index"] = df["rolling_index"].cumsum()
-
-    df = df.groupby(["rolling_index"]).agg(agg_settings).reset_index(drop=True)
-
-    def _get_end_date(row):
-        row["EndDate"] = row[effective_date].shift(-1)
-        return row
-
-    df = df.groupby([key_col]).apply(_get_end_date)
-    df.rename(columns={effective_date: "StartDate"}, inplace=True)
-    return df
+    return temporal.flatten_effective_date(
+        df, key_col, flat_col, effective_date, agg_settings
+    )
 
 
 @func_log
@@ -156,7 +140,8 @@ def group_multiple_date(
     period_end: Any,
     agg_settings: dict,
 ) -> pd.DataFrame:
-    """group multiple data records with period start and period end to one record with minimum period start as the StartDate and maximum period end as the EndDate
+    """group multiple data records with period start and period end to one record with minimum period start as the StartDate and maximum period end as the EndDate.
+    runs are found on whole columns at once (see yclib.transform.temporal); df and agg_settings are not modified
 
     Parameters
     ----------
@@ -178,27 +163,138 @@ def group_multiple_date(
     pd.DataFrame
         pandas dataframe with new data types
     """
-    df.sort_values([key_col, period_start], ascending=[True, True], inplace=True)
-    df.loc[
-        (
-            (df[key_col] != df[key_col].shift())
-            | (df[group_col] != df[group_col].shift())
-        ),
-        "rolling_index",
-    ] = 1
-    df["rolling_index"] = df["rolling_index"].fillna(0)
-    df["rolling_index"] = df["rolling_index"].cumsum()
-    agg_settings[period_start] = "min"
-    agg_settings[period_end] = "max"
-    df = df.groupby(["rolling_index"]).agg(agg_settings).reset_index(drop=True)
-    return df
+    return temporal.group_multiple_date(
+        df, key_col, group_col, period_start, period_end, agg_settings
+    )
 
 
 @func_log
-def list_source_to_dict(df: pd.DataFrame, source_col_name: str) -> pd.DataFrame:
+def cut_time_interval_by_cutover_point(
+    df: pd.DataFrame, cutover: list, start: str, end: str
+) -> pd.DataFrame:
+    """split periods at cutover dates, e.g. an award change: a period running over a cutover becomes one record before and one from the cutover.
+    see yclib.transform.intervals.split_at_cutovers
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        source pandas dataframe
+    cutover : list
+        cutover dates, i.e. ['2018-12-01']
+    start : str
+        column name of the period start date
+    end : str
+        column name of the period end date. the end date is excluded from the period
+
+    Returns
+    -------
+    pd.DataFrame
+        pandas dataframe with one record per piece of period
+    """
+    return intervals.split_at_cutovers(df, start, end, cutover)
+
+
+@func_log
+def clip_time_interval(
+    df: pd.DataFrame,
+    start: str,
+    end: str,
+    window_start: Any = None,
+    window_end: Any = None,
+) -> pd.DataFrame:
+    """clip periods to a window and drop the periods outside of it. see yclib.transform.intervals.clip_intervals
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        source pandas dataframe
+    start : str
+        column name of the period start date
+    end : str
+        column name of the period end date
+    window_start : Any, optional
+        start of the window, i.e. '2015-07-01'. default to be None, no lower bound
+    window_end : Any, optional
+        end of the window. default to be None, no upper bound
+
+    Returns
+    -------
+    pd.DataFrame
+        pandas dataframe with clipped periods
+    """
+    return intervals.clip_intervals(df, start, end, window_start, window_end)
+
+
+@func_log
+def fill_open_time_interval(
+    df: pd.DataFrame,
+    start: str,
+    end: str,
+    start_value: Any = None,
+    end_value: Any = None,
+) -> pd.DataFrame:
+    """fill missing period start and end dates, i.e. the EndDate of current positions. see yclib.transform.intervals.fill_open_ends
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        source pandas dataframe
+    start : str
+        column name of the period start date
+    end : str
+        column name of the period end date
+    start_value : Any, optional
+        value for missing start dates. default to be the first day pandas can represent
+    end_value : Any, optional
+        value for missing end dates. default to be the last day pandas can represent less one day
+
+    Returns
+    -------
+    pd.DataFrame
+        pandas dataframe without missing period dates
+    """
+    return intervals.fill_open_ends(df, start, end, start_value, end_value)
+
+
+@func_log
+def coalesce_time_interval(
+    df: pd.DataFrame,
+    key_col: str or list,
+    start: str,
+    end: str,
+    agg_settings: dict = None,
+) -> pd.DataFrame:
+    """merge overlapping or adjacent periods of the same key to one record. see yclib.transform.intervals.coalesce_intervals
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        source pandas dataframe
+    key_col : str or list
+        column name(s) of the key, i.e. Employee Code and classification
+    start : str
+        column name of the period start date
+    end : str
+        column name of the period end date
+    agg_settings : dict, optional
+        this takes statements in pandas groupby.agg() representing how values in other columns will be returned.
+
+    Returns
+    -------
+    pd.DataFrame
+        pandas dataframe with one record per merged period
+    """
+    return intervals.coalesce_intervals(df, key_col, start, end, agg_settings)
+
+
+@func_log
+def list_source_to_dict(
+    df: pd.DataFrame, source_col_name: str, ranges: bool = True
+) -> pd.DataFrame:
     """reformat values in source column. Change a list of sources in string with format:
         [filename1:sheet1:row:1, filename1:sheet1:row:2, filename1:sheet2:row:1, filename1:sheet2:row:2] to the following:
-        {filename1:sheet1:row: [1,2],filename1:sheet2:row: [1,2]}
+        {filename1:sheet1:row: [1-2],filename1:sheet2:row: [1-2]}
+    the whole column is compacted at once, see yclib.transform.lineage.compact_sources
 
     Parameters
     ----------
@@ -206,25 +302,14 @@ def list_source_to_dict(df: pd.DataFrame, source_col_name: str) -> pd.DataFrame:
         source pandas dataframe
     source_col_name : str
         name of the "Source" column. usually should just be 'Source'
+    ranges : bool, optional
+        write consecutive rows as a range (1-2), in ascending order. set to False to list
+        every row in order of appearance, {filename1:sheet1:row: [1,2],...}. by default True
 
     Returns
     -------
     pd.DataFrame
         pandas dataframe with new source format
     """
-
-    def _source_formatter(row):
-        result = {}
-        for i in [j.split(":row:") for j in row]:
-            i[0] = i[0] + ":row:"
-            if i[0] not in result:
-                result[i[0]] = []
-                if i[1] not in result[i[0]]:
-                    result[i[0]].append(i[1])
-            else:
-                if i[1] not in result[i[0]]:
-                    result[i[0]].append(i[1])
-        return str(result)
-
-    df[source_col_name] = df[source_col_name].apply(_source_formatter)
+    df[source_col_name] = lineage.compact_sources(df[source_col_name], ranges)
     return df
@@ -0,0 +1,364 @@
+import numpy as np
+import pandas as pd
+from . import temporal
+
+
+def _key_codes(left: pd.DataFrame, right: pd.DataFrame, on: list) -> tuple:
+    """codes of the key columns, shared by both tables. a null in any key column gives -1"""
+    keys = pd.concat([left[on], right[on]], ignore_index=True)
+    codes = keys.groupby(on, sort=False, dropna=False).ngroup().to_numpy(np.int64).copy()
+    codes[keys.isna().any(axis=1).to_numpy()] = -1
+    return codes[: len(left)], codes[len(left) :]
+
+
+def _time_ranks(*columns: pd.Series) -> tuple[list[np.ndarray], pd.Index]:
+    """dense ranks of the values of all columns together, from 1. a null is ranked 0, which
+    _open_bounds moves after everything for an end, so missing bounds are open. returns the
+    ranks per column and the sorted values; a key's coordinate block is len(values) + 2 wide"""
+    values = pd.concat(columns, ignore_index=True)
+    codes, uniques = pd.factorize(values, sort=True)
+    codes = codes.astype(np.int64) + 1
+    ranks, offset = [], 0
+    for col in columns:
+        ranks.append(codes[offset : offset + len(col)])
+        offset += len(col)
+    return ranks, pd.Index(uniques)
+
+
+def _open_bounds(ranks: np.ndarray, width: int) -> np.ndarray:
+    """ranks of an end column with null ends (rank 0) after everything"""
+    return np.where(ranks == 0, width - 1, ranks)
+
+
+def point_matches(
+    points: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """all (point, interval) pairs with start <= point < end, by sort-merge: points are
+    sorted once, every interval finds its first and last point with np.searchsorted and the
+    pairs are expanded in one go, so the cost is O((n + m) log n) plus the size of the result,
+    whether the intervals overlap or not
+
+    Parameters
+    ----------
+    points : np.ndarray
+        integer coordinates of the points
+    starts : np.ndarray
+        integer coordinates of the interval starts (included)
+    ends : np.ndarray
+        integer coordinates of the interval ends (excluded)
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        positions of the matching points and intervals
+    """
+    order = np.argsort(points)
+    sorted_points = points[order]
+    first = np.searchsorted(sorted_points, starts, side="left")
+    last = np.searchsorted(sorted_points, ends, side="left")
+    counts = np.clip(last - first, 0, None)
+    intervals = np.repeat(np.arange(len(starts)), counts)
+    # position of every pair within its interval's slice of sorted points
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return order[np.repeat(first, counts) + offsets], intervals
+
+
+def interval_join(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    on: str or list,
+    right_start: str,
+    right_end: str,
+    left_start: str,
+    left_end: str = None,
+    how: str = "inner",
+    suffixes: tuple[str, str] = ("", "_right"),
+) -> pd.DataFrame:
+    """join the rows of left to the periods [right_start, right_end) of right with the same
+    key: a date of left (left_end not given) matches the periods containing it, e.g.
+    timesheet days to position periods, and a period [left_start, left_end) of left matches
+    the periods overlapping it, e.g. pay periods to classification periods.
+
+    Dates of both tables are rank compressed into one integer coordinate per key, and the
+    matches are found by sort-merge (see point_matches), so no cartesian product is built.
+    A period overlaps another when it starts inside it, or the other one starts inside it,
+    two point queries with disjoint results. Missing period bounds are open (a null
+    right_end is a current period). Rows with a missing key or date, and empty periods
+    (end <= start), never match.
+
+    Parameters
+    ----------
+    left : pd.DataFrame
+        dated records or periods
+    right : pd.DataFrame
+        periods
+    on : str or list
+        key column(s) in both tables, usually the employee code
+    right_start : str
+        period start column of right (included)
+    right_end : str
+        period end column of right (excluded)
+    left_start : str
+        date column of left, or period start column (included)
+    left_end : str, optional
+        period end column of left (excluded). by default None, left_start is a date
+    how : str, optional
+        'inner', or 'left' to keep the rows of left without a match. by default 'inner'
+    suffixes : tuple[str, str], optional
+        suffixes of the columns in both tables other than the key. by default ("", "_right")
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per match, ordered as left, the key columns once
+    """
+    if how not in ("inner", "left"):
+        raise ValueError(f"how must be 'inner' or 'left', not {how!r}")
+    on = [on] if isinstance(on, str) else list(on)
+    left_keys, right_keys = _key_codes(left, right, on)
+
+    left_columns = [left[left_start]] + ([left[left_end]] if left_end else [])
+    ranks, values = _time_ranks(*left_columns, right[right_start], right[right_end])
+    width = len(values) + 2
+    # a key's coordinates are [key * width, (key + 1) * width)
+    right_starts = right_keys * width + ranks[-2]
+    right_ends = right_keys * width + _open_bounds(ranks[-1], width)
+    right_valid = (right_keys >= 0) & (right_starts < right_ends)
+
+    if left_end is None:
+        left_valid = (left_keys >= 0) & (ranks[0] > 0)
+        left_idx, right_idx = point_matches(
+            np.where(left_valid, left_keys * width + ranks[0], -1),
+            np.where(right_valid, right_starts, 0),
+            np.where(right_valid, right_ends, 0),
+        )
+    else:
+        left_starts = left_keys * width + ranks[0]
+        left_ends = left_keys * width + _open_bounds(ranks[1], width)
+        left_valid = (left_keys >= 0) & (left_starts < left_ends)
+        left_starts = np.where(left_valid, left_starts, -1)
+        # right periods containing the left start ...
+        starts_in_right = point_matches(
+            left_starts,
+            np.where(right_valid, right_starts, 0),
+            np.where(right_valid, right_ends, 0),
+        )
+        # ... and right periods starting after the left start, inside the left period
+        right_in_left = point_matches(
+            np.where(right_valid, right_starts, -1),
+            np.where(left_valid, left_starts + 1, 0),
+            np.where(left_valid, left_ends, 0),
+        )
+        left_idx = np.concatenate([starts_in_right[0], right_in_left[1]])
+        right_idx = np.concatenate([starts_in_right[1], right_in_left[0]])
+
+    if how == "left":
+        unmatched = np.setdiff1d(np.arange(len(left)), left_idx)
+        left_idx = np.concatenate([left_idx, unmatched])
+        right_idx = np.concatenate([right_idx, np.full(len(unmatched), -1)])
+    # pairs are unique, so one integer key sorts them without a (slower) stable sort
+    order = np.argsort(left_idx * (len(right) + 1) + right_idx + 1)
+    left_idx, right_idx = left_idx[order], right_idx[order]
+
+    right_columns = [col for col in right.columns if col not in on]
+    overlap = set(right_columns) & set(left.columns)
+    result = left.iloc[left_idx].reset_index(drop=True)
+    result = result.rename(columns={col: f"{col}{suffixes[0]}" for col in overlap})
+    # position -1 is not in the RangeIndex, so unmatched rows are filled with nulls
+    matched = right[right_columns].reset_index(drop=True).reindex(right_idx)
+    matched.columns = [
+        f"{col}{suffixes[1]}" if col in overlap else col for col in right_columns
+    ]
+    return pd.concat([result, matched.reset_index(drop=True)], axis=1)
+
+
+def _as_bounds(values, like: pd.Series) -> pd.Index:
+    """sorted unique bounds (e.g. cutover dates) of the type of an interval column"""
+    if pd.api.types.is_datetime64_any_dtype(like):
+        return pd.DatetimeIndex(pd.to_datetime(values)).sort_values().unique()
+    return pd.Index(values).sort_values().unique()
+
+
+def split_at_cutovers(
+    df: pd.DataFrame, start: str, end: str, cutover: list
+) -> pd.DataFrame:
+    """split every period [start, end) at the cutover dates strictly inside it, e.g.
+    [2018-06-01, 2019-06-01) at 2018-12-01 into [2018-06-01, 2018-12-01) and
+    [2018-12-01, 2019-06-01). a missing start or end is open, so it is split at every cutover
+    before or after the other bound. rows are repeated once per piece with np.repeat, no
+    python loop over rows
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        periods
+    start : str
+        period start column (included)
+    end : str
+        period end column (excluded)
+    cutover : list
+        cutover dates, in any order
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per piece, in the order of df, with the index label of its period
+    """
+    cuts = _as_bounds(cutover, df[start])
+    starts, ends = df[start], df[end]
+    # cutovers after the start and before the end
+    first = np.where(
+        starts.isna(), 0, cuts.searchsorted(starts.to_numpy(), side="right")
+    )
+    last = np.where(ends.isna(), len(cuts), cuts.searchsorted(ends.to_numpy(), side="left"))
+    counts = np.clip(last - first, 0, None)
+    rows = np.repeat(np.arange(len(df)), counts + 1)
+    # piece k of a period runs from cutover first + k - 1 to cutover first + k
+    piece = np.arange(len(rows)) - np.repeat(np.cumsum(counts + 1) - counts - 1, counts + 1)
+    cut = np.repeat(first, counts + 1) + piece
+    result = df.iloc[rows]
+    new_start = piece > 0
+    new_end = piece < counts[rows]
+    result.loc[new_start, start] = cuts[cut[new_start] - 1]
+    result.loc[new_end, end] = cuts[cut[new_end]]
+    return result
+
+
+def clip_intervals(
+    df: pd.DataFrame,
+    start: str,
+    end: str,
+    window_start=None,
+    window_end=None,
+) -> pd.DataFrame:
+    """clip every period [start, end) to the window [window_start, window_end) and drop the
+    periods outside it. a missing start or end is open, so it is clipped to the window bound
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        periods
+    start : str
+        period start column (included)
+    end : str
+        period end column (excluded)
+    window_start : optional
+        window start, by default None (no lower bound)
+    window_end : optional
+        window end, by default None (no upper bound)
+
+    Returns
+    -------
+    pd.DataFrame
+        the periods overlapping the window, clipped
+    """
+    starts, ends = df[start], df[end]
+    if window_start is not None:
+        window_start = _as_bounds([window_start], starts)[0]
+        starts = starts.where(starts > window_start, window_start)
+    if window_end is not None:
+        window_end = _as_bounds([window_end], ends)[0]
+        ends = ends.where(ends < window_end, window_end)
+    keep = (starts.isna() | ends.isna() | (starts < ends)).to_numpy()
+    return df[keep].assign(**{start: starts[keep], end: ends[keep]})
+
+
+def fill_open_ends(
+    df: pd.DataFrame,
+    start: str,
+    end: str,
+    start_value=None,
+    end_value=None,
+) -> pd.DataFrame:
+    """fill the missing bounds of periods [start, end), e.g. the current position's EndDate,
+    so they can be compared without null checks. by default with the first and last day
+    pandas can represent, which stay valid after adding or subtracting days
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        periods
+    start : str
+        period start column
+    end : str
+        period end column
+    start_value : optional
+        value for a missing start, by default the first representable day (datetime columns)
+    end_value : optional
+        value for a missing end, by default the last representable day less one (datetime
+        columns)
+
+    Returns
+    -------
+    pd.DataFrame
+        periods with both bounds set
+    """
+    if pd.api.types.is_datetime64_any_dtype(df[start]) and start_value is None:
+        start_value = pd.Timestamp.min.ceil("D") + pd.Timedelta(days=1)
+    if pd.api.types.is_datetime64_any_dtype(df[end]) and end_value is None:
+        end_value = pd.Timestamp.max.floor("D") - pd.Timedelta(days=1)
+    fill = {col: value for col, value in [(start, start_value), (end, end_value)]}
+    return df.fillna({col: value for col, value in fill.items() if value is not None})
+
+
+def coalesce_intervals(
+    df: pd.DataFrame,
+    key_col: str or list,
+    start: str,
+    end: str,
+    agg_settings: dict = None,
+) -> pd.DataFrame:
+    """merge the overlapping or adjacent periods [start, end) of every key into one period,
+    e.g. [2018-01-01, 2018-07-01) and [2018-07-01, 2019-01-01) into
+    [2018-01-01, 2019-01-01). periods are ordered by key and start, and a period starts a
+    new one when it starts after the running maximum end of the key: with key and dates
+    rank compressed into one coordinate (see interval_join) the running maximum is one
+    np.maximum.accumulate over the whole table. a missing start or end is open
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        periods
+    key_col : str or list
+        key column(s), e.g. employee code and classification
+    start : str
+        period start column (included)
+    end : str
+        period end column (excluded)
+    agg_settings : dict, optional
+        groupby.agg statements of other columns to keep, see temporal.aggregate_runs. by
+        default None
+
+    Returns
+    -------
+    pd.DataFrame
+        key column(s), start, end and the columns of agg_settings, one row per merged period
+    """
+    key_col = [key_col] if isinstance(key_col, str) else list(key_col)
+    keys = df.groupby(key_col, sort=True, dropna=False).ngroup().to_numpy(np.int64)
+    (start_ranks, end_ranks), values = _time_ranks(df[start], df[end])
+    width = len(values) + 2
+    starts = keys * width + start_ranks
+    ends = keys * width + _open_bounds(end_ranks, width)
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    new_period = np.ones(len(order), dtype=bool)
+    new_period[1:] = starts[1:] > reach[:-1]
+
+    bounds = np.flatnonzero(new_period)
+    history = df.iloc[order]
+    result = temporal.aggregate_runs(
+        history, new_period, {col: "first" for col in key_col}
+    )
+    # back from ranks to values: rank 0 is a missing start and width - 1 a missing end,
+    # which take() fills with nulls at position -1
+    period_start = start_ranks[order][bounds]
+    period_end = np.maximum.reduceat(ends, bounds) - keys[order][bounds] * width
+    period_end[period_end == width - 1] = 0
+    result[start] = values.array.take(period_start - 1, allow_fill=True)
+    result[end] = values.array.take(period_end - 1, allow_fill=True)
+    if agg_settings:
+        others = temporal.aggregate_runs(history, new_period, agg_settings)
+        result = pd.concat([result, others], axis=1)
+    return result
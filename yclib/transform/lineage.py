@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+ROW_MARKER = ":row:"
+
+
+def explode_sources(sources: pd.Series) -> pd.DataFrame:
+    """one row per source reference of a column of source lists (see Reader, 'Source' is
+    prefix:row:N), split at the first ':row:'
+
+    Parameters
+    ----------
+    sources : pd.Series
+        lists (or arrays) of source references, e.g. the 'unique' of 'Source' per run, or
+        nulls for no reference
+
+    Returns
+    -------
+    pd.DataFrame
+        'group': position of the list in sources, 'prefix': reference up to and including
+        ':row:', 'row': the row number as text. in the order of the lists
+
+    Raises
+    ------
+    ValueError
+        values that are neither lists nor null, e.g. a single reference as a string, and
+        references without ':row:'
+    """
+    is_list = sources.map(pd.api.types.is_list_like).to_numpy(dtype=bool)
+    scalars = sources[~is_list]
+    not_null = scalars.notna().to_numpy(dtype=bool)
+    if not_null.any():
+        raise ValueError(
+            f"source value that is not a list of references: {scalars[not_null].iloc[0]!r}"
+        )
+    lists = sources[is_list]
+    lengths = lists.map(len).to_numpy(dtype=np.int64)
+    flat = pd.Series(
+        np.concatenate(
+            [np.asarray(refs, dtype=object) for refs in lists] or [np.array([], object)]
+        ),
+        dtype="str",
+    )
+    group = np.repeat(np.flatnonzero(is_list), lengths)
+    valid = flat.notna().to_numpy()
+    flat, group = flat[valid].reset_index(drop=True), group[valid]
+    invalid = ~flat.str.contains(ROW_MARKER, regex=False)
+    if invalid.any():
+        raise ValueError(
+            f"source reference without '{ROW_MARKER}': {flat[invalid].iloc[0]!r}"
+        )
+    # regular expressions run on the whole column, where str.partition goes row by row
+    return pd.DataFrame(
+        {
+            "group": group,
+            "prefix": flat.str.replace(f"{ROW_MARKER}.*$", ROW_MARKER, regex=True),
+            "row": flat.str.replace(f"^.*?{ROW_MARKER}", "", regex=True),
+        }
+    )
+
+
+def _row_numbers(rows: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """mask of the row texts that are row numbers, and their values (0 elsewhere)"""
+    numeric = rows.str.fullmatch(r"\d{1,18}").to_numpy(dtype=bool)
+    values = np.zeros(len(rows), dtype=np.int64)
+    values[numeric] = rows[numeric].astype("int64").to_numpy()
+    return numeric, values
+
+
+def _slices(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """start and end positions of the runs of equal codes"""
+    starts = np.flatnonzero(np.append(True, codes[1:] != codes[:-1])[: len(codes)])
+    return starts, np.append(starts[1:], len(codes))
+
+
+def compact_sources(sources: pd.Series, ranges: bool = True) -> pd.Series:
+    """compact every list of source references to the str of a dict of prefix -> rows, as
+    {'filename1:sheet1:row:': ['1', '2'], 'filename1:sheet2:row:': ['1']}.
+
+    All lists are processed at once: references are exploded into one frame, prefixes and
+    rows are factorized, duplicates are dropped with one hash over (list, prefix, row), and
+    the strings are joined slice by slice, so the work grows linearly with the number of
+    references, not with the square of the list lengths.
+
+    Parameters
+    ----------
+    sources : pd.Series
+        lists (or arrays) of source references (prefix:row:N)
+    ranges : bool, optional
+        write consecutive row numbers as one range, '2-5001', with rows in ascending order
+        and non numeric rows last. otherwise every row is listed, in order of appearance.
+        by default True
+
+    Returns
+    -------
+    pd.Series
+        compacted sources, same index as sources. an empty list gives '{}', a missing value
+        stays missing
+
+    Raises
+    ------
+    ValueError
+        values that are neither lists nor null, see explode_sources
+    """
+    refs = explode_sources(sources)
+    prefix_codes, prefixes = pd.factorize(refs["prefix"])
+    row_codes, rows = pd.factorize(refs["row"])
+    numeric, values = _row_numbers(pd.Series(rows, dtype="str"))
+    rows = np.asarray(rows, dtype=object)
+    group = refs["group"].to_numpy()
+    # (list, prefix) pairs numbered by first appearance, lists are already in order
+    pair = pd.factorize(group * max(len(prefixes), 1) + prefix_codes)[0]
+    pair_first = np.flatnonzero(~pd.Series(pair).duplicated().to_numpy())
+    pair_group, pair_prefix = group[pair_first], prefix_codes[pair_first]
+    duplicated = (
+        pd.Series(pair.astype(np.int64) * max(len(rows), 1) + row_codes)
+        .duplicated()
+        .to_numpy()
+    )
+    pair, row_codes = pair[~duplicated], row_codes[~duplicated]
+
+    if ranges:
+        is_numeric, value = numeric[row_codes], values[row_codes]
+        order = np.lexsort((value, ~is_numeric, pair))
+        pair, row_codes = pair[order], row_codes[order]
+        is_numeric, value = is_numeric[order], value[order]
+        starts = np.ones(len(pair), dtype=bool)
+        starts[1:] = (
+            (pair[1:] != pair[:-1])
+            | ~is_numeric[1:]
+            | ~is_numeric[:-1]
+            | (value[1:] != value[:-1] + 1)
+        )
+        first = np.flatnonzero(starts)
+        last = np.append(first[1:], len(pair)) - 1
+        tokens = rows[row_codes[first]]
+        spans = first != last
+        tokens[spans] = tokens[spans] + "-" + rows[row_codes[last[spans]]]
+        pair, plain = pair[first], is_numeric[first]
+    else:
+        order = np.argsort(pair, kind="stable")
+        pair, row_codes = pair[order], row_codes[order]
+        tokens, plain = rows[row_codes], numeric[row_codes]
+
+    # tokens are sorted by pair and pairs by list: join token slices per pair, then entry
+    # slices per list
+    # numbers and ranges are quoted as repr would, without calling it per token
+    tokens[plain] = "'" + tokens[plain] + "'"
+    tokens[~plain] = [repr(token) for token in tokens[~plain]]
+    tokens = tokens.tolist()
+    pair_bounds, pair_ends = _slices(pair)
+    pairs = pair[pair_bounds]
+    entries = [
+        f"{prefix!r}: [{', '.join(tokens[start:end])}]"
+        for prefix, start, end in zip(
+            prefixes[pair_prefix[pairs]], pair_bounds, pair_ends
+        )
+    ]
+    entry_group = pair_group[pairs]
+
+    result = pd.Series(np.nan, index=sources.index, dtype=object)
+    result[sources.map(pd.api.types.is_list_like).to_numpy()] = "{}"
+    group_bounds, group_ends = _slices(entry_group)
+    result.iloc[entry_group[group_bounds]] = [
+        "{" + ", ".join(entries[start:end]) + "}"
+        for start, end in zip(group_bounds, group_ends)
+    ]
+    return result
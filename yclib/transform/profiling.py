@@ -0,0 +1,291 @@
+import contextlib
+import itertools
+import json
+import os
+import reprlib
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+import numpy as np
+import pandas as pd
+
+# YCLIB_PROFILE=1 profiles transform functions, YCLIB_PROFILE=/path/profile.jsonl also writes
+# every record to that file. YCLIB_PROFILE_MEMORY=1 traces their peak memory as well
+PROFILE_ENV = "YCLIB_PROFILE"
+PROFILE_MEMORY_ENV = "YCLIB_PROFILE_MEMORY"
+
+# structure of the workflow table the records are written to
+PROFILE_COLUMNS = {
+    "run_id": "text",
+    "step": "text",
+    "function": "text",
+    "status": "text",
+    "started_at": "timestamp",
+    "wall_seconds": "double precision",
+    "cpu_seconds": "double precision",
+    "peak_memory": "bigint",
+    "rows_in": "bigint",
+    "columns_in": "bigint",
+    "rows_out": "bigint",
+    "columns_out": "bigint",
+    "bytes_in": "bigint",
+    "bytes_out": "bigint",
+    "bytes_copied": "bigint",
+    "arguments": "text",
+}
+
+# argument summaries stay short whatever the size of a name_map or agg_settings
+_repr = reprlib.Repr()
+_repr.maxdict = _repr.maxlist = _repr.maxtuple = _repr.maxset = 6
+_repr.maxstring = _repr.maxother = 60
+
+
+def cheap_repr(value: Any) -> str:
+    """repr of an argument for logs, 'dataframe' for a dataframe and bounded for containers:
+    a large container shows its size and first items only (reprlib would sort a dict first)"""
+    if isinstance(value, pd.DataFrame):
+        return "dataframe"
+    if isinstance(value, (dict, list, tuple, set)) and len(value) > _repr.maxdict:
+        if isinstance(value, dict):
+            head = (
+                f"{_repr.repr(k)}: {_repr.repr(v)}"
+                for k, v in itertools.islice(value.items(), _repr.maxdict)
+            )
+        else:
+            head = (_repr.repr(v) for v in itertools.islice(value, _repr.maxdict))
+        return f"{type(value).__name__}[{len(value)}]({', '.join(head)}, ...)"
+    return _repr.repr(value)
+
+
+def _buffers(series: pd.Series) -> Optional[list[tuple[int, int]]]:
+    """address ranges of the data of a numpy or arrow backed column, None for other arrays"""
+    if isinstance(series.dtype, np.dtype):
+        values = series.to_numpy(copy=False)
+        start = values.__array_interface__["data"][0]
+        return [(start, start + values.nbytes)]
+    if isinstance(series.array, pd.arrays.ArrowExtensionArray):
+        # renames and selections wrap the same arrow buffers in a new array
+        return [
+            (buffer.address, buffer.address + buffer.size)
+            for chunk in series.array.__arrow_array__().chunks
+            for buffer in chunk.buffers()
+            if buffer is not None and buffer.size
+        ]
+    return None
+
+
+def frame_buffers(df: pd.DataFrame) -> tuple[list[tuple[int, int]], set[int]]:
+    """address ranges of the numpy and arrow backed columns and ids of the other column
+    arrays, taken before a function that may modify df in place, see bytes_copied_since"""
+    ranges, arrays = [], set()
+    for _, series in df.items():
+        buffers = _buffers(series)
+        if buffers is None:
+            arrays.add(id(series.array))
+        else:
+            ranges.extend(buffers)
+    return ranges, arrays
+
+
+def bytes_copied_since(
+    buffers: tuple[list[tuple[int, int]], set[int]], result: Any
+) -> Optional[int]:
+    """estimated bytes of result not in the frame whose buffers were taken by frame_buffers:
+    numpy and arrow backed columns of result whose data lies in a column of the frame are
+    views, other arrays are shared if they are the same object"""
+    if not isinstance(result, pd.DataFrame):
+        return None
+    ranges, arrays = buffers
+    copied = 0
+    for _, series in result.items():
+        column_buffers = _buffers(series)
+        if column_buffers is None:
+            if id(series.array) not in arrays:
+                copied += series.array.nbytes
+            continue
+        copied += sum(
+            high - low
+            for low, high in column_buffers
+            if not any(start <= low < end for start, end in ranges)
+        )
+    return copied
+
+
+def bytes_copied(source: Optional[pd.DataFrame], result: Any) -> Optional[int]:
+    """estimated bytes of result not shared with source, see bytes_copied_since. every column
+    is counted as copied if there is no source"""
+    if source is None:
+        return bytes_copied_since(([], set()), result)
+    return bytes_copied_since(frame_buffers(source), result)
+
+
+def _shape(df: Any) -> tuple[Optional[int], Optional[int], Optional[int]]:
+    """rows, columns and shallow bytes of a dataframe, None otherwise"""
+    if not isinstance(df, pd.DataFrame):
+        return None, None, None
+    return df.shape[0], df.shape[1], int(df.memory_usage(index=False).sum())
+
+
+class Profiler:
+    """records wall and CPU time, shape and copied bytes of every call of a function wrapped by
+    general_functions.func_log, while enabled. Records are kept in memory until drain() and,
+    with a path, appended to a JSONL file as they are made.
+
+    Peak memory is only traced when enabled with memory=True: tracemalloc hooks every
+    allocation and slows functions down several times, so the times of such a run are
+    not comparable with the times of a run without it. peak_memory is None otherwise.
+
+    When disabled, func_log only checks Profiler.enabled, so profiling costs nothing in
+    production runs.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.path = None
+        self.records = []
+        self.run_id = None
+        self.step = None
+        self._file = None
+
+    def enable(self, path: Optional[Path or str] = None, memory: bool = False):
+        """start profiling
+
+        Parameters
+        ----------
+        path : Optional[Path or str], optional
+            JSONL file the records are appended to, by default None (memory only)
+        memory : bool, optional
+            trace the peak memory of every call with tracemalloc, which inflates the times
+            recorded. by default False
+        """
+        self.disable()
+        self.enabled = True
+        self.memory = memory
+        self.run_id = uuid.uuid4().hex
+        self.path = Path(path) if path else None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def disable(self):
+        """stop profiling. records not drained are kept"""
+        self.enabled = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @contextlib.contextmanager
+    def in_step(self, step: str):
+        """label the records made inside the block, e.g. with the yaml dataset and batch"""
+        previous, self.step = self.step, step
+        try:
+            yield
+        finally:
+            self.step = previous
+
+    def call(self, func, args: tuple, kwargs: dict) -> Any:
+        """run func(*args, **kwargs) and record its profile"""
+        source = next(
+            (a for a in (*args, *kwargs.values()) if isinstance(a, pd.DataFrame)), None
+        )
+        record = {
+            "run_id": self.run_id,
+            "step": self.step,
+            "function": func.__name__,
+            "status": "failed",
+            "started_at": datetime.now().isoformat(),
+        }
+        rows_in, columns_in, bytes_in = _shape(source)
+        # taken before the call, functions working in place add their columns to source
+        buffers = frame_buffers(source) if source is not None else ([], set())
+        tracing = self.memory and tracemalloc.is_tracing()
+        if self.memory:
+            if not tracing:
+                tracemalloc.start()
+            memory_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            record["status"] = "succeeded"
+            return result
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall
+            record["cpu_seconds"] = time.process_time() - cpu
+            record["peak_memory"] = None
+            if self.memory:
+                record["peak_memory"] = (
+                    tracemalloc.get_traced_memory()[1] - memory_before
+                )
+                if not tracing:
+                    tracemalloc.stop()
+            # functions working in place return None, their input is their output
+            output = result
+            if result is None and record["status"] == "succeeded":
+                output = source
+            rows_out, columns_out, bytes_out = _shape(output)
+            record.update(
+                {
+                    "rows_in": rows_in,
+                    "columns_in": columns_in,
+                    "rows_out": rows_out,
+                    "columns_out": columns_out,
+                    "bytes_in": bytes_in,
+                    "bytes_out": bytes_out,
+                    "bytes_copied": bytes_copied_since(buffers, output),
+                    "arguments": json.dumps(
+                        [cheap_repr(a) for a in args]
+                        + [f"{k}={cheap_repr(v)}" for k, v in kwargs.items()]
+                    ),
+                }
+            )
+            self.records.append(record)
+            if self._file is not None:
+                self._file.write(json.dumps(record) + "\n")
+                self._file.flush()
+
+    def drain(self) -> pd.DataFrame:
+        """records made since the last drain, with the columns of PROFILE_COLUMNS"""
+        records, self.records = self.records, []
+        df = pd.DataFrame(records, columns=list(PROFILE_COLUMNS))
+        df["started_at"] = pd.to_datetime(df["started_at"])
+        return df
+
+
+profiler = Profiler()
+if os.environ.get(PROFILE_ENV, "").lower() not in ("", "0", "false", "no", "off"):
+    setting = os.environ[PROFILE_ENV]
+    on = ("1", "true", "yes", "on")
+    profiler.enable(
+        None if setting.lower() in on else setting,
+        memory=os.environ.get(PROFILE_MEMORY_ENV, "").lower() in on,
+    )
+
+
+def enable(path: Optional[Path or str] = None, memory: bool = False):
+    """profile transform functions from now on, see Profiler.enable"""
+    profiler.enable(path, memory)
+
+
+def disable():
+    """stop profiling transform functions"""
+    profiler.disable()
+
+
+def is_enabled() -> bool:
+    return profiler.enabled
+
+
+def in_step(step: str):
+    """label the profile records made inside the block, see Profiler.in_step"""
+    return profiler.in_step(step)
+
+
+def drain() -> pd.DataFrame:
+    """profile records made since the last drain, see Profiler.drain"""
+    return profiler.drain()
@@ -0,0 +1,172 @@
+from psycopg2 import sql
+from typing import Any, Optional
+import numpy as np
+import pandas as pd
+import re
+
+
+class SQLCompileError(Exception):
+    """Raised when a function (or its configuration) has no SQL equivalent"""
+
+
+class ProjectionCompiler:
+    """compile column-level functions of general_functions into one SELECT over a source query.
+
+    Every compiled function rewrites the column list (output name -> SQL expression) instead of
+    the data, so any number of renames, casts and default columns become a single projection,
+    scanned once by postgres, where pandas makes a full copy of the frame per function.
+    Method names and arguments are those of the functions they compile, as in the yaml
+    'functions:' map.
+    """
+
+    # integer dtypes by width. Postgres.align_datatype maps every int to INT (int4), which
+    # overflows where astype would not
+    integer_types = {
+        "int": "bigint",
+        "int8": "smallint",
+        "int16": "smallint",
+        "int32": "integer",
+        "int64": "bigint",
+        "uint8": "smallint",
+        "uint16": "integer",
+        "uint32": "bigint",
+    }
+
+    timezone_aware = r"datetime64\[\w+, .+\]"
+
+    @classmethod
+    def postgres_type(cls, dtype) -> str:
+        """postgres type of a pandas dtype: integer dtypes by width (see integer_types), time
+        zone aware datetimes as timestamptz and others by Postgres.align_datatype. raises
+        SQLCompileError for a dtype without postgres type"""
+        from yclib.datastore import Postgres
+
+        if str(dtype).lower() in cls.integer_types:
+            return cls.integer_types[str(dtype).lower()]
+        if re.fullmatch(cls.timezone_aware, str(dtype)):
+            return "timestamptz"
+        # numpy/pandas names without bit width or unit: float64 -> float, datetime64[ns] -> datetime
+        base = re.match(r"[a-zA-Z]+", str(dtype))
+        base = base.group() if base else str(dtype)
+        try:
+            return Postgres.align_datatype(
+                column_with_dtype={0: base if base == "UUID" else base.lower()}
+            )[0]
+        except KeyError:
+            raise SQLCompileError(f"no postgres type for {dtype}")
+
+    def __init__(self, columns: list[str]):
+        """
+        Parameters
+        ----------
+        columns : list[str]
+            result columns of the source query
+        """
+        self.columns = {col: sql.Identifier(col) for col in columns}
+        self.compiled = []
+
+    def rename_columns(self, name_map: dict[str, str]):
+        """as general_functions.rename_columns. names not in the map are kept"""
+        renamed = [name_map.get(col, col) for col in self.columns]
+        if len(set(renamed)) != len(renamed):
+            raise SQLCompileError("rename_columns would create duplicate columns")
+        self.columns = dict(zip(renamed, self.columns.values()))
+
+    def change_data_type(self, dtype_map: dict[str, str]):
+        """as general_functions.change_data_type, with pandas dtypes mapped to postgres types
+        by postgres_type. unlike astype, nulls are kept in integer and boolean columns.
+        time zone aware datetimes are not compiled, as postgres reads text without an offset
+        in the session time zone where pandas reads it in the time zone of the dtype"""
+        missing = set(dtype_map) - set(self.columns)
+        if missing:
+            raise SQLCompileError(
+                f"change_data_type: columns not found {sorted(missing)}"
+            )
+        postgres_types = {}
+        for col, dtype in dtype_map.items():
+            if re.fullmatch(self.timezone_aware, str(dtype)):
+                raise SQLCompileError(
+                    f"change_data_type: time zone aware {dtype} is not compiled"
+                )
+            postgres_types[col] = self.postgres_type(dtype)
+        for col, dtype in postgres_types.items():
+            self.columns[col] = sql.SQL("CAST({expression} AS {dtype})").format(
+                expression=self.columns[col], dtype=sql.SQL(dtype)
+            )
+
+    def create_columns_with_default_value(
+        self, column_name: str or list, default_value: Any = np.nan
+    ):
+        """as general_functions.create_columns_with_default_value. a missing value is a text NULL"""
+        if pd.api.types.is_list_like(default_value):
+            raise SQLCompileError(
+                "create_columns_with_default_value: non-scalar default"
+            )
+        if pd.isna(default_value):
+            expression = sql.SQL("NULL::text")
+        elif isinstance(default_value, str):
+            expression = sql.SQL("{value}::text").format(
+                value=sql.Literal(default_value)
+            )
+        elif isinstance(default_value, (np.number, np.bool_)):
+            expression = sql.Literal(default_value.item())
+        elif isinstance(default_value, (bool, int, float)):
+            expression = sql.Literal(default_value)
+        else:
+            raise SQLCompileError(
+                f"create_columns_with_default_value: unsupported default {default_value!r}"
+            )
+        for col in [column_name] if isinstance(column_name, str) else column_name:
+            self.columns[col] = expression
+
+    def compile(self, source: sql.Composable) -> sql.Composable:
+        """SELECT of the compiled columns over a source query"""
+        return sql.SQL("SELECT {columns} FROM ({source}) src").format(
+            columns=sql.SQL(",").join(
+                expression
+                if expression == sql.Identifier(col)
+                else sql.SQL("{expression} AS {col}").format(
+                    expression=expression, col=sql.Identifier(col)
+                )
+                for col, expression in self.columns.items()
+            ),
+            source=source,
+        )
+
+
+def compile_functions(
+    functions: dict[str, Optional[dict]], columns: list[str]
+) -> tuple[Optional[ProjectionCompiler], dict[str, dict]]:
+    """split a yaml 'functions:' map into the longest prefix that compiles to SQL and the rest,
+    which has to run in pandas on the result of the SQL part. entries without configuration
+    (e.g. 'table_filter:' left empty) are skipped
+
+    Parameters
+    ----------
+    functions : dict[str, Optional[dict]]
+        general_functions function names as keys and their keyword arguments as values, in order
+    columns : list[str]
+        result columns of the source query
+
+    Returns
+    -------
+    tuple[Optional[ProjectionCompiler], dict[str, dict]]
+        the compiler holding the SQL prefix (None if no function compiled), and the functions
+        left for pandas, in order
+    """
+    compiler = ProjectionCompiler(columns)
+    functions = {
+        name: kwargs for name, kwargs in functions.items() if kwargs is not None
+    }
+    remaining = dict(functions)
+    for name, kwargs in functions.items():
+        method = getattr(ProjectionCompiler, name, None)
+        if name.startswith("_") or name == "compile" or method is None:
+            break
+        try:
+            method(compiler, **kwargs)
+        except (SQLCompileError, TypeError):
+            break
+        compiler.compiled.append(name)
+        del remaining[name]
+    return (compiler if compiler.compiled else None), remaining
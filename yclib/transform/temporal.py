@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+from typing import Any
+
+
+def _sort_codes(series: pd.Series) -> np.ndarray:
+    """integer codes ordered as the sorted values, nulls last"""
+    codes, uniques = pd.factorize(series, sort=True)
+    codes = codes.astype(np.int64)
+    codes[codes == -1] = len(uniques)
+    return codes
+
+
+def history_order(df: pd.DataFrame, key_col: str, date_col: str) -> np.ndarray:
+    """row positions sorting a dataframe by key then date, stable and with nulls last,
+    as df.sort_values([key_col, date_col]) but without touching df
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        history records
+    key_col : str
+        key column, e.g. employee code
+    date_col : str
+        date column, e.g. effective date
+
+    Returns
+    -------
+    np.ndarray
+        positions in sorted order
+    """
+    date_codes = _sort_codes(df[date_col])
+    # one integer key sorts faster than np.lexsort over the two
+    combined = _sort_codes(df[key_col]) * (int(date_codes.max(initial=0)) + 1)
+    return np.argsort(combined + date_codes, kind="stable")
+
+
+def run_starts(keys: pd.Series, values: pd.Series) -> np.ndarray:
+    """mask of the rows of a sorted history starting a run of equal key and value: the first
+    row, rows whose key or value differs from the previous row, and rows with a null key or
+    value (null never equals the previous row, as in a != a.shift())
+
+    Parameters
+    ----------
+    keys : pd.Series
+        key column, in history order
+    values : pd.Series
+        column whose changes start a run, in history order
+
+    Returns
+    -------
+    np.ndarray
+        boolean mask
+    """
+    key_codes = pd.factorize(keys)[0]
+    value_codes = pd.factorize(values)[0]
+    starts = np.ones(len(key_codes), dtype=bool)
+    starts[1:] = (key_codes[1:] != key_codes[:-1]) | (
+        value_codes[1:] != value_codes[:-1]
+    )
+    starts |= (key_codes == -1) | (value_codes == -1)
+    return starts
+
+
+def _run_unique(series: pd.Series, run_id: np.ndarray, n_runs: int) -> list:
+    """Series.unique of every run, as a list of arrays: the first occurrence of each
+    (run, value) pair is kept and the kept values are split at run boundaries"""
+    codes = pd.factorize(series, use_na_sentinel=False)[0].astype(np.int64)
+    pair = run_id * (int(codes.max(initial=0)) + 1) + codes
+    keep = ~pd.Series(pair).duplicated().to_numpy()
+    counts = np.bincount(run_id[keep], minlength=n_runs)
+    return np.split(series.to_numpy()[keep], np.cumsum(counts)[:-1])
+
+
+def _run_take(series: pd.Series, bounds: np.ndarray, agg: str) -> pd.Series:
+    """'first' or 'last' of every run, i.e. its first or last non-null value as in
+    GroupBy.first/last, taken by position: the position of every non-null row is reduced with
+    np.minimum/np.maximum.reduceat at run boundaries. runs of nulls only give null"""
+    n = len(series)
+    notna = series.notna().to_numpy()
+    positions = np.arange(n)
+    if agg == "first":
+        positions = np.minimum.reduceat(np.where(notna, positions, n), bounds)
+        positions[positions == n] = -1
+    else:
+        positions = np.maximum.reduceat(np.where(notna, positions, -1), bounds)
+    return pd.Series(series.array.take(positions, allow_fill=True), name=series.name)
+
+
+def aggregate_runs(
+    df: pd.DataFrame, starts: np.ndarray, agg_settings: dict
+) -> pd.DataFrame:
+    """aggregate consecutive rows into runs, as df.groupby(run).agg(agg_settings) with runs
+    numbered from starts. 'unique', 'first' and 'last' are computed for all runs at once from
+    run boundaries (see _run_unique, _run_take), other aggregations by pandas' groupby
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        history records, in history order
+    starts : np.ndarray
+        mask of rows starting a run, see run_starts
+    agg_settings : dict
+        column as keys and groupby.agg statement as values
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per run, with the columns of agg_settings
+    """
+    run_id = np.cumsum(starts) - 1
+    bounds = np.flatnonzero(starts)
+    n_runs = len(bounds)
+    by_bounds = ("unique", "first", "last")
+    grouped = {
+        col: agg
+        for col, agg in agg_settings.items()
+        if not (isinstance(agg, str) and agg in by_bounds)
+    }
+    result = (
+        df.groupby(run_id, sort=False).agg(grouped).reset_index(drop=True)
+        if grouped
+        else pd.DataFrame(index=pd.RangeIndex(n_runs))
+    )
+    for col, agg in agg_settings.items():
+        if col in grouped:
+            continue
+        if not n_runs:
+            result[col] = df[col].iloc[:0].reset_index(drop=True)
+        elif agg == "unique":
+            result[col] = _run_unique(df[col], run_id, n_runs)
+        else:
+            result[col] = _run_take(df[col], bounds, agg)
+    return result[list(agg_settings)]
+
+
+def flatten_effective_date(
+    df: pd.DataFrame,
+    key_col: str,
+    flat_col: str,
+    effective_date: Any,
+    agg_settings: dict,
+) -> pd.DataFrame:
+    """flatten records with one effective date into runs with 'StartDate' and 'EndDate':
+    records are ordered by key and effective date, consecutive records with the same key and
+    flat_col value are aggregated with agg_settings, and a run ends where the next run of the
+    same key starts (NaT for the last run of a key). Runs with a null key are dropped.
+    df and agg_settings are not modified
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        source pandas dataframe
+    key_col : str
+        key column, usually the employee code
+    flat_col : str
+        column that will be flattened, i.e. classification
+    effective_date : Any
+        effective date column. it has to be aggregated in agg_settings
+    agg_settings : dict
+        column as keys and groupby.agg statement as values
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per run with the columns of agg_settings (effective_date renamed to
+        'StartDate') and 'EndDate'
+    """
+    order = history_order(df, key_col, effective_date)
+    history = df.iloc[order]
+    starts = run_starts(history[key_col], history[flat_col])
+    result = aggregate_runs(history, starts, agg_settings)
+
+    run_keys = pd.factorize(history[key_col])[0][starts]
+    next_same_key = np.append(run_keys[1:] == run_keys[:-1], False)
+    result["EndDate"] = result[effective_date].shift(-1).where(next_same_key)
+    result = result[run_keys != -1].reset_index(drop=True)
+    return result.rename(columns={effective_date: "StartDate"})
+
+
+def group_multiple_date(
+    df: pd.DataFrame,
+    key_col: str,
+    group_col: str,
+    period_start: Any,
+    period_end: Any,
+    agg_settings: dict,
+) -> pd.DataFrame:
+    """group records with a period start and end into runs: records are ordered by key and
+    period start, and consecutive records with the same key and group_col value become one
+    record with the minimum period start and maximum period end.
+    df and agg_settings are not modified
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        source pandas dataframe
+    key_col : str
+        key column, usually the employee code
+    group_col : str
+        column that will be grouped on, i.e. classification
+    period_start : Any
+        period start column
+    period_end : Any
+        period end column
+    agg_settings : dict
+        column as keys and groupby.agg statement as values, for columns other than the period
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per run with the columns of agg_settings, period_start and period_end
+    """
+    agg_settings = {**agg_settings, period_start: "min", period_end: "max"}
+    order = history_order(df, key_col, period_start)
+    history = df.iloc[order]
+    starts = run_starts(history[key_col], history[group_col])
+    return aggregate_runs(history, starts, agg_settings)